@@ -13,19 +13,43 @@ License: GPL v2 or later
 """
 
 import asyncio
+import base64
+import bisect
+import calendar
+import configparser
+import contextvars
+import email.utils
+import fnmatch
+import hashlib
+import itertools
 import json
 import logging
+import math
+import operator
 import os
+import re
+import signal
+import socket
+import sqlite3
 import subprocess
 import sys
+import tempfile
+import threading
 import time
-from datetime import datetime
+from array import array
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+from urllib.parse import urljoin, urlsplit, urlunsplit
 import zipfile
 import shutil
-import requests
-from dataclasses import dataclass
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import aiohttp
+from sqlalchemy import URL, bindparam, create_engine, make_url, text
+from sqlalchemy.exc import ProgrammingError
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
 from enum import Enum
 
 # Configure logging
@@ -39,6 +63,379 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Default configuration file location
+CONFIG_FILE = Path(__file__).parent / "mcp-server.conf"
+
+# Fallback used when [performance] max_concurrent_requests is not configured
+DEFAULT_MAX_CONCURRENT_REQUESTS = 3
+
+# External command defaults
+DEFAULT_COMMAND_TIMEOUT = 300
+DEFAULT_MAX_COMMAND_OUTPUT = 1024 * 1024  # 1MB per stream
+
+# Warm WP-CLI worker pool defaults
+DEFAULT_WP_WORKER_POOL_SIZE = 2
+DEFAULT_WP_WORKER_MAX_REQUESTS = 500
+DEFAULT_WP_WORKER_MAX_MEMORY = "256M"
+WP_WORKER_START_TIMEOUT = 60
+WP_WORKER_RETRY_DELAY = 60
+WP_WORKER_FRAME_MARKER = b"@@SWAF "
+
+# Posts resolved per `wp post list` page during bulk operations
+DEFAULT_POST_LIST_PAGE_SIZE = 500
+
+# Wayback Machine client defaults
+DEFAULT_ARCHIVE_TIMEOUT = 30
+DEFAULT_HTTP_POOL_SIZE = 10
+DNS_CACHE_TTL = 300
+USER_AGENT = "SpunWebArchiveForge-MCP/1.0.7"
+
+# Archive.org rate limiting defaults
+DEFAULT_RATE_LIMIT_DELAY = 1.0
+DEFAULT_MAX_RETRIES = 3
+RATE_LIMIT_MIN_FACTOR = 1 / 16  # Slowest rate as a fraction of the configured rate
+RATE_LIMIT_RECOVERY_STEP = 0.1  # Fraction of the configured rate regained per success
+THROTTLE_STATUSES = (429, 503)
+
+# Availability cache defaults
+DEFAULT_CACHE_TTL = 3600
+DEFAULT_NEGATIVE_CACHE_TTL = 300
+DEFAULT_AVAILABILITY_CACHE_SIZE = 10000
+DEFAULT_QUEUE_STATUS_TTL = 5
+QUEUE_STATUS_HISTORY = 16  # Snapshots kept per queue for delta polling
+CACHE_SAVE_INTERVAL = 500  # Writes between saves of a persistent cache
+
+# CDX index lookups
+DEFAULT_CDX_URL = "https://web.archive.org/cdx/search/cdx"
+CDX_GROUP_MAX_URLS = 100  # URLs answered by one prefix query at most
+CDX_PREFIX_LINES_PER_URL = 50  # Capture lines a prefix query may stream per wanted URL
+
+# Direct database access defaults
+DEFAULT_DB_POOL_SIZE = 5
+DB_RETRY_DELAY = 60  # Seconds to use WP-CLI after a direct connection fails
+HISTORY_COLUMN_TYPES = {"id": int, "post_id": int}
+HISTORY_COLUMNS = ["id", "post_id", "post_title", "post_url", "submission_url", "archive_url", "status",
+                   "submission_date", "last_checked", "error_message", "response_data"]
+HISTORY_DEFAULT_COLUMNS = [column for column in HISTORY_COLUMNS if column != "response_data"]
+HISTORY_MAX_PAGE_SIZE = 1000
+WP_CONFIG_DEFINE = re.compile(
+    r"define\s*\(\s*['\"](DB_NAME|DB_USER|DB_PASSWORD|DB_HOST|DB_CHARSET)['\"]\s*,\s*(['\"])(.*?)(?<!\\)\2\s*\)"
+)
+WP_CONFIG_TABLE_PREFIX = re.compile(r"\$table_prefix\s*=\s*(['\"])(\w*)\1\s*;")
+DEFAULT_QUEUE_TABLE = "wp_swap_archive_queue"
+DEFAULT_QUEUE_BATCH_SIZE = 10
+DEFAULT_QUEUE_INTERVAL = 300
+DEFAULT_QUEUE_MAX_ATTEMPTS = 3
+DEFAULT_QUEUE_PARTITIONS = 16
+DEFAULT_QUEUE_LEASE_TTL = 60  # Seconds a partition lease lasts without a heartbeat
+DEFAULT_LEASE_TABLE = "wp_swap_queue_leases"
+DEFAULT_WORKER_TABLE = "wp_swap_queue_workers"
+WORKER_RECORD_RETENTION = 86400  # Seconds a silent worker's stats row is kept
+
+# Local reporting mirror
+DEFAULT_MIRROR_PATH = "mcp-server-mirror.db"
+DEFAULT_MIRROR_BATCH_SIZE = 1000
+DEFAULT_MIRROR_MAX_STALENESS = 300  # Seconds a mirrored table may lag before queries go live
+DEFAULT_MIRROR_SYNC_INTERVAL = 60
+DEFAULT_MIRROR_RECONCILE_INTERVAL = 3600  # Seconds between scans for rows deleted at the source
+
+# Submission analytics
+ANALYTICS_PAGE_SIZE = 10000  # Rows fetched per query when loading columns
+ANALYTICS_PERCENTILES = (0.5, 0.9, 0.99)
+ANALYTICS_DURATION_BUCKETS = [60, 300, 900, 3600, 21600, 86400, 604800]
+ANALYTICS_DURATION_LABELS = ["<1m", "1-5m", "5-15m", "15m-1h", "1-6h", "6h-1d", "1-7d", ">7d"]
+HISTORY_SUCCESS_STATUSES = frozenset({"success", "completed", "archived"})
+QUEUE_SUCCESS_STATUSES = frozenset({"completed"})
+
+# Background job defaults
+DEFAULT_MAX_CONCURRENT_JOBS = 2
+DEFAULT_JOB_MAX_AGE = 3600  # Seconds a finished job is kept
+DEFAULT_JOB_SPILL_THRESHOLD = 65536  # Result size in bytes above which results go to disk
+DEFAULT_JOB_RESULT_PAGE_SIZE = 100
+
+# Local submission journal defaults
+DEFAULT_JOURNAL_PATH = "mcp-server-journal.db"
+DEFAULT_DEDUPE_WINDOW = 86400  # Seconds in which a URL is not resubmitted
+DEFAULT_JOURNAL_BATCH_SIZE = 100
+DEFAULT_WATERMARK_MAX_ATTEMPTS = 3  # Incremental runs a failing post holds the watermark for
+
+# Change detection defaults
+DEFAULT_CHANGE_DETECTION_TIMEOUT = 15
+MAX_FINGERPRINT_BODY = 5 * 1024 * 1024
+FINGERPRINT_CHUNK_SIZE = 64 * 1024
+VOLATILE_MARKUP_PATTERNS = [
+    (re.compile(r"<!--.*?-->", re.S), ""),  # Cache/timing comments
+    (re.compile(r"\bnonce=([\"'])[^\"']*\1", re.I), "nonce="),  # CSP nonces
+    (re.compile(r"(name=[\"']_wp(?:nonce|_http_referer)[\"']\s+value=)([\"'])[^\"']*\2", re.I), r"\1"),
+    (re.compile(r"([\"'](?:\w*_)?nonce[\"']\s*:\s*)[\"'][^\"']*[\"']", re.I), r"\1"),  # Localized script nonces
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), ""),
+    (re.compile(r"\s+"), " "),
+]
+
+# Bulk submission pipeline defaults
+DEFAULT_PER_HOST_LIMIT = 2
+PROGRESS_INTERVAL = 0.5  # Minimum seconds between progress notifications
+MAX_REPORTED_FAILURES = 50
+
+# Plugin analysis
+MAX_SCAN_FILE_SIZE = 2 * 1024 * 1024  # Larger files (bundles, generated code) are skipped
+SCAN_SKIP_DIRS = {".git", ".svn", ".hg", "node_modules"}
+# Points deducted per (rule, file) with issues, and the score needed to pass
+ANALYSIS_SCORING = {"security": (10, 80), "performance": (5, 70), "standards": (15, 85)}
+SCANNER_VERSION = 1  # Bump when scanning changes in ways the rule definitions do not show
+DEFAULT_ANALYSIS_CACHE_PATH = "mcp-server-analysis-cache.db"
+DEFAULT_ANALYSIS_CACHE_SIZE = 50000  # Cached per-file results
+PHPCS_EXTENSIONS = (".php", ".inc", ".js", ".css")
+DEFAULT_ANALYSIS_WORKERS = 0  # Scanner processes; 0 = one per CPU, 1 = scan in a thread only
+PARALLEL_SCAN_MIN_FILES = 200  # Fewer uncached files are scanned in a thread
+# Process-pool tasks are small so idle workers keep taking the next one
+ANALYSIS_CHUNK_FILES = 32
+ANALYSIS_CHUNK_BYTES = 1024 * 1024
+MAX_REPORTED_ISSUES = 50  # Per plugin and category in wp_plugin_analyze_bulk
+
+DEFAULT_LINT_WORKERS = 0  # Concurrent PHP syntax checks; 0 = one per CPU
+LINT_BATCH_SIZE = 16  # Files per lint server request
+PHP_LINT_ERROR = re.compile(r"(PHP (?:Parse|Fatal) error):\s+(.*) in (.+) on line (\d+)")
+
+# Symbol index: one token pass per PHP file, cached per file alongside scan results
+SYMBOL_INDEX_VERSION = 1  # Bump when extraction changes
+PHP_TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>//[^\n]*?(?=\?>|$)|\#(?!\[)[^\n]*?(?=\?>|$)|/\*.*?\*/)
+  | (?P<heredoc><<<[ \t]*(?P<quote>["']?)(?P<label>[A-Za-z_]\w*)(?P=quote)\r?\n.*?^[ \t]*(?P=label)\b)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`(?:[^`\\]|\\.)*`)
+  | (?P<html>\?>.*?(?:<\?php|<\?=|<\?|\Z))
+  | (?P<variable>\$[A-Za-z_]\w*)
+  | (?P<name>\\?[A-Za-z_][\w\\]*)
+  | (?P<operator>\?->|->|::)
+  | (?P<punctuation>[^\s\w])
+""", re.S | re.M | re.X)
+PHP_OPEN_TAG = re.compile(r"<\?php|<\?=|<\?")
+# Hook API functions: (hook type, what the call does)
+PHP_HOOK_CALLS = {
+    "add_action": ("action", "registers"),
+    "add_filter": ("filter", "registers"),
+    "remove_action": ("action", "removes"),
+    "remove_filter": ("filter", "removes"),
+    "do_action": ("action", "fires"),
+    "do_action_ref_array": ("action", "fires"),
+    "do_action_deprecated": ("action", "fires"),
+    "apply_filters": ("filter", "fires"),
+    "apply_filters_ref_array": ("filter", "fires"),
+    "apply_filters_deprecated": ("filter", "fires")
+}
+WPDB_QUERY_METHODS = {"query", "get_results", "get_row", "get_var", "get_col", "insert", "update", "delete", "replace"}
+WPDB_SAFE_METHODS = {"insert", "update", "delete", "replace"}  # Escape their own values
+SYMBOL_KINDS = ("class", "method", "function", "hook", "query", "escape")
+
+# PHP side of the WP-CLI worker. It runs under `wp eval-file` so WordPress is
+# bootstrapped once, then executes WP-CLI commands in-process. Frames are
+# "@@SWAF <length>\n<json>" in both directions; anything else on stdout is
+# ignored by the reader.
+WP_WORKER_SCRIPT = r"""<?php
+/**
+ * Spun Web Archive Forge WP-CLI worker
+ *
+ * @package SpunWebArchiveForge
+ */
+
+$swaf_marker = '@@SWAF ';
+
+$swaf_send = function ($data) use ($swaf_marker) {
+    $payload = json_encode($data);
+    fwrite(STDOUT, "\n" . $swaf_marker . strlen($payload) . "\n" . $payload);
+    fflush(STDOUT);
+};
+
+$swaf_send(array('ready' => true, 'pid' => getmypid(), 'memory' => memory_get_usage(true)));
+
+while (($header = fgets(STDIN)) !== false) {
+    if (strpos($header, $swaf_marker) !== 0) {
+        continue;
+    }
+
+    $length = (int) substr($header, strlen($swaf_marker));
+    $payload = '';
+    while (strlen($payload) < $length && !feof(STDIN)) {
+        $payload .= fread(STDIN, $length - strlen($payload));
+    }
+
+    $request = json_decode($payload, true);
+    if (!is_array($request) || empty($request['command'])) {
+        $swaf_send(array('return_code' => 1, 'stdout' => '', 'stderr' => 'Invalid worker request', 'memory' => memory_get_usage(true)));
+        continue;
+    }
+
+    // Drop per-request object cache so reads never see stale options
+    if (function_exists('wp_cache_flush_runtime')) {
+        wp_cache_flush_runtime();
+    } elseif (!wp_using_ext_object_cache()) {
+        wp_cache_flush();
+    }
+
+    try {
+        $result = WP_CLI::runcommand($request['command'], array(
+            'return' => 'all',
+            'launch' => false,
+            'exit_error' => false,
+            'parse' => false,
+        ));
+        $response = array(
+            'return_code' => $result->return_code,
+            'stdout' => $result->stdout,
+            'stderr' => $result->stderr,
+        );
+    } catch (Throwable $e) {
+        $response = array('return_code' => 1, 'stdout' => '', 'stderr' => $e->getMessage());
+    }
+
+    $response['memory'] = memory_get_usage(true);
+    $swaf_send($response);
+}
+"""
+
+# Keyset page of published posts modified after a (post_modified_gmt, ID)
+# watermark; args: <after_gmt_date> <after_gmt_time> <after_id> <limit> <types>
+WP_MODIFIED_POSTS_SCRIPT = r"""<?php
+/**
+ * Spun Web Archive Forge modified posts page
+ *
+ * @package SpunWebArchiveForge
+ */
+
+global $wpdb;
+
+list($swaf_date, $swaf_time, $swaf_after_id, $swaf_limit, $swaf_types) = $args;
+$swaf_after = $swaf_date . ' ' . $swaf_time;
+$swaf_types = array_filter(explode(',', $swaf_types));
+$swaf_in = implode(', ', array_fill(0, count($swaf_types), '%s'));
+
+$swaf_rows = $wpdb->get_results($wpdb->prepare(
+    "SELECT ID, post_type, post_modified, post_modified_gmt FROM {$wpdb->posts}
+     WHERE post_status = 'publish' AND post_type IN ($swaf_in)
+       AND (post_modified_gmt > %s OR (post_modified_gmt = %s AND ID > %d))
+     ORDER BY post_modified_gmt ASC, ID ASC
+     LIMIT %d",
+    array_merge($swaf_types, array($swaf_after, $swaf_after, (int) $swaf_after_id, (int) $swaf_limit))
+), ARRAY_A);
+
+foreach ($swaf_rows as &$swaf_row) {
+    $swaf_row['url'] = get_permalink($swaf_row['ID']);
+}
+
+echo json_encode($swaf_rows);
+"""
+
+# Parameterized $wpdb query used when the database cannot be reached directly;
+# the single argument is base64 JSON {"sql": ..., "params": [...]}
+WP_DB_QUERY_SCRIPT = r"""<?php
+/**
+ * Spun Web Archive Forge prepared query
+ *
+ * @package SpunWebArchiveForge
+ */
+
+global $wpdb;
+
+$swaf_query = json_decode(base64_decode($args[0]), true);
+$swaf_sql = $swaf_query['params'] ? $wpdb->prepare($swaf_query['sql'], $swaf_query['params']) : $swaf_query['sql'];
+$swaf_rows = $wpdb->get_results($swaf_sql, ARRAY_A);
+
+if ($wpdb->last_error) {
+    WP_CLI::error($wpdb->last_error);
+}
+
+echo json_encode($swaf_rows);
+"""
+
+# Long-lived syntax checker run with plain `php`. Requests are {"paths": [...]}
+# in the worker's frame format; each file is parsed with token_get_all() in
+# TOKEN_PARSE mode, which throws ParseError on syntax errors.
+PHP_LINT_SERVER_SCRIPT = r"""<?php
+/**
+ * Spun Web Archive Forge lint server
+ *
+ * @package SpunWebArchiveForge
+ */
+
+error_reporting(0);
+ini_set('display_errors', 'stderr');
+
+$swaf_marker = '@@SWAF ';
+
+$swaf_send = function ($data) use ($swaf_marker) {
+    $payload = json_encode($data);
+    fwrite(STDOUT, "\n" . $swaf_marker . strlen($payload) . "\n" . $payload);
+    fflush(STDOUT);
+};
+
+$swaf_send(array('ready' => true, 'pid' => getmypid(), 'memory' => memory_get_usage(true)));
+
+while (($header = fgets(STDIN)) !== false) {
+    if (strpos($header, $swaf_marker) !== 0) {
+        continue;
+    }
+
+    $length = (int) substr($header, strlen($swaf_marker));
+    $payload = '';
+    while (strlen($payload) < $length && !feof(STDIN)) {
+        $payload .= fread(STDIN, $length - strlen($payload));
+    }
+
+    $request = json_decode($payload, true);
+    $results = array();
+    foreach ((array) (isset($request['paths']) ? $request['paths'] : array()) as $path) {
+        $start = microtime(true);
+        $code = @file_get_contents($path);
+        if ($code === false) {
+            $results[] = array('ok' => false, 'message' => 'Could not open input file', 'line' => null,
+                               'cacheable' => false, 'seconds' => 0);
+            continue;
+        }
+        try {
+            token_get_all($code, TOKEN_PARSE);
+            $result = array('ok' => true);
+        } catch (ParseError $e) {
+            $result = array('ok' => false, 'message' => 'PHP Parse error:  ' . $e->getMessage(), 'line' => $e->getLine());
+        } catch (Throwable $e) {
+            $result = array('ok' => false, 'message' => 'PHP Fatal error:  ' . $e->getMessage(), 'line' => $e->getLine());
+        }
+        $result['seconds'] = microtime(true) - $start;
+        $results[] = $result;
+    }
+
+    $swaf_send(array('results' => $results, 'memory' => memory_get_usage(true)));
+}
+"""
+
+WATERMARK_EPOCH = "0000-00-00 00:00:00"
+
+def php_script_path(name: str, source: str) -> Path:
+    """Write a PHP helper script to a temp file named by its content and return its path"""
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+    path = Path(tempfile.gettempdir()) / f"swaf-{name}-{digest}.php"
+    if not path.exists():
+        path.write_text(source, encoding="utf-8")
+    return path
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for deduplication and cache keys"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme, parts.port) in (("http", 80), ("https", 443)):
+        netloc = netloc.rsplit(":", 1)[0]
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+@dataclass
+class RequestContext:
+    """Per-request state available to tools while they run"""
+    request_id: Any
+    progress_token: Any = None
+    notify: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+
+# Context of the JSON-RPC request currently being served
+current_request: contextvars.ContextVar = contextvars.ContextVar("current_request", default=None)
+
 class PluginStatus(Enum):
     """Plugin status enumeration"""
     ACTIVE = "active"
@@ -53,6 +450,14 @@ class SubmissionStatus(Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+class JobStatus(Enum):
+    """Background job status enumeration"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
 @dataclass
 class PluginInfo:
     """Plugin information data class"""
@@ -83,6 +488,76 @@ class ArchiveSubmission:
     error_message: Optional[str]
     retry_count: int
 
+@dataclass
+class Job:
+    """Background tool call"""
+    id: str
+    tool: str
+    arguments: Dict[str, Any]
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    result_path: Optional[Path] = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "tool": self.tool,
+            "status": self.status.value,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "error": self.error
+        }
+
+@dataclass
+class MirrorTable:
+    """Source table copied by SQLiteMirror"""
+    config_key: Optional[str]  # [database] option naming the table, if any
+    name: str  # Table name after the site's prefix
+    key: str = "id"
+    updated: Optional[str] = None  # Column bumped whenever a row changes
+    open_statuses: tuple = ()  # Status values of rows that may change without bumping `updated`
+    columns: str = "*"
+    indexes: tuple = ()
+    optional: bool = False
+
+@dataclass
+class ScanRule:
+    """Pattern rule applied by PluginScanner"""
+    id: str
+    category: str
+    message: str
+    patterns: tuple  # Literal tokens, reported where they occur
+    unless: tuple = ()  # Tokens whose presence anywhere in the file clears the rule
+    missing: bool = False  # Report files in which no pattern occurs instead
+    path_contains: Optional[str] = None
+    metric: bool = False  # Count matching files instead of reporting issues
+
+ANALYSIS_RULES = [
+    ScanRule("missing-abspath-check", "security", "Missing ABSPATH check", ("ABSPATH",),
+             missing=True, path_contains="wp-content"),
+    ScanRule("select-star", "performance", "Use of SELECT *", ("SELECT *",)),
+    ScanRule("cache-usage", "performance", "Uses the object cache or transients", ("wp_cache_", "get_transient"),
+             metric=True),
+    ScanRule("unescaped-echo", "standards", "Missing output escaping", ("echo $",), unless=("esc_html",))
+]
+
+# $wpdb queries built without $wpdb->prepare() are reported from the symbol index
+VALIDATION_RULES = [
+    ScanRule("missing-abspath-check", "security", "Missing ABSPATH check", ("ABSPATH",), missing=True)
+]
+
 @dataclass
 class IRCConfig:
     """IRC bot configuration"""
@@ -97,46 +572,3462 @@ class IRCConfig:
         if self.channels is None:
             self.channels = ["#spunwebtechnology"]
 
-class SpunWebArchiveForgeMCPServer:
-    """Main MCP Server class for Spun Web Archive Forge plugin management"""
+@dataclass
+class CommandResult:
+    """Result of an external command run through CommandRunner"""
+    args: List[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float
+    timed_out: bool = False
+    truncated: bool = False
+
+class CommandError(Exception):
+    """Raised when a checked command exits with a non-zero status"""
+
+    def __init__(self, result: CommandResult):
+        self.result = result
+        reason = "timed out" if result.timed_out else f"exited with status {result.returncode}"
+        super().__init__(f"Command '{' '.join(result.args)}' {reason}: {result.stderr.strip()}")
+
+class CommandRunner:
+    """Shared non-blocking runner for WP-CLI, php, phpcs and scp invocations
     
-    def __init__(self):
-        self.plugin_path = Path(__file__).parent
-        self.wp_path = Path("C:/Users/disru/Studio/plugin-test")
-        self.repository_path = Path("C:/Users/disru/Documents/wordpress plugins/Spun Web Archive Forge Repository")
-        self.test_server_url = "http://localhost:8881"
-        self.test_credentials = {
-            "username": "admin",
-            "password": "TCeglApnp@Ef29JVWrx6xIQn"
-        }
+    Commands run through asyncio.create_subprocess_exec in their own process
+    group so a timeout or cancelled tool call kills the whole child tree.
+    Captured output is bounded per stream and every call is timed.
+    """
+
+    def __init__(self, default_timeout: float = DEFAULT_COMMAND_TIMEOUT,
+                 max_output: int = DEFAULT_MAX_COMMAND_OUTPUT):
+        self.default_timeout = default_timeout
+        self.max_output = max_output
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.recent = deque(maxlen=50)
+
+    async def run(self, cmd: List[str], cwd: Optional[str] = None, timeout: Optional[float] = None,
+                  check: bool = False, input: Optional[bytes] = None,
+                  max_output: Optional[int] = None) -> CommandResult:
+        """Run a command and capture its output
         
-        # Plugin configuration
-        self.plugin_info = PluginInfo(
-            name="Spun Web Archive Forge",
-            slug="spun-web-archive-forge",
-            version="1.0.7",
-            status=PluginStatus.INACTIVE,
-            description="Professional WordPress plugin for automatically submitting content to the Internet Archive (Wayback Machine)",
-            author="Ryan Dickie Thompson",
-            author_uri="https://www.spunwebtechnology.com",
-            plugin_uri="https://www.spunwebtechnology.com/spun-web-archive-forge-wordpress-wayback-archive/",
-            text_domain="spun-web-archive-forge",
-            requires_wp="5.0",
-            requires_php="7.4",
-            tested_up_to="6.8.2",
-            license="GPL v2 or later",
-            license_uri="https://www.gnu.org/licenses/gpl-2.0.html"
+        A timeout of None uses the runner default; 0 disables the timeout.
+        Raises FileNotFoundError if the executable does not exist and
+        CommandError if check is set and the command fails.
+        """
+        cmd = [str(arg) for arg in cmd]
+        timeout = self.default_timeout if timeout is None else timeout
+        limit = self.max_output if max_output is None else max_output
+
+        if os.name == "nt":
+            group_kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group_kwargs = {"start_new_session": True}
+
+        start_time = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=cwd,
+            stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **group_kwargs
+        )
+
+        stdout_buffer = bytearray()
+        stderr_buffer = bytearray()
+        truncated = []
+        timed_out = False
+
+        async def communicate():
+            if input is not None:
+                process.stdin.write(input)
+                await process.stdin.drain()
+                process.stdin.close()
+            await asyncio.gather(
+                self._read_stream(process.stdout, stdout_buffer, limit, truncated),
+                self._read_stream(process.stderr, stderr_buffer, limit, truncated),
+                process.wait()
+            )
+
+        try:
+            await asyncio.wait_for(communicate(), timeout or None)
+        except asyncio.TimeoutError:
+            timed_out = True
+            self._kill(process)
+            await process.wait()
+        except asyncio.CancelledError:
+            self._kill(process)
+            await process.wait()
+            raise
+
+        result = CommandResult(
+            args=cmd,
+            returncode=process.returncode if not timed_out else -1,
+            stdout=stdout_buffer.decode("utf-8", errors="replace"),
+            stderr=stderr_buffer.decode("utf-8", errors="replace"),
+            duration=time.monotonic() - start_time,
+            timed_out=timed_out,
+            truncated=bool(truncated)
+        )
+        if timed_out:
+            result.stderr += f"\nCommand timed out after {timeout} seconds"
+
+        self._record(result)
+
+        if check and (result.returncode != 0 or timed_out):
+            raise CommandError(result)
+
+        return result
+
+    async def _read_stream(self, stream, buffer: bytearray, limit: int, truncated: list):
+        """Drain a stream, keeping at most limit bytes"""
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                break
+            remaining = limit - len(buffer)
+            if remaining > 0:
+                buffer.extend(chunk[:remaining])
+            if len(chunk) > remaining:
+                truncated.append(True)
+
+    def _kill(self, process):
+        """Kill the process group of a running command"""
+        if process.returncode is not None:
+            return
+        try:
+            if os.name == "nt":
+                process.kill()
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _record(self, result: CommandResult):
+        """Record timing metrics for a finished command"""
+        name = " ".join([Path(result.args[0]).name] + result.args[1:2])
+        stats = self.stats.setdefault(name, {
+            "calls": 0, "failures": 0, "timeouts": 0, "total_time": 0.0, "max_time": 0.0
+        })
+        stats["calls"] += 1
+        stats["total_time"] += result.duration
+        stats["max_time"] = max(stats["max_time"], result.duration)
+        if result.returncode != 0:
+            stats["failures"] += 1
+        if result.timed_out:
+            stats["timeouts"] += 1
+
+        self.recent.append({
+            "command": name,
+            "returncode": result.returncode,
+            "duration": round(result.duration, 4),
+            "timed_out": result.timed_out
+        })
+        logger.debug(f"Command '{name}' finished in {result.duration:.3f}s with status {result.returncode}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get aggregated timing metrics per command"""
+        commands = {}
+        for name, stats in self.stats.items():
+            commands[name] = dict(stats, average_time=stats["total_time"] / stats["calls"])
+        return {
+            "commands": commands,
+            "recent": list(self.recent)
+        }
+
+class SubmissionPipeline:
+    """Bounded producer/consumer pipeline for archive submissions
+    
+    Rows flow enumerate -> dedupe -> submit -> record. The queue between the
+    producer and the submit workers is bounded so enumeration never runs far
+    ahead of submission, and each target host has its own concurrency limit.
+    Only counters and a capped list of failures are kept in memory.
+    """
+
+    def __init__(self, submit: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 concurrency: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+                 per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+                 on_result: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]]] = None,
+                 on_progress: Optional[Callable[[Dict[str, Any], bool], Awaitable[None]]] = None,
+                 on_skip: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.submit = submit
+        self.concurrency = max(1, concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.on_result = on_result
+        self.on_progress = on_progress
+        self.on_skip = on_skip
+        self._queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._seen = set()
+        self._last_progress = 0.0
+        self.enumerated_all = False
+        self.summary = {
+            "enumerated": 0,
+            "duplicates": 0,
+            "processed": 0,
+            "successful": 0,
+            "failed": 0,
+            "failures": []
+        }
+
+    async def run(self, rows: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """Drive rows through the pipeline and return the summary"""
+        start_time = time.monotonic()
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        try:
+            await self._produce(rows)
+            await self._queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        elapsed = time.monotonic() - start_time
+        self.summary["elapsed_seconds"] = round(elapsed, 3)
+        self.summary["rate_per_second"] = round(self.summary["processed"] / elapsed, 3) if elapsed else 0.0
+        await self._progress(final=True)
+        return self.summary
+
+    async def _produce(self, rows: AsyncIterator[Dict[str, Any]]):
+        async for row in rows:
+            self.summary["enumerated"] += 1
+            url = row.get("url")
+            if url:
+                key = normalize_url(url)
+                if key in self._seen:
+                    self.summary["duplicates"] += 1
+                    if self.on_skip:
+                        self.on_skip(row)
+                    continue
+                self._seen.add(key)
+            # Blocks while the queue is full, applying backpressure upstream
+            await self._queue.put(row)
+        self.enumerated_all = True
+
+    async def _worker(self):
+        while True:
+            row = await self._queue.get()
+            try:
+                await self._process(row)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, row: Dict[str, Any]):
+        if not row.get("url"):
+            result = {"success": False, "error": row.get("error", "Post has no URL")}
+        else:
+            host = urlsplit(row["url"]).hostname or ""
+            limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+            async with limit:
+                try:
+                    result = await self.submit(row)
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+
+        self.summary["processed"] += 1
+        if result.get("success"):
+            self.summary["successful"] += 1
+        else:
+            self.summary["failed"] += 1
+            if len(self.summary["failures"]) < MAX_REPORTED_FAILURES:
+                self.summary["failures"].append({
+                    "post_id": row.get("ID"),
+                    "url": row.get("url"),
+                    "error": result.get("error")
+                })
+
+        if self.on_result:
+            await self.on_result(row, result)
+        await self._progress()
+
+    async def _progress(self, final: bool = False):
+        now = time.monotonic()
+        if self.on_progress and (final or now - self._last_progress >= PROGRESS_INTERVAL):
+            self._last_progress = now
+            await self.on_progress(self.summary, final)
+
+class OrderedCheckpoint:
+    """Track the last position before which every item has finished
+    
+    Items are added in enumeration order and may finish in any order;
+    advance() moves the checkpoint over the finished prefix only.
+    """
+
+    def __init__(self, position: Any = None):
+        self.position = position
+        self._order = deque()
+        self._done = set()
+
+    def add(self, item: Any):
+        self._order.append(item)
+
+    def done(self, item: Any):
+        self._done.add(item)
+
+    def advance(self) -> Any:
+        while self._order and self._order[0] in self._done:
+            self.position = self._order.popleft()
+            self._done.discard(self.position)
+        return self.position
+
+class SubmissionJournal:
+    """Local SQLite journal of archive submissions
+    
+    The database runs in WAL mode and records are written in batches. A
+    unique index on (normalized URL, time bucket) makes "was this URL
+    archived inside the dedupe window" two index lookups, and bulk jobs
+    store their checkpoint in the same transaction as their records so a
+    restarted job can resume from the last committed position. Failed
+    attempts per post are counted the same way, so incremental jobs can stop
+    retrying a post that keeps failing.
+    """
+
+    def __init__(self, path: Path, dedupe_window: float = DEFAULT_DEDUPE_WINDOW,
+                 batch_size: int = DEFAULT_JOURNAL_BATCH_SIZE):
+        self.path = path
+        self.dedupe_window = max(1.0, dedupe_window)
+        self.batch_size = max(1, batch_size)
+        self._pending: Dict[tuple, ArchiveSubmission] = {}
+        self._pending_fingerprints: Dict[str, Dict[str, Any]] = {}
+        self._pending_attempts: Dict[tuple, tuple] = {}
+        self.connection = sqlite3.connect(str(path))
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self.stats = {"recorded": 0, "flushes": 0, "duplicates_skipped": 0}
+
+    def _create_schema(self):
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS submissions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                post_id INTEGER NOT NULL DEFAULT 0,
+                url TEXT NOT NULL,
+                normalized_url TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                archive_url TEXT,
+                submitted_at REAL NOT NULL,
+                completed_at REAL,
+                error_message TEXT,
+                retry_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS submissions_url_bucket ON submissions (normalized_url, bucket);
+            CREATE INDEX IF NOT EXISTS submissions_post_id ON submissions (post_id);
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                normalized_url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                archive_url TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                job_key TEXT PRIMARY KEY,
+                position TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS post_attempts (
+                job_key TEXT NOT NULL,
+                post_id INTEGER NOT NULL,
+                attempts INTEGER NOT NULL,
+                error_message TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_key, post_id)
+            );
+        """)
+        self.connection.commit()
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.dedupe_window)
+
+    def recent_submission(self, url: str) -> Optional[ArchiveSubmission]:
+        """Get a completed submission of url inside the dedupe window, if any"""
+        key = normalize_url(url)
+        now = time.time()
+        cutoff = now - self.dedupe_window
+        current = self._bucket(now)
+
+        for bucket in (current, current - 1):
+            submission = self._pending.get((key, bucket))
+            if submission is None:
+                row = self.connection.execute(
+                    "SELECT * FROM submissions WHERE normalized_url = ? AND bucket = ?", (key, bucket)
+                ).fetchone()
+                submission = self._from_row(row) if row else None
+            if (submission and submission.status == SubmissionStatus.COMPLETED
+                    and submission.completed_at and submission.completed_at.timestamp() >= cutoff):
+                self.stats["duplicates_skipped"] += 1
+                return submission
+        return None
+
+    def record(self, submission: ArchiveSubmission):
+        """Buffer a submission, writing the batch once it is full"""
+        key = (normalize_url(submission.url), self._bucket(submission.submitted_at.timestamp()))
+        previous = self._pending.get(key)
+        if previous is not None:
+            submission.retry_count = max(submission.retry_count, previous.retry_count + 1)
+        self._pending[key] = submission
+        self.stats["recorded"] += 1
+
+    def get_fingerprint(self, url: str) -> Optional[Dict[str, Any]]:
+        """Get the page fingerprint stored at url's last successful capture"""
+        key = normalize_url(url)
+        if key in self._pending_fingerprints:
+            return self._pending_fingerprints[key]
+        row = self.connection.execute(
+            "SELECT etag, last_modified, content_hash, archive_url FROM fingerprints WHERE normalized_url = ?", (key,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def put_fingerprint(self, url: str, fingerprint: Dict[str, Any]):
+        """Buffer the fingerprint of a page that was just captured"""
+        self._pending_fingerprints[normalize_url(url)] = {
+            "etag": fingerprint.get("etag"),
+            "last_modified": fingerprint.get("last_modified"),
+            "content_hash": fingerprint.get("content_hash"),
+            "archive_url": fingerprint.get("archive_url")
+        }
+
+    def failed_attempts(self, job_key: str, post_id: int) -> int:
+        """Number of consecutive failed runs of a job at a post"""
+        key = (job_key, post_id)
+        if key in self._pending_attempts:
+            return self._pending_attempts[key][0]
+        row = self.connection.execute("SELECT attempts FROM post_attempts WHERE job_key = ? AND post_id = ?",
+                                      key).fetchone()
+        return row[0] if row else 0
+
+    def count_failure(self, job_key: str, post_id: int, error: Optional[str]) -> int:
+        """Buffer one more failed attempt at a post and return the attempts so far"""
+        attempts = self.failed_attempts(job_key, post_id) + 1
+        self._pending_attempts[(job_key, post_id)] = (attempts, error)
+        return attempts
+
+    def clear_failures(self, job_key: str, post_id: int):
+        """Forget a post's failed attempts, once it succeeds or is given up on"""
+        if self.failed_attempts(job_key, post_id):
+            self._pending_attempts[(job_key, post_id)] = (0, None)
+
+    @property
+    def needs_flush(self) -> bool:
+        return len(self._pending) + len(self._pending_fingerprints) + len(self._pending_attempts) >= self.batch_size
+
+    def flush(self, job_key: Optional[str] = None, position: Any = None):
+        """Write buffered submissions, and optionally a job checkpoint, in one transaction"""
+        rows = [
+            (s.post_id, s.url, key, bucket, s.status.value, s.archive_url, s.submitted_at.timestamp(),
+             s.completed_at.timestamp() if s.completed_at else None, s.error_message, s.retry_count)
+            for (key, bucket), s in self._pending.items()
+        ]
+        with self.connection:
+            self.connection.executemany("""
+                INSERT INTO submissions (post_id, url, normalized_url, bucket, status, archive_url,
+                                         submitted_at, completed_at, error_message, retry_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (normalized_url, bucket) DO UPDATE SET
+                    status = excluded.status,
+                    archive_url = COALESCE(excluded.archive_url, submissions.archive_url),
+                    completed_at = excluded.completed_at,
+                    error_message = excluded.error_message,
+                    retry_count = submissions.retry_count + excluded.retry_count + 1
+            """, rows)
+            now = time.time()
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO fingerprints (normalized_url, etag, last_modified, content_hash, archive_url, "
+                "updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, f["etag"], f["last_modified"], f["content_hash"], f["archive_url"], now)
+                 for key, f in self._pending_fingerprints.items()]
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO post_attempts (job_key, post_id, attempts, error_message, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(key[0], key[1], attempts, error, now)
+                 for key, (attempts, error) in self._pending_attempts.items() if attempts]
+            )
+            self.connection.executemany(
+                "DELETE FROM post_attempts WHERE job_key = ? AND post_id = ?",
+                [key for key, (attempts, _) in self._pending_attempts.items() if not attempts]
+            )
+            if job_key is not None and position is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO checkpoints (job_key, position, updated_at) VALUES (?, ?, ?)",
+                    (job_key, json.dumps(position), time.time())
+                )
+        self._pending.clear()
+        self._pending_fingerprints.clear()
+        self._pending_attempts.clear()
+        self.stats["flushes"] += 1
+
+    def get_checkpoint(self, job_key: str) -> Any:
+        row = self.connection.execute("SELECT position FROM checkpoints WHERE job_key = ?", (job_key,)).fetchone()
+        return json.loads(row["position"]) if row else None
+
+    def clear_checkpoint(self, job_key: str):
+        with self.connection:
+            self.connection.execute("DELETE FROM checkpoints WHERE job_key = ?", (job_key,))
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> ArchiveSubmission:
+        return ArchiveSubmission(
+            post_id=row["post_id"],
+            url=row["url"],
+            archive_url=row["archive_url"],
+            status=SubmissionStatus(row["status"]),
+            submitted_at=datetime.fromtimestamp(row["submitted_at"]),
+            completed_at=datetime.fromtimestamp(row["completed_at"]) if row["completed_at"] else None,
+            error_message=row["error_message"],
+            retry_count=row["retry_count"]
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.connection.execute("SELECT COUNT(*) FROM submissions").fetchone()[0]
+        return dict(self.stats, path=str(self.path), entries=total, pending=len(self._pending),
+                    dedupe_window=self.dedupe_window)
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight call"""
+
+    def __init__(self):
+        self._calls: Dict[Any, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Any, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func for key, or wait for the call already running for it"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so one cancelled caller does not cancel the shared call
+        return await asyncio.shield(task)
+
+class AvailabilityCache:
+    """TTL + LRU cache of Wayback availability answers
+    
+    "Archived" and "not archived" answers expire after separate TTLs,
+    the least recently used entry is evicted once max_entries is reached,
+    and concurrent lookups of one URL share a single upstream request.
+    With persist_path set the cache is saved to disk as JSON and reloaded
+    on start so warm restarts keep their hit rate.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_CACHE_TTL, negative_ttl: float = DEFAULT_NEGATIVE_CACHE_TTL,
+                 max_entries: int = DEFAULT_AVAILABILITY_CACHE_SIZE, persist_path: Optional[Path] = None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max(1, max_entries)
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._flight = SingleFlight()
+        self._dirty = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        if persist_path:
+            self.load()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a fresh cached value, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a value with the TTL matching its answer"""
+        ttl = self.ttl if value.get("available") else self.negative_ttl
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        self._dirty += 1
+        if self.persist_path and self._dirty >= CACHE_SAVE_INTERVAL:
+            self.save()
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]):
+        """Return (value, hit), fetching once per key on a miss"""
+        value = self.get(key)
+        if value is not None:
+            self.stats["hits"] += 1
+            return value, True
+
+        self.stats["misses"] += 1
+
+        async def fetch_and_store():
+            fetched = await fetch()
+            self.put(key, fetched)
+            return fetched
+
+        return await self._flight.do(key, fetch_and_store), False
+
+    def load(self):
+        """Load unexpired entries from the persistence file"""
+        try:
+            with open(self.persist_path, 'r') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load availability cache {self.persist_path}: {e}")
+            return
+
+        now = time.time()
+        for key, (expires_at, value) in entries:
+            if expires_at > now:
+                self._entries[key] = (expires_at, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        """Write the cache to the persistence file atomically"""
+        if not self.persist_path:
+            return
+        try:
+            temp_path = Path(f"{self.persist_path}.tmp")
+            with open(temp_path, 'w') as f:
+                json.dump([[key, list(entry)] for key, entry in self._entries.items()], f)
+            os.replace(temp_path, self.persist_path)
+            self._dirty = 0
+        except OSError as e:
+            logger.warning(f"Could not save availability cache {self.persist_path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return dict(
+            self.stats,
+            coalesced=self._flight.coalesced,
+            entries=len(self._entries),
+            max_entries=self.max_entries,
+            hit_rate=round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            persistent=bool(self.persist_path)
         )
+
+class QueueStatusCache:
+    """Short-TTL cache of queue status snapshots with versions for pollers
+    
+    Concurrent callers that miss share one refresh. Each key keeps its
+    last few snapshots under increasing version numbers (a refresh that
+    changes nothing keeps the version), so a poller that sends the
+    version it last saw can be answered with only what changed since.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_QUEUE_STATUS_TTL, history: int = QUEUE_STATUS_HISTORY):
+        self.ttl = ttl
+        self.history = max(1, history)
+        self._entries: Dict[Any, Dict[str, Any]] = {}
+        self._flight = SingleFlight()
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0}
+
+    def get(self, key: Any) -> Optional[tuple]:
+        """Get a fresh (version, snapshot), or None"""
+        entry = self._entries.get(key)
+        if entry is None or entry["expires_at"] <= time.monotonic():
+            return None
+        return entry["versions"][-1]
+
+    def put(self, key: Any, snapshot: Dict[str, Any]) -> tuple:
+        """Store a snapshot, bumping the version only if it differs from the last"""
+        entry = self._entries.setdefault(key, {"versions": deque(maxlen=self.history), "expires_at": 0.0})
+        versions = entry["versions"]
+        if not versions or versions[-1][1] != snapshot:
+            versions.append((versions[-1][0] + 1 if versions else 1, snapshot))
+        entry["expires_at"] = time.monotonic() + self.ttl
+        return versions[-1]
+
+    def previous(self, key: Any, version: int) -> Optional[Dict[str, Any]]:
+        """Snapshot stored under version, if still kept"""
+        for kept, snapshot in self._entries.get(key, {}).get("versions", ()):
+            if kept == version:
+                return snapshot
+        return None
+
+    async def get_or_fetch(self, key: Any, fetch: Callable[[], Awaitable[Dict[str, Any]]]):
+        """Return ((version, snapshot), hit), refreshing once per key on a miss"""
+        current = self.get(key)
+        if current is not None:
+            self.stats["hits"] += 1
+            return current, True
         
-    # IRC Configuration (disabled)
-    # self.irc_config = IRCConfig()
+        self.stats["misses"] += 1
+        
+        async def fetch_and_store():
+            snapshot = await fetch()
+            self.stats["refreshes"] += 1
+            return self.put(key, snapshot)
+        
+        return await self._flight.do(key, fetch_and_store), False
+
+    @staticmethod
+    def diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        """Fields of new that differ from old; flat count maps only list changed keys (0 if gone)"""
+        changes = {}
+        for field_name, value in new.items():
+            before = old.get(field_name)
+            if value == before:
+                continue
+            if isinstance(value, dict) and isinstance(before, dict) and \
+                    all(isinstance(v, int) for v in itertools.chain(value.values(), before.values())):
+                changes[field_name] = {k: value.get(k, 0) for k in set(value) | set(before)
+                                       if value.get(k, 0) != before.get(k, 0)}
+            else:
+                changes[field_name] = value
+        return changes
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, coalesced=self._flight.coalesced, entries=len(self._entries), ttl=self.ttl)
+
+class AdaptiveRateLimiter:
+    """Process-wide token bucket plus concurrency limit for Archive.org calls
+    
+    Tokens refill at the configured rate. 429/503 responses halve the rate
+    and pause every caller until any Retry-After has passed, then each
+    success regains a fraction of the configured rate.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, max_concurrent: int = DEFAULT_MAX_CONCURRENT_REQUESTS):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_concurrent = max(1, max_concurrent)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._in_flight = 0
+        self.stats = {"acquired": 0, "throttled_responses": 0, "total_wait": 0.0}
+
+    @classmethod
+    def from_delay(cls, delay: float, max_concurrent: int) -> "AdaptiveRateLimiter":
+        """Build a limiter allowing one request per delay seconds"""
+        return cls(1.0 / delay if delay > 0 else float("inf"), burst=max_concurrent,
+                   max_concurrent=max_concurrent)
+
+    def slot(self):
+        """Async context manager holding a concurrency slot and one token"""
+        return _RateLimiterSlot(self)
+
+    async def _acquire(self):
+        await self._semaphore.acquire()
+        self._in_flight += 1
+        start_time = time.monotonic()
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self._blocked_until:
+                        await asyncio.sleep(self._blocked_until - now)
+                        continue
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+        except BaseException:
+            self._release()
+            raise
+        self.stats["acquired"] += 1
+        self.stats["total_wait"] += time.monotonic() - start_time
+
+    def _release(self):
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    def _refill(self, now: float):
+        if self.rate == float("inf"):
+            self._tokens = float(self.burst)
+        else:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def record(self, status: int, retry_after: Optional[float] = None):
+        """Adapt the rate to a response status"""
+        if status in THROTTLE_STATUSES:
+            self.stats["throttled_responses"] += 1
+            floor = self.base_rate * RATE_LIMIT_MIN_FACTOR
+            self.rate = max(floor, min(self.rate, self.base_rate) / 2)
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+            self._tokens = 0.0
+            logger.warning(f"Archive.org throttled request ({status}); rate lowered to {self.rate:.3f}/s")
+        elif status < 400 and self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * RATE_LIMIT_RECOVERY_STEP)
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Parse a Retry-After header given in seconds or as an HTTP date"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            configured_rate=self.base_rate,
+            current_rate=round(self.rate, 4),
+            burst=self.burst,
+            max_concurrent=self.max_concurrent,
+            in_flight=self._in_flight,
+            paused_for=round(max(0.0, self._blocked_until - time.monotonic()), 3)
+        )
+
+class _RateLimiterSlot:
+    def __init__(self, limiter: AdaptiveRateLimiter):
+        self.limiter = limiter
+
+    async def __aenter__(self):
+        await self.limiter._acquire()
+        return self.limiter
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.limiter._release()
+
+class WaybackClient:
+    """Pooled async client for the Wayback Machine save and availability APIs
+    
+    One aiohttp session is shared by every call so connections are kept
+    alive and DNS lookups are cached. With S3 credentials submissions use
+    the authenticated Save Page Now API (like Archive_API::submit_authenticated),
+    otherwise the anonymous save endpoint (like Archive_API::submit_simple).
+    Endpoints come from configuration so a local stand-in can be used.
+    """
+
+    def __init__(self, save_url: str, availability_url: str, access_key: str = "", secret_key: str = "",
+                 timeout: float = DEFAULT_ARCHIVE_TIMEOUT, pool_size: int = DEFAULT_HTTP_POOL_SIZE,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None, max_retries: int = DEFAULT_MAX_RETRIES,
+                 cdx_url: str = DEFAULT_CDX_URL):
+        self.save_url = save_url
+        self.availability_url = availability_url
+        self.cdx_url = cdx_url
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(float("inf"))
+        self.max_retries = max_retries
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.stats = {"requests": 0, "errors": 0, "retries": 0, "total_time": 0.0}
+
+    @property
+    def authenticated(self) -> bool:
+        return bool(self.access_key and self.secret_key)
+
+    def session(self) -> aiohttp.ClientSession:
+        """Get the shared session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": USER_AGENT}
+            )
+        return self._session
+
+    async def request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        """Make a rate limited HTTP request and return status, headers, final URL and body
+        
+        Throttled (429/503) responses and network errors are retried up to
+        max_retries times; the last response or error is returned or raised.
+        """
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+            try:
+                async with self.rate_limiter.slot():
+                    response = await self._send(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+                continue
+
+            retry_after = AdaptiveRateLimiter.parse_retry_after(response["headers"].get("Retry-After"))
+            self.rate_limiter.record(response["status"], retry_after)
+            if response["status"] not in THROTTLE_STATUSES or attempt >= self.max_retries:
+                return response
+
+    async def stream_lines(self, url: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream a text response line by line under the rate limiter
+        
+        Throttled responses and connection errors are retried as long as
+        no line has been yielded yet.
+        """
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+            yielded = False
+            self.stats["requests"] += 1
+            try:
+                async with self.rate_limiter.slot():
+                    async with self.session().get(url, params=params) as response:
+                        retry_after = AdaptiveRateLimiter.parse_retry_after(response.headers.get("Retry-After"))
+                        self.rate_limiter.record(response.status, retry_after)
+                        if response.status in THROTTLE_STATUSES and attempt < self.max_retries:
+                            continue
+                        if response.status != 200:
+                            raise RuntimeError(f"Request to {url} failed with code: {response.status}")
+                        async for line in response.content:
+                            yielded = True
+                            yield line.decode("utf-8", errors="replace").rstrip("\r\n")
+                        return
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.stats["errors"] += 1
+                if yielded or attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+    async def latest_captures(self, prefix: str, match_type: str = "prefix",
+                              limit: Optional[int] = None) -> AsyncIterator[tuple]:
+        """Stream (original URL, timestamp) pairs of successful captures from the CDX index
+        
+        An exact lookup asks for the latest capture only. Prefix lookups
+        return captures sorted by URL, at most limit lines.
+        """
+        params = {
+            "url": prefix,
+            "matchType": match_type,
+            "fl": "original,timestamp",
+            "filter": "statuscode:200"
+        }
+        if match_type == "exact":
+            params.update(fastLatest="true", limit="-1")
+        elif limit:
+            params["limit"] = str(limit)
+        async for line in self.stream_lines(self.cdx_url, params):
+            fields = line.split(" ")
+            if len(fields) == 2:
+                yield fields[0], fields[1]
+
+    async def _send(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        start_time = time.monotonic()
+        self.stats["requests"] += 1
+        try:
+            async with self.session().request(method, url, **kwargs) as response:
+                body = await response.text()
+                return {
+                    "status": response.status,
+                    "headers": response.headers,
+                    "url": str(response.url),
+                    "body": body
+                }
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["total_time"] += time.monotonic() - start_time
+
+    async def submit(self, url: str, capture_all: bool = True, capture_outlinks: bool = True) -> Dict[str, Any]:
+        """Submit a URL to Save Page Now"""
+        try:
+            if self.authenticated:
+                response = await self.request(
+                    "POST", self.save_url,
+                    data={
+                        "url": url,
+                        "capture_all": "1" if capture_all else "0",
+                        "capture_outlinks": "1" if capture_outlinks else "0"
+                    },
+                    headers={
+                        "Authorization": f"LOW {self.access_key}:{self.secret_key}",
+                        "Accept": "application/json"
+                    },
+                    allow_redirects=False
+                )
+            else:
+                response = await self.request("GET", self.save_url + url, allow_redirects=False)
+        except asyncio.TimeoutError:
+            return {"success": False, "error": "Archive.org request timed out", "error_type": "timeout"}
+        except aiohttp.ClientError as e:
+            return {"success": False, "error": str(e), "error_type": "network_error"}
+
+        status = response["status"]
+        result = {
+            "response_code": status,
+            "method": "authenticated" if self.authenticated else "simple"
+        }
+
+        if 200 <= status < 400:
+            result["success"] = True
+            result["archive_url"] = self._extract_archive_url(response, url)
+            if self.authenticated:
+                try:
+                    result["job_id"] = json.loads(response["body"]).get("job_id")
+                except (ValueError, AttributeError):
+                    pass
+            return result
+
+        result.update({
+            "success": False,
+            "error": f"Archive submission failed with code: {status}",
+            "error_type": "api_error"
+        })
+        return result
+
+    async def check_availability(self, url: str) -> Dict[str, Any]:
+        """Look up the closest capture of a URL"""
+        response = await self.request("GET", self.availability_url, params={"url": url})
+        if response["status"] != 200:
+            raise RuntimeError(f"Availability check failed with code: {response['status']}")
+
+        closest = (json.loads(response["body"]).get("archived_snapshots") or {}).get("closest") or {}
+        if closest.get("available"):
+            return {
+                "available": True,
+                "archive_url": closest.get("url"),
+                "timestamp": closest.get("timestamp")
+            }
+        return {"available": False}
+
+    def _extract_archive_url(self, response: Dict[str, Any], url: str) -> str:
+        """Find the capture URL in a save response"""
+        for header in ("Content-Location", "Location"):
+            location = response["headers"].get(header)
+            if location:
+                return urljoin(response["url"], location)
+        # Construct likely archive URL as fallback
+        return f"https://web.archive.org/web/{time.strftime('%Y%m%d%H%M%S', time.gmtime())}/{url}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, mode="authenticated" if self.authenticated else "simple")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+class ChangeDetector:
+    """Decide whether a page changed since its last capture
+    
+    Pages are fetched from the site itself over a pooled session with
+    conditional headers from the stored fingerprint. A 304 means unchanged;
+    otherwise the body is hashed with volatile markup (comments, nonces,
+    timestamps, whitespace) removed and compared with the stored hash. Any
+    fetch problem counts as changed so detection never blocks archiving.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_CHANGE_DETECTION_TIMEOUT, pool_size: int = DEFAULT_HTTP_POOL_SIZE):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.stats = {"checks": 0, "not_modified": 0, "same_hash": 0, "changed": 0, "errors": 0}
+
+    def session(self) -> aiohttp.ClientSession:
+        """Get the shared session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": USER_AGENT}
+            )
+        return self._session
+
+    @staticmethod
+    def content_hash(body: str) -> str:
+        """Hash a page body with volatile markup stripped"""
+        for pattern, replacement in VOLATILE_MARKUP_PATTERNS:
+            body = pattern.sub(replacement, body)
+        return hashlib.sha256(body.strip().encode("utf-8")).hexdigest()
+
+    async def check(self, url: str, previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Fetch url and return its fingerprint with a `changed` flag"""
+        self.stats["checks"] += 1
+        headers = {}
+        if previous:
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
+        
+        try:
+            async with self.session().get(url, headers=headers) as response:
+                if response.status == 304 and previous:
+                    self.stats["not_modified"] += 1
+                    return dict(previous, changed=False)
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                # read(n) returns only what is buffered, so collect chunks up to the cap
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(FINGERPRINT_CHUNK_SIZE):
+                    body += chunk[:MAX_FINGERPRINT_BODY - len(body)]
+                    if len(body) >= MAX_FINGERPRINT_BODY:
+                        break
+                fingerprint = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "content_hash": self.content_hash(body.decode(response.charset or "utf-8", "replace"))
+                }
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Change detection failed for {url}, assuming changed: {e}")
+            return {"changed": True}
+        
+        if previous and previous.get("content_hash") == fingerprint["content_hash"]:
+            self.stats["same_hash"] += 1
+            return dict(fingerprint, archive_url=previous.get("archive_url"), changed=False)
+        self.stats["changed"] += 1
+        return dict(fingerprint, changed=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, submissions_saved=self.stats["not_modified"] + self.stats["same_hash"])
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+class WPCLIWorkerError(Exception):
+    """Raised when a WP-CLI worker cannot serve a request"""
+
+def parse_size(value: str, fallback: int = 0) -> int:
+    """Parse a PHP style size string such as 256M into bytes"""
+    match = re.match(r"^\s*(\d+)\s*([KMG]?)B?\s*$", str(value), re.IGNORECASE)
+    if not match:
+        return fallback
+    multiplier = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}[match.group(2).upper()]
+    return int(match.group(1)) * multiplier
+
+def wp_cli_command_string(args: List[str]) -> Optional[str]:
+    """Quote WP-CLI arguments for WP_CLI::runcommand
+    
+    Returns None when an argument cannot be represented safely by WP-CLI's
+    own argument parser, in which case the caller should launch `wp` instead.
+    """
+    parts = []
+    for arg in args:
+        if arg and not re.search(r"[\s\"'\\]", arg):
+            parts.append(arg)
+            continue
+        if "\\" in arg or ('"' in arg and "'" in arg):
+            return None
+        quote = "'" if '"' in arg else '"'
+        if arg.startswith("--") and "=" in arg:
+            key, value = arg.split("=", 1)
+            parts.append(f"{key}={quote}{value}{quote}")
+        else:
+            parts.append(f"{quote}{arg}{quote}")
+    return " ".join(parts)
+
+class WPCLIWorker:
+    """Long-lived PHP process with WordPress loaded that serves WP-CLI commands"""
+
+    def __init__(self, wp_cli_path: str, wp_path: str, script_path: Path):
+        self.wp_cli_path = wp_cli_path
+        self.wp_path = wp_path
+        self.script_path = script_path
+        self.process = None
+        self.requests_served = 0
+        self.memory = 0
+        self.started_at = None
+        self._stderr_tail = deque(maxlen=20)
+        self._stderr_task = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    @property
+    def description(self) -> str:
+        return f"WP-CLI worker for {self.wp_path}"
+
+    def _command(self) -> List[str]:
+        return [self.wp_cli_path, "eval-file", str(self.script_path)]
+
+    async def start(self, timeout: float = WP_WORKER_START_TIMEOUT):
+        """Launch the worker and wait for WordPress to finish loading"""
+        if os.name == "nt":
+            group_kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group_kwargs = {"start_new_session": True}
+
+        self.process = await asyncio.create_subprocess_exec(
+            *self._command(),
+            cwd=self.wp_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=16 * 1024 * 1024,
+            **group_kwargs
+        )
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+
+        try:
+            ready = await asyncio.wait_for(self._read_frame(), timeout)
+        except Exception as e:
+            await self.stop()
+            raise WPCLIWorkerError(f"Worker failed to start: {e}")
+
+        self.memory = ready.get("memory", 0)
+        self.started_at = time.time()
+        logger.info(f"{self.description} ready (pid {ready.get('pid')})")
+
+    async def execute(self, command: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run one WP-CLI command string inside the worker"""
+        return await self._request({"command": command}, timeout)
+
+    async def _request(self, request: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send one framed request and wait for its response"""
+        if not self.alive:
+            raise WPCLIWorkerError("Worker is not running")
+
+        payload = json.dumps(request).encode("utf-8")
+        self.process.stdin.write(WP_WORKER_FRAME_MARKER + str(len(payload)).encode() + b"\n" + payload)
+        await self.process.stdin.drain()
+
+        response = await asyncio.wait_for(self._read_frame(), timeout or None)
+        self.requests_served += 1
+        self.memory = response.get("memory", self.memory)
+        return response
+
+    async def _read_frame(self) -> Dict[str, Any]:
+        """Read the next framed message, skipping any stray output"""
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                raise WPCLIWorkerError(f"Worker exited; {' '.join(self._stderr_tail)}")
+            if line.startswith(WP_WORKER_FRAME_MARKER):
+                length = int(line[len(WP_WORKER_FRAME_MARKER):].strip())
+                return json.loads(await self.process.stdout.readexactly(length))
+
+    async def _drain_stderr(self):
+        while True:
+            line = await self.process.stderr.readline()
+            if not line:
+                break
+            self._stderr_tail.append(line.decode("utf-8", errors="replace").strip())
+
+    async def stop(self):
+        """Stop the worker, killing it if it does not exit promptly"""
+        if self.process is None:
+            return
+        if self.alive:
+            try:
+                self.process.stdin.close()
+                await asyncio.wait_for(self.process.wait(), 5)
+            except (asyncio.TimeoutError, ConnectionResetError, BrokenPipeError):
+                try:
+                    if os.name == "nt":
+                        self.process.kill()
+                    else:
+                        os.killpg(self.process.pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+                await self.process.wait()
+        if self._stderr_task:
+            self._stderr_task.cancel()
+
+class WPCLIWorkerPool:
+    """Pool of warm WP-CLI workers for one WordPress installation
+    
+    Workers are recycled after max_requests commands or once their memory
+    grows past max_memory, restarted when they die, and the pool falls back
+    to launching plain `wp` whenever no worker can be used.
+    """
+
+    def __init__(self, wp_path: str, runner: CommandRunner, wp_cli_path: str = "wp",
+                 size: int = DEFAULT_WP_WORKER_POOL_SIZE,
+                 max_requests: int = DEFAULT_WP_WORKER_MAX_REQUESTS,
+                 max_memory: int = parse_size(DEFAULT_WP_WORKER_MAX_MEMORY)):
+        self.wp_path = wp_path
+        self.runner = runner
+        self.wp_cli_path = wp_cli_path
+        self.size = max(1, size)
+        self.max_requests = max_requests
+        self.max_memory = max_memory
+        self._slots = asyncio.Semaphore(self.size)
+        self._idle: List[WPCLIWorker] = []
+        self._worker_count = 0
+        self._unavailable_until = 0.0
+        self.stats = {"worker_requests": 0, "fallback_requests": 0, "workers_started": 0,
+                      "workers_recycled": 0, "worker_failures": 0}
+
+    @staticmethod
+    def script_path() -> Path:
+        """Write the PHP worker script to a temp file and return its path"""
+        return php_script_path("wp-cli-worker", WP_WORKER_SCRIPT)
+
+    async def run(self, args: List[str], timeout: Optional[float] = None) -> CommandResult:
+        """Run a WP-CLI command on a warm worker, falling back to plain `wp`"""
+        command = wp_cli_command_string(args)
+        worker = None
+        if command is not None and time.monotonic() >= self._unavailable_until:
+            worker = await self._acquire()
+
+        if worker is None:
+            return await self._fallback(args, timeout)
+
+        start_time = time.monotonic()
+        try:
+            response = await worker.execute(command, timeout)
+        except asyncio.CancelledError:
+            await self._discard(worker)
+            raise
+        except asyncio.TimeoutError:
+            await self._discard(worker)
+            return CommandResult(
+                args=[self.wp_cli_path] + args, returncode=-1, stdout="",
+                stderr=f"Command timed out after {timeout} seconds",
+                duration=time.monotonic() - start_time, timed_out=True
+            )
+        except Exception as e:
+            logger.warning(f"WP-CLI worker failed, falling back to wp: {e}")
+            self.stats["worker_failures"] += 1
+            await self._discard(worker)
+            return await self._fallback(args, timeout)
+
+        await self._release(worker)
+        self.stats["worker_requests"] += 1
+
+        result = CommandResult(
+            args=[self.wp_cli_path] + args,
+            returncode=int(response.get("return_code", 1)),
+            stdout=response.get("stdout") or "",
+            stderr=response.get("stderr") or "",
+            duration=time.monotonic() - start_time
+        )
+        self.runner._record(result)
+        return result
+
+    async def _fallback(self, args: List[str], timeout: Optional[float]) -> CommandResult:
+        self.stats["fallback_requests"] += 1
+        return await self.runner.run([self.wp_cli_path] + args, cwd=self.wp_path, timeout=timeout)
+
+    async def _acquire(self) -> Optional[WPCLIWorker]:
+        """Get an idle worker, starting one if none is warm"""
+        await self._slots.acquire()
+
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive:
+                return worker
+            self._worker_count -= 1
+
+        worker = WPCLIWorker(self.wp_cli_path, self.wp_path, self.script_path())
+        try:
+            await worker.start()
+        except (WPCLIWorkerError, OSError) as e:
+            self._slots.release()
+            self.stats["worker_failures"] += 1
+            self._unavailable_until = time.monotonic() + WP_WORKER_RETRY_DELAY
+            logger.warning(f"WP-CLI worker pool unavailable for {self.wp_path}: {e}")
+            return None
+        except asyncio.CancelledError:
+            self._slots.release()
+            raise
+
+        self._worker_count += 1
+        self.stats["workers_started"] += 1
+        return worker
+
+    async def _release(self, worker: WPCLIWorker):
+        """Return a worker to the pool, recycling it when it is worn out"""
+        if worker.requests_served >= self.max_requests or worker.memory >= self.max_memory:
+            self.stats["workers_recycled"] += 1
+            await self._discard(worker)
+            return
+        self._idle.append(worker)
+        self._slots.release()
+
+    async def _discard(self, worker: WPCLIWorker):
+        self._worker_count -= 1
+        self._slots.release()
+        await worker.stop()
+
+    async def close(self):
+        """Stop all idle workers"""
+        while self._idle:
+            self._worker_count -= 1
+            await self._idle.pop().stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, workers=self._worker_count, idle=len(self._idle))
+
+def wp_config_credentials(wp_path: Path) -> Optional[Dict[str, str]]:
+    """Read DB_* constants and $table_prefix from a site's wp-config.php
+    
+    WordPress also looks for wp-config.php one directory above the site.
+    Constants set from expressions (getenv() etc.) are not evaluated, in
+    which case None is returned and the caller uses [database] instead.
+    """
+    for candidate in (wp_path / "wp-config.php", wp_path.parent / "wp-config.php"):
+        if candidate.is_file():
+            break
+    else:
+        return None
+    
+    source = candidate.read_text(encoding="utf-8", errors="replace")
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = "\n".join(line for line in source.splitlines() if not line.lstrip().startswith(("//", "#")))
+    
+    values = {name: value.replace("\\'", "'").replace('\\"', '"')
+              for name, _, value in WP_CONFIG_DEFINE.findall(source)}
+    if not {"DB_NAME", "DB_USER", "DB_HOST"} <= values.keys():
+        return None
+    prefix = WP_CONFIG_TABLE_PREFIX.search(source)
+    values["table_prefix"] = prefix.group(2) if prefix else "wp_"
+    return values
+
+class WordPressDatabase:
+    """Pooled direct access to the WordPress database
+    
+    Connections come from a SQLAlchemy pool and blocking calls run in a
+    worker thread via run(). Any SQLAlchemy URL can be used, which lets a
+    SQLite file stand in for MySQL when testing offline. The engine (and
+    its DB driver) is loaded on first use.
+    """
+
+    def __init__(self, url: Union[str, URL], pool_size: int = DEFAULT_DB_POOL_SIZE, table_prefix: str = "wp_"):
+        self.url = make_url(url)
+        self.pool_size = pool_size
+        self.table_prefix = table_prefix
+        self.dialect = self.url.get_backend_name()
+        self._engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            options = {"pool_pre_ping": True}
+            if self.dialect != "sqlite":
+                options.update(pool_size=self.pool_size, max_overflow=self.pool_size, pool_recycle=3600)
+            self._engine = create_engine(self.url, **options)
+        return self._engine
+
+    @staticmethod
+    def resolve_url(config: "ServerConfig", wp_path: Optional[Path] = None) -> tuple:
+        """Get (url, table_prefix) from [database] url, the site's wp-config.php, or [database] settings"""
+        url = config.get("database", "url", "")
+        if url:
+            return make_url(url), config.get("database", "table_prefix", "wp_")
+        
+        credentials = wp_config_credentials(wp_path) if wp_path is not None else None
+        if credentials:
+            # DB_HOST may be "host", "host:port" or "host:/path/to/socket"
+            host, _, port = credentials["DB_HOST"].partition(":")
+            query = {"charset": credentials.get("DB_CHARSET") or "utf8mb4"}
+            if port.startswith("/"):
+                query["unix_socket"] = port
+                port = ""
+            url = URL.create(
+                "mysql+pymysql",
+                username=credentials["DB_USER"],
+                password=credentials.get("DB_PASSWORD", ""),
+                host=host or "localhost",
+                port=int(port) if port else None,
+                database=credentials["DB_NAME"],
+                query=query
+            )
+            return url, credentials["table_prefix"]
+        
+        url = URL.create(
+            "mysql+pymysql",
+            username=config.get("database", "username", "root"),
+            password=config.get("database", "password", ""),
+            host=config.get("database", "host", "localhost"),
+            port=config.getint("database", "port", 3306),
+            database=config.get("database", "database", "wordpress"),
+            query={"charset": config.get("database", "charset", "utf8mb4")}
+        )
+        return url, config.get("database", "table_prefix", "wp_")
+
+    def query(self, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Run a parameterized query and return its rows as dicts"""
+        with self.engine.connect() as connection:
+            return [dict(row) for row in connection.execute(text(sql), params or {}).mappings()]
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Run a blocking database function in a worker thread"""
+        return await asyncio.to_thread(func, *args)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"dialect": self.dialect, "table_prefix": self.table_prefix,
+                "pool": self._engine.pool.status() if self._engine else None}
+
+    def close(self):
+        if self._engine is not None:
+            self._engine.dispose()
+
+class PartitionLeases:
+    """Hash-partition leases that let several hosts share one archive queue
+    
+    Queue rows belong to partition post_id % partitions. A worker only
+    leases rows of partitions it owns, and ownership is a row in the lease
+    table with an owner, an expiry and a fencing token that is bumped on
+    every claim. Heartbeats extend the expiry; a worker that stops
+    heartbeating loses its partitions once they expire and another worker
+    claims them, resetting their orphaned 'processing' rows. Write-backs are
+    fenced on the token, so each row is submitted and recorded at most once
+    per lease. Workers also record their throughput in the worker table.
+    
+    Expiry uses each host's wall clock, so hosts must keep their clocks in
+    sync to well within the lease TTL.
+    """
+
+    def __init__(self, db: WordPressDatabase, partitions: int = DEFAULT_QUEUE_PARTITIONS,
+                 ttl: float = DEFAULT_QUEUE_LEASE_TTL, lease_table: str = DEFAULT_LEASE_TABLE,
+                 worker_table: str = DEFAULT_WORKER_TABLE, owner: Optional[str] = None):
+        for table in (lease_table, worker_table):
+            if not re.fullmatch(r"\w+", table):
+                raise ValueError(f"Invalid lease table name: {table}")
+        self.db = db
+        self.partitions = max(1, partitions)
+        self.ttl = max(1.0, ttl)
+        self.lease_table = lease_table
+        self.worker_table = worker_table
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{os.urandom(2).hex()}"
+        self.started_at = time.time()
+        self.held: Dict[int, int] = {}  # partition -> fencing token
+        self.expires_at = 0.0
+        self._schema_ready = False
+        self.stats = {"claimed": 0, "released": 0, "lost": 0, "heartbeats": 0, "fenced_writes": 0}
+
+    def _ensure_schema(self, connection):
+        if self._schema_ready:
+            return
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {self.lease_table} ("
+            f"partition_id INT NOT NULL PRIMARY KEY, owner VARCHAR(191) NULL, "
+            f"token BIGINT NOT NULL DEFAULT 0, expires_at DOUBLE NOT NULL DEFAULT 0)"
+        ))
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {self.worker_table} ("
+            f"worker_id VARCHAR(191) NOT NULL PRIMARY KEY, started_at DOUBLE NOT NULL, "
+            f"heartbeat_at DOUBLE NOT NULL, partitions TEXT, leased BIGINT NOT NULL DEFAULT 0, "
+            f"completed BIGINT NOT NULL DEFAULT 0, failed BIGINT NOT NULL DEFAULT 0)"
+        ))
+        ignore = "INSERT OR IGNORE" if self.db.dialect == "sqlite" else "INSERT IGNORE"
+        connection.execute(text(f"{ignore} INTO {self.lease_table} (partition_id) VALUES (:partition)"),
+                           [{"partition": partition} for partition in range(self.partitions)])
+        self._schema_ready = True
+
+    def _record_worker(self, connection, now: float, stats: Dict[str, Any], active: bool = True):
+        # partitions is NULL while the worker is idle, so it gets no fair share
+        partitions = ",".join(map(str, sorted(self.held))) if active else None
+        params = {"worker": self.owner, "now": now, "partitions": partitions,
+                  "leased": stats.get("leased", 0), "completed": stats.get("completed", 0),
+                  "failed": stats.get("failed", 0)}
+        updated = connection.execute(text(
+            f"UPDATE {self.worker_table} SET heartbeat_at = :now, partitions = :partitions, leased = :leased, "
+            f"completed = :completed, failed = :failed WHERE worker_id = :worker"
+        ), params).rowcount
+        if not updated:
+            connection.execute(text(
+                f"INSERT INTO {self.worker_table} (worker_id, started_at, heartbeat_at, partitions, leased, "
+                f"completed, failed) VALUES (:worker, :started, :now, :partitions, :leased, :completed, :failed)"
+            ), dict(params, started=self.started_at))
+
+    def renew(self, stats: Dict[str, Any]) -> Dict[int, int]:
+        """Heartbeat: extend unexpired leases and drop the ones that were lost"""
+        now = time.time()
+        expires_at = now + self.ttl
+        with self.db.engine.begin() as connection:
+            self._ensure_schema(connection)
+            if self.held:
+                connection.execute(text(
+                    f"UPDATE {self.lease_table} SET expires_at = :expires WHERE owner = :owner "
+                    f"AND partition_id IN :partitions AND expires_at >= :now"
+                ).bindparams(bindparam("partitions", expanding=True)),
+                    {"expires": expires_at, "owner": self.owner, "partitions": list(self.held), "now": now})
+            owned = {row.partition_id: row.token for row in connection.execute(text(
+                f"SELECT partition_id, token FROM {self.lease_table} WHERE owner = :owner AND expires_at = :expires"
+            ), {"owner": self.owner, "expires": expires_at})}
+            lost = [partition for partition, token in self.held.items() if owned.get(partition) != token]
+            for partition in lost:
+                del self.held[partition]
+            self.stats["lost"] += len(lost)
+            self.expires_at = expires_at
+            self._record_worker(connection, now, stats)
+        self.stats["heartbeats"] += 1
+        if lost:
+            logger.warning(f"Queue worker {self.owner} lost partitions {sorted(lost)}")
+        return self.held
+
+    def rebalance(self, stats: Dict[str, Any]) -> List[int]:
+        """Renew, then claim or release partitions toward a fair share; returns newly claimed partitions"""
+        self.renew(stats)
+        now = time.time()
+        claimed = []
+        with self.db.engine.begin() as connection:
+            live = connection.execute(text(
+                f"SELECT COUNT(*) FROM {self.worker_table} WHERE heartbeat_at >= :since AND partitions IS NOT NULL"
+            ), {"since": now - self.ttl}).scalar() or 1
+            share = -(-self.partitions // live)
+            
+            if len(self.held) > share:
+                extra = sorted(self.held)[share:]
+                connection.execute(text(
+                    f"UPDATE {self.lease_table} SET owner = NULL, expires_at = 0 "
+                    f"WHERE owner = :owner AND partition_id IN :partitions"
+                ).bindparams(bindparam("partitions", expanding=True)), {"owner": self.owner, "partitions": extra})
+                for partition in extra:
+                    del self.held[partition]
+                self.stats["released"] += len(extra)
+            
+            if len(self.held) < share:
+                free = [row.partition_id for row in connection.execute(text(
+                    f"SELECT partition_id FROM {self.lease_table} WHERE partition_id < :partitions "
+                    f"AND (owner IS NULL OR expires_at < :now) ORDER BY partition_id"
+                ), {"partitions": self.partitions, "now": now})]
+                for partition in free[:share - len(self.held)]:
+                    # The conditional update is the claim; losing the race leaves rowcount 0
+                    if connection.execute(text(
+                        f"UPDATE {self.lease_table} SET owner = :owner, token = token + 1, expires_at = :expires "
+                        f"WHERE partition_id = :partition AND (owner IS NULL OR expires_at < :now)"
+                    ), {"owner": self.owner, "expires": self.expires_at, "partition": partition, "now": now}).rowcount:
+                        claimed.append(partition)
+                if claimed:
+                    for row in connection.execute(text(
+                        f"SELECT partition_id, token FROM {self.lease_table} WHERE partition_id IN :partitions"
+                    ).bindparams(bindparam("partitions", expanding=True)), {"partitions": claimed}):
+                        self.held[row.partition_id] = row.token
+                    self.stats["claimed"] += len(claimed)
+            
+            connection.execute(text(f"DELETE FROM {self.worker_table} WHERE heartbeat_at < :cutoff"),
+                               {"cutoff": now - WORKER_RECORD_RETENTION})
+        return claimed
+
+    def valid(self, partition: int, token: int) -> bool:
+        """Whether this worker still holds partition under token, by its own clock"""
+        return self.held.get(partition) == token and time.time() < self.expires_at
+
+    def fence(self, connection, tokens: Dict[int, int]) -> set:
+        """Return the partitions of tokens this worker still holds, locking their lease rows"""
+        if not tokens:
+            return set()
+        lock = "" if self.db.dialect == "sqlite" else " FOR UPDATE"
+        rows = connection.execute(text(
+            f"SELECT partition_id, token FROM {self.lease_table} WHERE owner = :owner "
+            f"AND expires_at >= :now AND partition_id IN :partitions{lock}"
+        ).bindparams(bindparam("partitions", expanding=True)),
+            {"owner": self.owner, "now": time.time(), "partitions": list(tokens)})
+        return {row.partition_id for row in rows if tokens[row.partition_id] == row.token}
+
+    def release(self, stats: Dict[str, Any]):
+        """Give up every partition so other workers can claim them at once"""
+        with self.db.engine.begin() as connection:
+            self._ensure_schema(connection)
+            if self.held:
+                connection.execute(text(
+                    f"UPDATE {self.lease_table} SET owner = NULL, expires_at = 0 "
+                    f"WHERE owner = :owner AND partition_id IN :partitions"
+                ).bindparams(bindparam("partitions", expanding=True)),
+                    {"owner": self.owner, "partitions": list(self.held)})
+                self.stats["released"] += len(self.held)
+            self.held = {}
+            self._record_worker(connection, time.time(), stats, active=False)
+
+    def workers(self) -> List[Dict[str, Any]]:
+        """Per-worker throughput from the worker table"""
+        now = time.time()
+        with self.db.engine.connect() as connection:
+            self._ensure_schema(connection)
+            connection.commit()
+            rows = connection.execute(text(
+                f"SELECT * FROM {self.worker_table} ORDER BY heartbeat_at DESC"
+            )).mappings().all()
+        workers = []
+        for row in rows:
+            uptime = max(row["heartbeat_at"] - row["started_at"], 1e-9)
+            workers.append(dict(
+                row,
+                alive=row["heartbeat_at"] >= now - self.ttl,
+                active=row["partitions"] is not None and row["heartbeat_at"] >= now - self.ttl,
+                rate_per_minute=round(row["completed"] * 60 / uptime, 2)
+            ))
+        return workers
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, owner=self.owner, partitions=self.partitions, held=sorted(self.held))
+
+class QueueWorker:
+    """Drain wp_swap_archive_queue from Python
+    
+    Each batch of pending rows is leased in one statement (FOR UPDATE SKIP
+    LOCKED plus an UPDATE to 'processing' on MySQL, UPDATE ... RETURNING
+    on SQLite), so concurrent consumers never lease the same row. Rows are
+    submitted concurrently and their outcomes written back with one
+    multi-row UPDATE per batch. Failed rows go back to 'pending' until
+    max_attempts is reached, as Archive_Queue does. With PartitionLeases
+    the worker only touches rows of the partitions it holds.
+    """
+
+    LEASE_COLUMNS = "id, post_id, post_url, post_type, attempts"
+
+    def __init__(self, db: WordPressDatabase, submit: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 table: str = DEFAULT_QUEUE_TABLE, batch_size: int = DEFAULT_QUEUE_BATCH_SIZE,
+                 concurrency: int = DEFAULT_MAX_CONCURRENT_REQUESTS, per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+                 max_attempts: int = DEFAULT_QUEUE_MAX_ATTEMPTS, leases: Optional[PartitionLeases] = None):
+        if not re.fullmatch(r"\w+", table):
+            raise ValueError(f"Invalid queue table name: {table}")
+        self.db = db
+        self.leases = leases
+        self.submit = submit
+        self.table = table
+        self.batch_size = max(1, batch_size)
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.max_attempts = max(1, max_attempts)
+        self._drain_lock = asyncio.Lock()
+        self.stats = {"batches": 0, "leased": 0, "completed": 0, "retried": 0, "failed": 0, "lease_lost": 0}
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _lease(self, limit: int, attempted_before: str) -> List[Dict[str, Any]]:
+        # Rows retried during the current drain wait for the next one
+        pending = "status = 'pending' AND (last_attempt IS NULL OR last_attempt < :before)"
+        params = {"now": self._now(), "before": attempted_before, "limit": limit}
+        tokens = dict(self.leases.held) if self.leases else {}
+        if self.leases:
+            if not tokens:
+                return []
+            pending += " AND post_id % :partitions IN :held"
+            params.update(partitions=self.leases.partitions, held=list(tokens))
+        pending += " ORDER BY created_at ASC, id ASC LIMIT :limit"
+        
+        with self.db.engine.begin() as connection:
+            if self.db.dialect == "sqlite":
+                statement = text(
+                    f"UPDATE {self.table} SET status = 'processing', last_attempt = :now "
+                    f"WHERE id IN (SELECT id FROM {self.table} WHERE {pending}) "
+                    f"RETURNING {self.LEASE_COLUMNS}"
+                )
+            else:
+                statement = text(
+                    f"SELECT {self.LEASE_COLUMNS} FROM {self.table} WHERE {pending} FOR UPDATE SKIP LOCKED"
+                )
+            if self.leases:
+                statement = statement.bindparams(bindparam("held", expanding=True))
+            rows = [dict(row) for row in connection.execute(statement, params).mappings().all()]
+            if rows and self.db.dialect != "sqlite":
+                connection.execute(text(
+                    f"UPDATE {self.table} SET status = 'processing', last_attempt = :now WHERE id IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)),
+                    {"now": self._now(), "ids": [row["id"] for row in rows]})
+        
+        for row in rows:
+            if self.leases:
+                row["partition"] = row["post_id"] % self.leases.partitions
+                row["token"] = tokens[row["partition"]]
+        return sorted(rows, key=lambda row: row["id"])
+
+    def _pending_elsewhere(self, attempted_before: str) -> bool:
+        with self.db.engine.connect() as connection:
+            return connection.execute(text(
+                f"SELECT COUNT(*) FROM {self.table} WHERE status IN ('pending', 'processing') "
+                f"AND (last_attempt IS NULL OR last_attempt < :before OR status = 'processing')"
+            ), {"before": attempted_before}).scalar() > 0
+
+    def _reset_orphans(self, partitions: List[int]):
+        """Return 'processing' rows of newly claimed partitions to 'pending'"""
+        with self.db.engine.begin() as connection:
+            reset = connection.execute(text(
+                f"UPDATE {self.table} SET status = 'pending' WHERE status = 'processing' "
+                f"AND post_id % :partitions IN :claimed"
+            ).bindparams(bindparam("claimed", expanding=True)),
+                {"partitions": self.leases.partitions, "claimed": partitions}).rowcount
+        if reset:
+            logger.info(f"Reclaimed {reset} orphaned queue rows in partitions {partitions}")
+
+    def _rebalance(self):
+        claimed = self.leases.rebalance(self.stats)
+        if claimed:
+            self._reset_orphans(claimed)
+
+    def _write_back(self, outcomes: List[Dict[str, Any]]):
+        """Write a batch's outcomes with one multi-row UPDATE per kind of outcome"""
+        now = self._now()
+        with self.db.engine.begin() as connection:
+            if self.leases:
+                # Rows of partitions lost since leasing belong to their new owner
+                held = self.leases.fence(connection, {o["partition"]: o["token"] for o in outcomes})
+                fenced = [outcome for outcome in outcomes if outcome["partition"] not in held]
+                if fenced:
+                    self.stats["lease_lost"] += len(fenced)
+                    self.leases.stats["fenced_writes"] += len(fenced)
+                    outcomes = [outcome for outcome in outcomes if outcome["partition"] in held]
+            
+            interrupted = [outcome["id"] for outcome in outcomes if outcome["interrupted"]]
+            completed = [outcome["id"] for outcome in outcomes if outcome["success"]]
+            failed = [outcome for outcome in outcomes if not outcome["success"] and not outcome["interrupted"]]
+            
+            if interrupted:
+                connection.execute(text(
+                    f"UPDATE {self.table} SET status = 'pending' WHERE id IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)), {"ids": interrupted})
+            if completed:
+                connection.execute(text(
+                    f"UPDATE {self.table} SET status = 'completed', archived_at = :now, last_attempt = :now, "
+                    f"attempts = attempts + 1, error_message = NULL WHERE id IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)), {"now": now, "ids": completed})
+            if failed:
+                params = {"now": now, "max_attempts": self.max_attempts, "ids": [outcome["id"] for outcome in failed]}
+                cases = []
+                for index, outcome in enumerate(failed):
+                    cases.append(f"WHEN :id{index} THEN :error{index}")
+                    params[f"id{index}"] = outcome["id"]
+                    params[f"error{index}"] = (outcome.get("error") or "Unknown error")[:1000]
+                connection.execute(text(
+                    f"UPDATE {self.table} SET "
+                    f"status = CASE WHEN attempts + 1 >= :max_attempts THEN 'failed' ELSE 'pending' END, "
+                    f"error_message = CASE id {' '.join(cases)} END, "
+                    f"attempts = attempts + 1, last_attempt = :now WHERE id IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)), params)
+        
+        self.stats["completed"] += len(completed)
+        for outcome in failed:
+            if outcome["attempts"] + 1 >= self.max_attempts:
+                self.stats["failed"] += 1
+            else:
+                self.stats["retried"] += 1
+
+    async def process_batch(self, attempted_before: Optional[str] = None, batch_size: Optional[int] = None,
+                            concurrency: Optional[int] = None) -> int:
+        """Lease, submit and write back one batch; returns the number of rows leased
+        
+        batch_size and concurrency override the worker's settings for this
+        batch only.
+        """
+        batch_size = max(1, batch_size) if batch_size is not None else self.batch_size
+        concurrency = max(1, concurrency) if concurrency is not None else self.concurrency
+        rows = await self.db.run(self._lease, batch_size, attempted_before or self._now())
+        if not rows:
+            return 0
+        self.stats["batches"] += 1
+        self.stats["leased"] += len(rows)
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        
+        async def submit(row: Dict[str, Any]) -> Dict[str, Any]:
+            # Never submit under a lease that may already belong to another worker
+            if self.leases and not self.leases.valid(row["partition"], row["token"]):
+                return {"success": False, "lease_lost": True}
+            return await self.submit(row)
+        
+        async def record(row: Dict[str, Any], result: Dict[str, Any]):
+            if row["url"] and not result.get("lease_lost"):
+                results[normalize_url(row["url"])] = result
+        
+        async def source() -> AsyncIterator[Dict[str, Any]]:
+            for row in rows:
+                yield {"ID": row["post_id"], "url": row["post_url"], "post_type": row["post_type"],
+                       "queue_id": row["id"], "partition": row.get("partition"), "token": row.get("token")}
+        
+        pipeline = SubmissionPipeline(submit, concurrency=concurrency,
+                                      per_host_limit=self.per_host_limit, on_result=record)
+        outcomes = []
+        try:
+            await pipeline.run(source())
+        finally:
+            # Duplicate URLs share one result; rows without one (cancelled
+            # mid-batch) go back to pending without using up an attempt
+            for row in rows:
+                if not row["post_url"]:
+                    result = {"success": False, "error": "Queue item has no URL"}
+                else:
+                    result = results.get(normalize_url(row["post_url"]))
+                outcomes.append({"id": row["id"], "attempts": row["attempts"],
+                                 "partition": row.get("partition"), "token": row.get("token"),
+                                 "interrupted": result is None,
+                                 "success": bool(result and result.get("success")),
+                                 "error": result.get("error") if result else None})
+            await asyncio.shield(self.db.run(self._write_back, outcomes))
+        return len(rows)
+
+    async def drain(self, max_batches: Optional[int] = None, batch_size: Optional[int] = None,
+                    concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Process batches until the queue has no pending rows or max_batches is reached
+        
+        Drains of one worker run one at a time: they share its leases,
+        whose release at the end of a drain would fence off another drain's
+        write-backs, and its stats, from which each summary is taken.
+        """
+        async with self._drain_lock:
+            return await self._drain(max_batches, batch_size, concurrency)
+
+    async def _drain(self, max_batches: Optional[int], batch_size: Optional[int],
+                     concurrency: Optional[int]) -> Dict[str, Any]:
+        start = time.monotonic()
+        started_at = self._now()
+        before = dict(self.stats)
+        batches = 0
+        heartbeat = asyncio.create_task(self._heartbeat()) if self.leases else None
+        try:
+            while max_batches is None or batches < max_batches:
+                # Partitions change hands only between batches, when nothing is in flight
+                if self.leases:
+                    await self.db.run(self._rebalance)
+                if await self.process_batch(started_at, batch_size, concurrency):
+                    batches += 1
+                elif self.leases and await self.db.run(self._pending_elsewhere, started_at):
+                    # Other workers still hold partitions with pending rows; wait
+                    # for a share to free up instead of going idle
+                    await asyncio.sleep(self.leases.ttl / 3)
+                else:
+                    break
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+                await asyncio.gather(heartbeat, return_exceptions=True)
+                await asyncio.shield(self.db.run(self.leases.release, self.stats))
+        summary = {key: self.stats[key] - before[key] for key in self.stats}
+        summary["elapsed_seconds"] = round(time.monotonic() - start, 3)
+        return summary
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.leases.ttl / 3)
+            try:
+                await self.db.run(self.leases.renew, self.stats)
+            except Exception as e:
+                logger.warning(f"Queue lease heartbeat failed: {e}")
+
+    async def run_forever(self, interval: float = DEFAULT_QUEUE_INTERVAL):
+        """Drain the queue, then sleep for interval seconds, until cancelled"""
+        while True:
+            summary = await self.drain()
+            if summary["leased"]:
+                logger.info(f"Queue drain: {summary['completed']} completed, {summary['retried']} retried, "
+                            f"{summary['failed']} failed in {summary['elapsed_seconds']}s")
+            await asyncio.sleep(interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, leases=self.leases.get_stats() if self.leases else None)
+
+def to_epoch(value: Any) -> int:
+    """Seconds since the epoch of a database datetime, taken as UTC; -1 for NULL"""
+    if value is None or value == "":
+        return -1
+    if isinstance(value, str):
+        if value.startswith("0000-00-00"):
+            return -1
+        value = datetime.fromisoformat(value)
+    return calendar.timegm(value.timetuple())
+
+def nearest_rank(values: List[int], quantile: float) -> int:
+    """Nearest-rank percentile of a sorted, non-empty list"""
+    return values[max(0, math.ceil(quantile * len(values)) - 1)]
+
+class ColumnarTable:
+    """Compact in-memory copy of selected columns of one table
+    
+    Each column is an array('q'): integers as is, datetimes as epoch
+    seconds and text as codes into a per-column dictionary, with -1 for
+    NULL. Rows are appended in id order, so later loads only fetch rows
+    above the id watermark. Rows still in an open status (pending,
+    processing) may change, so the next load truncates back to the first
+    of them and reads them again.
+    """
+
+    def __init__(self, columns: Dict[str, str], open_statuses: tuple = ()):
+        self.kinds = columns
+        self.columns = {name: array("q") for name in columns}
+        self.dictionaries: Dict[str, List[str]] = {name: [] for name, kind in columns.items() if kind == "category"}
+        self._codes: Dict[str, Dict[str, int]] = {name: {} for name in self.dictionaries}
+        self.open_statuses = set(open_statuses)
+        self.first_open: Optional[int] = None
+        self.version = 0
+        self._rewound: Optional[tuple] = None
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def rewind(self) -> int:
+        """Drop rows from the first open one on; returns the id to load after"""
+        if self.first_open is not None:
+            tail = {}
+            for name, column in self.columns.items():
+                tail[name] = column[self.first_open:]
+                del column[self.first_open:]
+            self._rewound = (self.first_open, self.version, tail)
+            self.first_open = None
+            self.version += 1
+        ids = self.columns["id"]
+        return ids[-1] if ids else 0
+
+    def _code(self, name: str, value: Any) -> int:
+        if value is None:
+            return -1
+        value = str(value)
+        code = self._codes[name].get(value)
+        if code is None:
+            code = self._codes[name][value] = len(self.dictionaries[name])
+            self.dictionaries[name].append(value)
+        return code
+
+    def append(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        start = len(self)
+        for name, kind in self.kinds.items():
+            values = (row.get(name) for row in rows)
+            if kind == "category":
+                self.columns[name].extend(self._code(name, value) for value in values)
+            elif kind == "datetime":
+                self.columns[name].extend(map(to_epoch, values))
+            else:
+                self.columns[name].extend(-1 if value in (None, "") else int(value) for value in values)
+        if self.first_open is None and "status" in self.kinds:
+            for offset, row in enumerate(rows):
+                if row.get("status") in self.open_statuses:
+                    self.first_open = start + offset
+                    break
+        self.version += 1
+
+    def settle(self):
+        """Keep the previous version if re-reading the open rows changed nothing"""
+        if self._rewound:
+            start, version, tail = self._rewound
+            if all(column[start:] == tail[name] for name, column in self.columns.items()):
+                self.version = version
+            self._rewound = None
+
+    def labels(self, name: str) -> List[str]:
+        return self.dictionaries[name]
+
+    def days(self, name: str) -> array:
+        """Day numbers (epoch days) of a datetime column; -1 for NULL"""
+        return array("q", map(operator.floordiv, self.columns[name], itertools.repeat(86400)))
+
+    def memory_bytes(self) -> int:
+        return sum(column.buffer_info()[1] * column.itemsize for column in self.columns.values())
+
+class SubmissionAnalytics:
+    """Grouped aggregates over the submission history and archive queue
+    
+    Both tables are held as ColumnarTables. Counts are built with one
+    Counter over zipped columns, grouped per (day, post type, status),
+    and only the groups are filtered to the requested window, so a
+    refresh costs a few passes over the arrays in C rather than a loop
+    over row dicts. Summaries are cached until new rows are loaded.
+    """
+
+    HISTORY_COLUMNS = {"id": "int", "status": "category", "post_type": "category", "submission_date": "datetime"}
+    QUEUE_COLUMNS = {"id": "int", "status": "category", "post_type": "category", "attempts": "int",
+                     "created_at": "datetime", "archived_at": "datetime"}
+
+    def __init__(self):
+        self.history = ColumnarTable(self.HISTORY_COLUMNS, open_statuses=("pending", "processing"))
+        self.queue = ColumnarTable(self.QUEUE_COLUMNS, open_statuses=("pending", "processing"))
+        self.lock = asyncio.Lock()
+        self.loaded_at: Optional[float] = None
+        self._summaries: Dict[tuple, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _day_label(day: int) -> str:
+        return datetime.fromtimestamp(day * 86400, timezone.utc).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def _rate(counts: Dict[str, int], success: frozenset) -> Optional[float]:
+        succeeded = sum(count for status, count in counts.items() if status in success)
+        finished = succeeded + counts.get("failed", 0)
+        return round(succeeded / finished, 4) if finished else None
+
+    @staticmethod
+    def _durations(values: List[int]) -> Dict[str, Any]:
+        values.sort()
+        summary = {"count": len(values)}
+        if values:
+            summary.update({f"p{int(q * 100)}": nearest_rank(values, q) for q in ANALYTICS_PERCENTILES})
+            # Bucket counts from bisecting the sorted values at each bound
+            bounds = [0] + [bisect.bisect_left(values, bound) for bound in ANALYTICS_DURATION_BUCKETS] + [len(values)]
+            summary["histogram"] = {label: high - low for label, low, high
+                                    in zip(ANALYTICS_DURATION_LABELS, bounds, bounds[1:]) if high > low}
+        return summary
+
+    def _grouped(self, table: ColumnarTable, day_column: str, start: int) -> Dict[str, Any]:
+        """Counts per day, post type and status from one Counter over the columns"""
+        statuses, post_types = table.labels("status"), table.labels("post_type")
+        # Pack (day, post type, status) into one integer per row so Counter
+        # hashes ints rather than tuples; day is shifted to keep NULL (-1) apart
+        type_count, status_count = len(post_types) + 1, len(statuses) + 1
+        packed = map(operator.add, table.days(day_column), itertools.repeat(1))
+        packed = map(operator.mul, packed, itertools.repeat(type_count))
+        packed = map(operator.add, packed, table.columns["post_type"])
+        packed = map(operator.mul, packed, itertools.repeat(status_count))
+        packed = map(operator.add, packed, table.columns["status"])
+        groups = Counter(packed)
+        
+        by_status: Counter = Counter()
+        by_day: Dict[str, Counter] = {}
+        by_post_type: Dict[str, Counter] = {}
+        for key, count in groups.items():
+            # Shift the post type and status codes to be non-negative, then unpack
+            day_type, status = divmod(key + status_count + 1, status_count)
+            day, post_type = divmod(day_type, type_count)
+            day, post_type, status = day - 1, post_type - 1, status - 1
+            if day < start:
+                continue
+            status = statuses[status] if status >= 0 else "unknown"
+            post_type = post_types[post_type] if post_type >= 0 else "unknown"
+            by_status[status] += count
+            if day >= 0:
+                by_day.setdefault(self._day_label(day), Counter())[status] += count
+            by_post_type.setdefault(post_type, Counter())[status] += count
+        return {"by_status": by_status, "by_day": by_day, "by_post_type": by_post_type}
+
+    def _history_summary(self, start: int) -> Dict[str, Any]:
+        grouped = self._grouped(self.history, "submission_date", start)
+        
+        def entry(counts: Counter) -> Dict[str, Any]:
+            return {"total": sum(counts.values()), "statuses": dict(counts),
+                    "success_rate": self._rate(counts, HISTORY_SUCCESS_STATUSES)}
+        
+        return {
+            "rows": len(self.history),
+            "total": sum(grouped["by_status"].values()),
+            "by_status": dict(grouped["by_status"]),
+            "success_rate": self._rate(grouped["by_status"], HISTORY_SUCCESS_STATUSES),
+            "by_day": {day: entry(counts) for day, counts in sorted(grouped["by_day"].items())},
+            "by_post_type": {post_type: entry(counts) for post_type, counts in sorted(grouped["by_post_type"].items())}
+        }
+
+    def _queue_summary(self, start: int) -> Dict[str, Any]:
+        queue = self.queue
+        grouped = self._grouped(queue, "created_at", start)
+        statuses, post_types = queue.labels("status"), queue.labels("post_type")
+        created, archived = queue.columns["created_at"], queue.columns["archived_at"]
+        archived_days = queue.days("archived_at")
+        
+        # Throughput and time to archive by the day rows were archived
+        durations_by_day: Dict[int, List[int]] = {}
+        durations_by_type: Dict[int, List[int]] = {}
+        recent = itertools.compress(range(len(queue)),
+                                    map(operator.ge, archived_days, itertools.repeat(max(start, 0))))
+        post_type_codes = queue.columns["post_type"]
+        for index in recent:
+            if created[index] < 0:
+                continue
+            duration = max(0, archived[index] - created[index])
+            durations_by_day.setdefault(archived_days[index], []).append(duration)
+            durations_by_type.setdefault(post_type_codes[index], []).append(duration)
+        all_durations = list(itertools.chain.from_iterable(durations_by_day.values()))
+        
+        retries = Counter(zip(queue.columns["status"], queue.columns["attempts"]))
+        retry_distribution: Dict[str, Dict[int, int]] = {}
+        for (status, attempts), count in sorted(retries.items(), key=lambda item: item[0][1]):
+            status = statuses[status] if status >= 0 else "unknown"
+            retry_distribution.setdefault(status, {})[attempts] = count
+        
+        def entry(counts: Counter) -> Dict[str, Any]:
+            return {"total": sum(counts.values()), "statuses": dict(counts),
+                    "success_rate": self._rate(counts, QUEUE_SUCCESS_STATUSES)}
+        
+        by_day = {day: entry(counts) for day, counts in grouped["by_day"].items()}
+        for day, durations in durations_by_day.items():
+            label = self._day_label(day)
+            by_day.setdefault(label, {"total": 0, "statuses": {}, "success_rate": None})
+            by_day[label]["archived"] = len(durations)
+            by_day[label]["time_to_archive"] = self._durations(durations)
+        by_post_type = {post_type: entry(counts) for post_type, counts in grouped["by_post_type"].items()}
+        for code, durations in durations_by_type.items():
+            post_type = post_types[code] if code >= 0 else "unknown"
+            by_post_type.setdefault(post_type, {"total": 0, "statuses": {}, "success_rate": None})
+            by_post_type[post_type]["time_to_archive"] = self._durations(durations)
+        
+        return {
+            "rows": len(queue),
+            "total": sum(grouped["by_status"].values()),
+            "by_status": dict(grouped["by_status"]),
+            "success_rate": self._rate(grouped["by_status"], QUEUE_SUCCESS_STATUSES),
+            "archived": len(all_durations),
+            "time_to_archive": self._durations(all_durations),
+            "retry_distribution": retry_distribution,
+            "by_day": dict(sorted(by_day.items())),
+            "by_post_type": dict(sorted(by_post_type.items()))
+        }
+
+    def summary(self, days: int) -> Dict[str, Any]:
+        """Aggregates over the last `days` days (0 for all rows)"""
+        start = to_epoch(datetime.now()) // 86400 - days + 1 if days > 0 else -1
+        key = (self.history.version, self.queue.version, start)
+        if key not in self._summaries:
+            self._summaries = {key: {"history": self._history_summary(start), "queue": self._queue_summary(start)}}
+        return self._summaries[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "history_rows": len(self.history),
+            "queue_rows": len(self.queue),
+            "memory_bytes": self.history.memory_bytes() + self.queue.memory_bytes(),
+            "loaded_at": datetime.fromtimestamp(self.loaded_at).isoformat() if self.loaded_at else None
+        }
+
+class SQLiteMirror:
+    """Local SQLite copy of the plugin's tables for offline reporting
+    
+    Tables keep their source names and columns. A sync copies the rows
+    above a table's id watermark, then the rows whose updated-at column
+    moved past its (updated_at, id) watermark, upserting each page in one
+    transaction. Rows the mirror still holds in an open status are fetched
+    again by id on every sync, since some writers change them without
+    touching the updated-at column. Every reconcile_interval seconds the
+    source ids are scanned and rows deleted there are deleted here too.
+    Reporting queries run here when every table they read was synced
+    within their staleness bound.
+    """
+
+    TABLES = [
+        MirrorTable("submissions_table", "swap_submissions_history", updated="last_checked",
+                    indexes=("post_id", "status", "submission_date")),
+        # Archive_Queue marks rows completed through archived_at alone
+        MirrorTable("queue_table", "swap_archive_queue", updated="last_attempt",
+                    open_statuses=("pending", "processing"), indexes=("post_id", "status", "created_at")),
+        MirrorTable("memory_log_table", "swap_memory_log", optional=True),
+        # Post types, for reports grouped by them
+        MirrorTable(None, "posts", key="ID", updated="post_modified_gmt",
+                    columns="ID, post_type, post_status, post_modified_gmt", indexes=("post_type",))
+    ]
+
+    def __init__(self, path: Path, batch_size: int = DEFAULT_MIRROR_BATCH_SIZE,
+                 reconcile_interval: float = DEFAULT_MIRROR_RECONCILE_INTERVAL):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.reconcile_interval = reconcile_interval
+        self.connection = sqlite3.connect(str(path))
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS mirror_state (
+                table_name TEXT PRIMARY KEY,
+                id_watermark INTEGER NOT NULL DEFAULT 0,
+                updated_watermark TEXT,
+                updated_id INTEGER NOT NULL DEFAULT 0,
+                synced_at REAL,
+                reconciled_at REAL
+            )
+        """)
+        if "reconciled_at" not in self._columns("mirror_state"):
+            self.connection.execute("ALTER TABLE mirror_state ADD COLUMN reconciled_at REAL")
+        self.connection.commit()
+        self.lock = asyncio.Lock()
+        self.stats = {"syncs": 0, "rows_copied": 0, "rows_deleted": 0, "queries": 0}
+
+    def _state(self, table: str) -> Dict[str, Any]:
+        row = self.connection.execute("SELECT * FROM mirror_state WHERE table_name = ?", (table,)).fetchone()
+        return dict(row) if row else {"id_watermark": 0, "updated_watermark": None, "updated_id": 0, "synced_at": None,
+                                      "reconciled_at": None}
+
+    def _columns(self, table: str) -> List[str]:
+        return [row["name"] for row in self.connection.execute(f'PRAGMA table_info("{table}")')]
+
+    def _upsert(self, spec: MirrorTable, table: str, rows: List[Dict[str, Any]]):
+        columns = self._columns(table)
+        if not columns:
+            columns = list(rows[0])
+            definitions = [f'"{c}" INTEGER PRIMARY KEY' if c == spec.key else f'"{c}"' for c in columns]
+            self.connection.execute(f'CREATE TABLE "{table}" ({", ".join(definitions)})')
+            for column in spec.indexes:
+                self.connection.execute(f'CREATE INDEX "{table}_{column}" ON "{table}" ("{column}")')
+        for column in rows[0]:
+            if column not in columns:
+                self.connection.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}"')
+                columns.append(column)
+        
+        names = list(rows[0])
+        quoted = ", ".join(f'"{c}"' for c in names)
+        updates = ", ".join(f'"{c}" = excluded."{c}"' for c in names if c != spec.key)
+        self.connection.executemany(
+            f'INSERT INTO "{table}" ({quoted}) VALUES ({", ".join("?" for _ in names)}) '
+            f'ON CONFLICT ("{spec.key}") DO UPDATE SET {updates}',
+            [tuple(row.get(c) for c in names) for row in rows]
+        )
+
+    async def sync_table(self, spec: MirrorTable, table: str,
+                         fetch: Callable[[str, Dict[str, Any]], Awaitable[List[Dict[str, Any]]]]) -> Dict[str, Any]:
+        """Copy new and changed rows of one source table"""
+        state = self._state(table)
+        id_watermark = state["id_watermark"]
+        since, since_id = state["updated_watermark"], state["updated_id"]
+        copied = changed = 0
+        
+        async def copy(sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+            rows = await fetch(sql, dict(params, limit=self.batch_size))
+            if rows:
+                with self.connection:
+                    self._upsert(spec, table, rows)
+            return rows
+        
+        if spec.updated and state["synced_at"] is None:
+            # Changes made while the first copy runs are picked up next time
+            rows = await fetch(f"SELECT MAX({spec.updated}) AS mark FROM {table}", {})
+            since, since_id = (rows[0]["mark"] if rows else None), 0
+        elif spec.updated:
+            # Rows copied before and changed since
+            while True:
+                condition = f"{spec.updated} IS NOT NULL AND {spec.key} <= :id_watermark"
+                if since:
+                    condition += (f" AND ({spec.updated} > :since OR "
+                                  f"({spec.updated} = :since AND {spec.key} > :since_id))")
+                rows = await copy(
+                    f"SELECT {spec.columns} FROM {table} WHERE {condition} "
+                    f"ORDER BY {spec.updated} ASC, {spec.key} ASC LIMIT :limit",
+                    {"since": since or "", "since_id": since_id, "id_watermark": id_watermark}
+                )
+                if rows:
+                    since, since_id = rows[-1][spec.updated], rows[-1][spec.key]
+                changed += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+        
+        refreshed = deleted = 0
+        if spec.open_statuses and self._columns(table):
+            # Open rows are fetched by id; the ids come from the mirror and are integers
+            statuses = ", ".join("?" for _ in spec.open_statuses)
+            open_ids = [row[0] for row in self.connection.execute(
+                f'SELECT "{spec.key}" FROM "{table}" WHERE status IN ({statuses}) ORDER BY "{spec.key}"',
+                spec.open_statuses
+            )]
+            for offset in range(0, len(open_ids), self.batch_size):
+                chunk = open_ids[offset:offset + self.batch_size]
+                rows = await fetch(f"SELECT {spec.columns} FROM {table} WHERE {spec.key} IN "
+                                   f"({', '.join(str(int(key)) for key in chunk)})", {})
+                gone = set(chunk) - {row[spec.key] for row in rows}
+                with self.connection:
+                    if rows:
+                        self._upsert(spec, table, rows)
+                    self._delete(spec, table, gone)
+                refreshed += len(rows)
+                deleted += len(gone)
+        
+        # Rows added since the last sync
+        while True:
+            rows = await copy(f"SELECT {spec.columns} FROM {table} WHERE {spec.key} > :after "
+                              f"ORDER BY {spec.key} ASC LIMIT :limit", {"after": id_watermark})
+            if rows:
+                id_watermark = rows[-1][spec.key]
+            copied += len(rows)
+            if len(rows) < self.batch_size:
+                break
+        
+        reconciled_at = state["reconciled_at"]
+        if state["synced_at"] is None:
+            # A first copy holds no deleted rows
+            reconciled_at = time.time()
+        elif time.time() - (reconciled_at or 0) >= self.reconcile_interval:
+            deleted += await self._reconcile(spec, table, id_watermark, fetch)
+            reconciled_at = time.time()
+        
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO mirror_state (table_name, id_watermark, updated_watermark, updated_id, "
+                "synced_at, reconciled_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (table, id_watermark, since, since_id, time.time(), reconciled_at)
+            )
+        self.stats["rows_copied"] += copied + changed + refreshed
+        self.stats["rows_deleted"] += deleted
+        return {"new_rows": copied, "changed_rows": changed, "refreshed_rows": refreshed, "deleted_rows": deleted,
+                "id_watermark": id_watermark, "updated_watermark": since}
+
+    def _delete(self, spec: MirrorTable, table: str, keys):
+        self.connection.executemany(f'DELETE FROM "{table}" WHERE "{spec.key}" = ?', [(key,) for key in keys])
+
+    async def _reconcile(self, spec: MirrorTable, table: str, id_watermark: int,
+                         fetch: Callable[[str, Dict[str, Any]], Awaitable[List[Dict[str, Any]]]]) -> int:
+        """Delete mirrored rows up to id_watermark that no longer exist at the source"""
+        if not self._columns(table):
+            return 0
+        deleted, after = 0, 0
+        while after < id_watermark:
+            rows = await fetch(f"SELECT {spec.key} FROM {table} WHERE {spec.key} > :after AND {spec.key} <= :upto "
+                               f"ORDER BY {spec.key} ASC LIMIT :limit",
+                               {"after": after, "upto": id_watermark, "limit": self.batch_size})
+            present = {row[spec.key] for row in rows}
+            # A short page covers the rest of the range
+            upper = rows[-1][spec.key] if len(rows) == self.batch_size else id_watermark
+            gone = [row[0] for row in self.connection.execute(
+                f'SELECT "{spec.key}" FROM "{table}" WHERE "{spec.key}" > ? AND "{spec.key}" <= ?', (after, upper)
+            ) if row[0] not in present]
+            with self.connection:
+                self._delete(spec, table, gone)
+            deleted += len(gone)
+            after = upper
+        return deleted
+
+    def age(self, tables: List[str]) -> Optional[float]:
+        """Seconds since the least recently synced of the tables; None if one was never synced"""
+        ages = []
+        for table in tables:
+            synced_at = self._state(table)["synced_at"]
+            if synced_at is None:
+                return None
+            ages.append(time.time() - synced_at)
+        return max(ages, default=None)
+
+    def query(self, sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self.stats["queries"] += 1
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        tables = {
+            row["table_name"]: {
+                "id_watermark": row["id_watermark"],
+                "updated_watermark": row["updated_watermark"],
+                "synced_at": datetime.fromtimestamp(row["synced_at"]).isoformat() if row["synced_at"] else None
+            }
+            for row in self.connection.execute("SELECT * FROM mirror_state ORDER BY table_name")
+        }
+        return dict(self.stats, path=str(self.path), tables=tables)
+
+    def close(self):
+        self.connection.close()
+
+class AnalysisCache:
+    """Persistent per-file cache of plugin scan results
+    
+    Results are keyed on (content hash, rule-set key), so identical files
+    share an entry and a rule change invalidates everything at once. A
+    file whose mtime and size match its last visit reuses the recorded
+    hash without being read. At most max_entries results are kept, the
+    least recently used evicted first. Whole-tree results such as PHPCS
+    output are cached under a fingerprint of the tree's file hashes.
+    Scans run in worker threads, so access is serialized by a lock.
+    """
+
+    def __init__(self, path: Path, max_entries: int = DEFAULT_ANALYSIS_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                content_hash TEXT NOT NULL,
+                ruleset TEXT NOT NULL,
+                result TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (content_hash, ruleset)
+            );
+            CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+        """)
+        self.connection.commit()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "files_hashed": 0, "evictions": 0}
+
+    @staticmethod
+    def content_hash(data: bytes) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def file_hash(self, path: Path, stat: os.stat_result) -> Optional[str]:
+        """Recorded hash of a file if its mtime and size are unchanged"""
+        with self.lock:
+            row = self.connection.execute("SELECT mtime_ns, size, content_hash FROM files WHERE path = ?",
+                                          (str(path),)).fetchone()
+        if row and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+            return row[2]
+        return None
+
+    def remember_file(self, path: Path, stat: os.stat_result, content_hash: str):
+        self.stats["files_hashed"] += 1
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO files (path, mtime_ns, size, content_hash) "
+                                    "VALUES (?, ?, ?, ?)", (str(path), stat.st_mtime_ns, stat.st_size, content_hash))
+
+    def get(self, content_hash: str, ruleset: str) -> Optional[Any]:
+        with self.lock:
+            row = self.connection.execute("SELECT result FROM results WHERE content_hash = ? AND ruleset = ?",
+                                          (content_hash, ruleset)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self.connection.execute("UPDATE results SET last_used = ? WHERE content_hash = ? AND ruleset = ?",
+                                    (time.time(), content_hash, ruleset))
+        self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, content_hash: str, ruleset: str, result: Any):
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO results (content_hash, ruleset, result, last_used) "
+                                    "VALUES (?, ?, ?, ?)", (content_hash, ruleset, json.dumps(result), time.time()))
+
+    def flush(self):
+        """Commit a scan's writes and evict least recently used results over the limit"""
+        with self.lock:
+            count = self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if count > self.max_entries:
+                evicted = self.connection.execute(
+                    "DELETE FROM results WHERE rowid IN "
+                    "(SELECT rowid FROM results ORDER BY last_used ASC LIMIT ?)", (count - self.max_entries,)
+                ).rowcount
+                self.stats["evictions"] += evicted
+            self.connection.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return dict(self.stats, entries=entries, max_entries=self.max_entries, path=str(self.path),
+                    hit_rate=round(self.stats["hits"] / lookups, 4) if lookups else 0.0)
+
+    def close(self):
+        self.connection.close()
+
+class PluginScanner:
+    """Run every analysis rule over a plugin tree in one pass
+    
+    The tree is walked once and each file read once. All rule tokens are
+    compiled into a single alternation and each search resumes one
+    character after the previous match, so one scan of a file finds
+    every occurrence of every token, overlapping ones included; rules
+    are then decided from the tokens found. Findings carry file, line
+    and column. With an AnalysisCache only files whose content changed
+    are scanned again; the rest reuse their cached findings. Large scans
+    can be spread over a process pool (see scan_many).
+    """
+
+    def __init__(self, rules: Optional[List[ScanRule]] = None, extensions: Optional[tuple] = (".php",),
+                 max_file_size: int = MAX_SCAN_FILE_SIZE, cache: Optional[AnalysisCache] = None):
+        self.rules = rules if rules is not None else ANALYSIS_RULES
+        self.extensions = extensions
+        self.max_file_size = max_file_size
+        self.cache = cache
+        tokens = sorted({token for rule in self.rules for token in rule.patterns + rule.unless}, key=len, reverse=True)
+        self.pattern = re.compile("|".join(map(re.escape, tokens)))
+        rules_json = json.dumps([vars(rule) for rule in self.rules], sort_keys=True)
+        self.ruleset = hashlib.sha1(f"{SCANNER_VERSION}:{rules_json}".encode("utf-8")).hexdigest()[:16]
+        self.pool_broken = False
+
+    def iter_files(self, root: Path):
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories[:] = sorted(d for d in subdirectories if d not in SCAN_SKIP_DIRS)
+            for name in sorted(files):
+                if self.extensions is None or name.endswith(self.extensions):
+                    yield Path(directory) / name
+
+    def _ruleset_key(self, path: Path) -> str:
+        """Rule-set version plus which path-dependent rules apply to this path"""
+        flags = "".join("1" if rule.path_contains in str(path) else "0" for rule in self.rules if rule.path_contains)
+        return f"{self.ruleset}:{flags}"
+
+    def _read(self, path: Path, stat: os.stat_result) -> tuple:
+        """Return (content hash, content or None), skipping the read when the cache knows the file"""
+        if self.cache is None:
+            data = path.read_bytes()
+            return AnalysisCache.content_hash(data), data
+        content_hash = self.cache.file_hash(path, stat)
+        if content_hash is not None:
+            return content_hash, None
+        data = path.read_bytes()
+        content_hash = AnalysisCache.content_hash(data)
+        self.cache.remember_file(path, stat, content_hash)
+        return content_hash, data
+
+    def fingerprint(self, root: Path) -> str:
+        """Hash over the paths and content hashes of every file under root"""
+        digest = hashlib.sha1()
+        for path in self.iter_files(root):
+            try:
+                content_hash, _ = self._read(path, path.stat())
+            except OSError:
+                continue
+            digest.update(f"{path.relative_to(root)}\0{content_hash}\n".encode("utf-8"))
+        if self.cache is not None:
+            self.cache.flush()
+        return digest.hexdigest()
+
+    def scan_text(self, path: Path, content: str) -> tuple:
+        """Return (findings, metric rule ids) for one file's content"""
+        found: Dict[str, List[int]] = {}
+        match = self.pattern.search(content)
+        while match:
+            found.setdefault(match.group(), []).append(match.start())
+            match = self.pattern.search(content, match.start() + 1)
+        
+        line_starts = None
+        findings = []
+        metrics = []
+        for rule in self.rules:
+            if rule.path_contains and rule.path_contains not in str(path):
+                continue
+            if any(token in found for token in rule.unless):
+                continue
+            offsets = sorted(offset for token in rule.patterns for offset in found.get(token, ()))
+            if rule.metric:
+                if offsets:
+                    metrics.append(rule.id)
+                continue
+            if rule.missing:
+                offsets = [] if offsets else [0]
+            if offsets and line_starts is None:
+                line_starts = [0] + [match.end() for match in re.finditer("\n", content)]
+            for offset in offsets:
+                line = bisect.bisect_right(line_starts, offset)
+                findings.append({
+                    "rule": rule.id,
+                    "category": rule.category,
+                    "message": rule.message,
+                    "file": str(path),
+                    "line": line,
+                    "column": offset - line_starts[line - 1] + 1
+                })
+        return findings, metrics
+
+    def _scan_data(self, path: Path, data: bytes) -> Dict[str, Any]:
+        file_findings, file_metrics = self.scan_text(path, data.decode("utf-8", errors="replace"))
+        # Kept without the path so identical files can share a cache entry
+        return {"findings": [{k: v for k, v in f.items() if k != "file"} for f in file_findings],
+                "metrics": file_metrics}
+
+    def _scan_file(self, path: Path, ruleset: str, content_hash: Optional[str]) -> tuple:
+        """Return (content hash, result, cached) for a file the cache had no result for
+        
+        A file whose path was not remembered may still match cached content,
+        such as a copy or a rename; cached is then True and it is not scanned.
+        """
+        data = path.read_bytes()
+        if content_hash is None:
+            content_hash = AnalysisCache.content_hash(data)
+            if self.cache is not None:
+                result = self.cache.get(content_hash, ruleset)
+                if result is not None:
+                    return content_hash, result, True
+        return content_hash, self._scan_data(path, data), False
+
+    def _try_scan_file(self, entry: list) -> Optional[tuple]:
+        try:
+            return self._scan_file(entry[1], entry[3], entry[4])
+        except OSError:
+            return None
+
+    def _scan_parallel(self, entries: List[list], pool: Executor):
+        """Yield (entry, scanned) for entries scanned by the process pool
+        
+        Files go largest first into chunks of a few files; every chunk is a
+        separate task, so workers that finish early take the next chunk
+        instead of waiting on a fixed share of the tree.
+        """
+        chunks, chunk, chunk_bytes = [], [], 0
+        for entry in sorted(entries, key=lambda entry: entry[2].st_size, reverse=True):
+            chunk.append(entry)
+            chunk_bytes += entry[2].st_size
+            if len(chunk) >= ANALYSIS_CHUNK_FILES or chunk_bytes >= ANALYSIS_CHUNK_BYTES:
+                chunks.append(chunk)
+                chunk, chunk_bytes = [], 0
+        if chunk:
+            chunks.append(chunk)
+        
+        futures = {pool.submit(scan_files_worker, self.rules, self.ruleset, [str(entry[1]) for entry in chunk]): chunk
+                   for chunk in chunks}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                scanned = future.result()
+            except BrokenProcessPool:
+                self.pool_broken = True
+                scanned = [self._try_scan_file(entry) for entry in chunk]
+            for entry, result in zip(chunk, scanned):
+                yield entry, result
+
+    def scan_many(self, roots: List[Path], pool: Optional[Executor] = None,
+                  files: Optional[List[List[Path]]] = None) -> List[Dict[str, Any]]:
+        """Scan every matching file under each root, returning one summary per root
+        
+        Cached results are looked up here; the files left to scan go to the
+        process pool when one is given and there are enough of them, and
+        workers send back findings only, never file contents. files gives
+        each root's file list when the tree was already walked, such as
+        by a SymbolIndex.
+        """
+        # [root index, path, stat, rule-set key, content hash, result]
+        entries = []
+        skipped = [0] * len(roots)
+        for index, root in enumerate(roots):
+            for path in (files[index] if files is not None else self.iter_files(root)):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    skipped[index] += 1
+                    continue
+                if stat.st_size > self.max_file_size:
+                    skipped[index] += 1
+                    continue
+                ruleset = self._ruleset_key(path)
+                content_hash = self.cache.file_hash(path, stat) if self.cache is not None else None
+                result = self.cache.get(content_hash, ruleset) if content_hash is not None else None
+                entries.append([index, path, stat, ruleset, content_hash, result])
+        
+        pending = [entry for entry in entries if entry[5] is None]
+        rescanned = [0] * len(roots)
+        parallel = pool is not None and len(pending) >= PARALLEL_SCAN_MIN_FILES
+        if parallel:
+            scanned_files = self._scan_parallel(pending, pool)
+        else:
+            scanned_files = ((entry, self._try_scan_file(entry)) for entry in pending)
+        for entry, scanned in scanned_files:
+            if scanned is None:
+                continue
+            content_hash, entry[5], cached = scanned
+            if self.cache is not None:
+                if entry[4] is None:
+                    self.cache.remember_file(entry[1], entry[2], content_hash)
+                if cached:
+                    continue
+                self.cache.put(content_hash, entry[3], entry[5])
+            rescanned[entry[0]] += 1
+        if self.cache is not None:
+            self.cache.flush()
+        
+        summaries = [{"findings": [], "metrics": Counter(), "files_scanned": 0, "bytes_scanned": 0} for _ in roots]
+        for index, path, stat, _, _, result in entries:
+            summary = summaries[index]
+            if result is None:
+                skipped[index] += 1
+                continue
+            summary["files_scanned"] += 1
+            summary["bytes_scanned"] += stat.st_size
+            summary["findings"].extend(dict(finding, file=str(path)) for finding in result["findings"])
+            summary["metrics"].update(result["metrics"])
+        for index, summary in enumerate(summaries):
+            files = summary["files_scanned"]
+            summary.update(
+                metrics=dict(summary["metrics"]),
+                files_rescanned=rescanned[index],
+                files_skipped=skipped[index],
+                cache_hit_rate=round(1 - rescanned[index] / files, 4) if files and self.cache is not None else None,
+                parallel=parallel
+            )
+        return summaries
+
+    def scan(self, root: Path, pool: Optional[Executor] = None) -> Dict[str, Any]:
+        """Scan every matching file under root"""
+        start_time = time.monotonic()
+        summary = self.scan_many([root], pool)[0]
+        summary["elapsed_seconds"] = round(time.monotonic() - start_time, 3)
+        return summary
+
+_worker_scanners: Dict[str, PluginScanner] = {}
+
+def scan_files_worker(rules: List[ScanRule], ruleset: str, paths: List[str]) -> List[Optional[tuple]]:
+    """Process-pool entry point: (content hash, result, cached) per path, None for unreadable files"""
+    scanner = _worker_scanners.get(ruleset)
+    if scanner is None:
+        scanner = _worker_scanners[ruleset] = PluginScanner(rules)
+    scanned = []
+    for path in paths:
+        try:
+            data = Path(path).read_bytes()
+        except OSError:
+            scanned.append(None)
+            continue
+        scanned.append((AnalysisCache.content_hash(data), scanner._scan_data(Path(path), data), False))
+    return scanned
+
+def php_tokens(content: str) -> List[tuple]:
+    """(kind, text, offset) of each token of a PHP file's code, without comments and inline HTML"""
+    opening = PHP_OPEN_TAG.search(content)
+    if opening is None:
+        return []
+    return [(match.lastgroup, match.group(), match.start())
+            for match in PHP_TOKEN_PATTERN.finditer(content, opening.end())
+            if match.lastgroup not in ("comment", "html")]
+
+def call_arguments(tokens: List[tuple], start: int) -> List[List[tuple]]:
+    """Tokens of each argument of the call whose opening parenthesis is tokens[start]"""
+    arguments, current, depth = [], [], 0
+    for token in itertools.islice(tokens, start + 1, None):
+        if token[0] == "punctuation":
+            if token[1] in "([{":
+                depth += 1
+            elif token[1] in ")]}":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif token[1] == "," and depth == 0:
+                arguments.append(current)
+                current = []
+                continue
+        current.append(token)
+    if current:
+        arguments.append(current)
+    return arguments
+
+def extract_php_symbols(content: str) -> List[Dict[str, Any]]:
+    """Classes, methods, functions, hook calls, $wpdb query sites and escaping calls of a PHP file"""
+    tokens = php_tokens(content)
+    line_starts = [0] + [match.end() for match in re.finditer("\n", content)]
+    
+    def line(offset: int) -> int:
+        return bisect.bisect_right(line_starts, offset)
+    
+    def source(argument: List[tuple]) -> str:
+        return " ".join(content[argument[0][2]:argument[-1][2] + len(argument[-1][1])].split())
+    
+    symbols = []
+    depth = 0
+    classes = []  # (name, brace depth of the class body)
+    pending_class = None
+    for index, (kind, text, offset) in enumerate(tokens):
+        if kind == "punctuation":
+            if text == "{":
+                depth += 1
+                if pending_class is not None:
+                    classes.append((pending_class, depth))
+                    pending_class = None
+            elif text == "}":
+                if classes and classes[-1][1] == depth:
+                    classes.pop()
+                depth -= 1
+            continue
+        if kind != "name":
+            continue
+        previous = tokens[index - 1][1] if index else ""
+        following = tokens[index + 1] if index + 1 < len(tokens) else ("", "", 0)
+        if previous in ("->", "?->", "::"):
+            # $wpdb->get_results( ... ) and friends
+            if following[1] == "(" and text in WPDB_QUERY_METHODS and index >= 2 and tokens[index - 2][1] == "$wpdb":
+                arguments = call_arguments(tokens, index + 1)
+                prepared = text in WPDB_SAFE_METHODS or any(token[1] == "prepare" for argument in arguments
+                                                            for token in argument)
+                symbols.append({"kind": "query", "name": text, "line": line(offset), "prepared": prepared})
+            continue
+        keyword = text.lstrip("\\").lower()
+        if keyword in ("class", "interface", "trait", "enum"):
+            if previous.lower() == "new":
+                pending_class = "class@anonymous"
+            elif following[0] == "name":
+                symbols.append({"kind": "class", "name": following[1], "type": keyword, "line": line(offset)})
+                pending_class = following[1]
+        elif keyword == "function":
+            name_index = index + 2 if following[1] == "&" else index + 1
+            if name_index + 1 < len(tokens) and tokens[name_index][0] == "name" and tokens[name_index + 1][1] == "(":
+                if classes and classes[-1][1] == depth:
+                    symbols.append({"kind": "method", "name": tokens[name_index][1], "class": classes[-1][0],
+                                    "line": line(offset)})
+                else:
+                    symbols.append({"kind": "function", "name": tokens[name_index][1], "line": line(offset)})
+        elif following[1] == "(" and previous.lower() not in ("function", "new"):
+            if keyword in PHP_HOOK_CALLS:
+                arguments = call_arguments(tokens, index + 1)
+                if not arguments:
+                    continue
+                hook_type, role = PHP_HOOK_CALLS[keyword]
+                first = arguments[0]
+                literal = len(first) == 1 and first[0][0] == "string" and "$" not in first[0][1]
+                symbol = {"kind": "hook", "name": first[0][1][1:-1] if literal else source(first), "type": hook_type,
+                          "role": role, "call": keyword, "dynamic": not literal, "line": line(offset)}
+                if role != "fires" and len(arguments) > 1:
+                    symbol["callback"] = source(arguments[1])
+                symbols.append(symbol)
+            elif keyword.startswith(("esc_", "wp_kses")):
+                symbols.append({"kind": "escape", "name": keyword, "line": line(offset)})
+    return symbols
+
+class SymbolIndex:
+    """Classes, functions, hooks, $wpdb query sites and escaping calls of a plugin tree
+    
+    Each PHP file is tokenized once and its symbols recorded with their
+    lines. Per-file symbols are stored in the AnalysisCache under their
+    content hash, so the index survives restarts, and update() only
+    tokenizes files whose content changed; files whose mtime and size
+    are unchanged are not read at all.
+    """
+
+    def __init__(self, root: Path, cache: Optional[AnalysisCache] = None):
+        self.root = root
+        self.cache = cache
+        self.scanner = PluginScanner([], cache=cache)
+        self.ruleset = f"symbols:{SYMBOL_INDEX_VERSION}"
+        self.files: Dict[str, tuple] = {}  # path -> (mtime_ns, size, symbols)
+        self.paths: List[Path] = []  # Every file of the last walk, oversized ones included
+        self.lock = threading.Lock()
+        self.stats = {"updates": 0, "files_tokenized": 0, "last_update_seconds": None}
+
+    def update(self) -> Dict[str, Any]:
+        """Bring the index up to date with the tree"""
+        with self.lock:
+            start_time = time.monotonic()
+            files = {}
+            paths = []
+            checked = tokenized = 0
+            for path in self.scanner.iter_files(self.root):
+                paths.append(path)
+                try:
+                    stat = path.stat()
+                    entry = self.files.get(str(path))
+                    if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+                        if stat.st_size > MAX_SCAN_FILE_SIZE:
+                            continue
+                        checked += 1
+                        content_hash, data = self.scanner._read(path, stat)
+                        symbols = self.cache.get(content_hash, self.ruleset) if self.cache is not None else None
+                        if symbols is None:
+                            if data is None:
+                                data = path.read_bytes()
+                            symbols = extract_php_symbols(data.decode("utf-8", errors="replace"))
+                            tokenized += 1
+                            if self.cache is not None:
+                                self.cache.put(content_hash, self.ruleset, symbols)
+                        entry = (stat.st_mtime_ns, stat.st_size, symbols)
+                except OSError:
+                    continue
+                files[str(path)] = entry
+            self.files = files
+            self.paths = paths
+            if checked and self.cache is not None:
+                self.cache.flush()
+            elapsed = round(time.monotonic() - start_time, 3)
+            self.stats["updates"] += 1
+            self.stats["files_tokenized"] += tokenized
+            self.stats["last_update_seconds"] = elapsed
+            return {"files": len(files), "files_checked": checked, "files_tokenized": tokenized, "elapsed_seconds": elapsed}
+
+    def find(self, kind: Optional[str] = None, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Symbols of a kind (any kind if None) whose name matches a glob pattern, in file and line order"""
+        found = []
+        for path, (_, _, symbols) in sorted(self.files.items()):
+            for symbol in symbols:
+                if (kind is None or symbol["kind"] == kind) and (name is None or fnmatch.fnmatchcase(symbol["name"], name)):
+                    found.append(dict(symbol, file=path))
+        return found
+
+    def summary(self) -> Dict[str, Any]:
+        counts = Counter(symbol["kind"] for _, _, symbols in self.files.values() for symbol in symbols)
+        hooks = self.find("hook")
+        return {
+            "files": len(self.files),
+            "symbols": {kind: counts.get(kind, 0) for kind in SYMBOL_KINDS},
+            "hooks_fired": len({hook["name"] for hook in hooks if hook["role"] == "fires"}),
+            "hooks_registered": len({hook["name"] for hook in hooks if hook["role"] == "registers"}),
+            "unprepared_queries": len(self.unprepared_queries())
+        }
+
+    def unprepared_queries(self) -> List[Dict[str, Any]]:
+        """$wpdb query sites whose SQL is not built with $wpdb->prepare()"""
+        return [query for query in self.find("query") if not query["prepared"]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, root=str(self.root), files=len(self.files))
+
+class PHPLintServer(WPCLIWorker):
+    """Long-lived PHP process that syntax-checks batches of files without interpreter startup per file"""
+
+    def __init__(self, php_path: str, script_path: Path):
+        super().__init__(php_path, None, script_path)
+
+    @property
+    def description(self) -> str:
+        return "PHP lint server"
+
+    def _command(self) -> List[str]:
+        return [self.wp_cli_path, str(self.script_path)]
+
+    async def lint(self, paths: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        response = await self._request({"paths": paths}, timeout)
+        return response["results"]
+
+class PHPLinter:
+    """Syntax-check PHP files in parallel, skipping files checked before
+    
+    At most `workers` checks run at once, either as one `php -l` per file
+    or, with use_server, as batches of files sent to long-lived PHP lint
+    servers, which saves the interpreter startup on every file. The lint
+    servers only report parse errors, not the few compile-time errors
+    `php -l` also catches. Results are cached on the file's content hash,
+    the PHP version and the lint engine.
+    """
+
+    def __init__(self, runner: CommandRunner, php_path: str = "php", workers: int = DEFAULT_LINT_WORKERS,
+                 use_server: bool = False, cache: Optional[AnalysisCache] = None):
+        self.runner = runner
+        self.php_path = php_path
+        self.workers = workers or os.cpu_count() or 1
+        self.use_server = use_server
+        self.cache = cache
+        self.version: Optional[str] = None
+        self._idle: List[PHPLintServer] = []
+        self._server_unavailable_until = 0.0
+        self.stats = {"runs": 0, "files_linted": 0, "cache_hits": 0, "servers_started": 0, "server_failures": 0}
+
+    @property
+    def engine(self) -> str:
+        return "lint-server" if self.use_server else "php -l"
+
+    async def php_version(self) -> str:
+        if self.version is None:
+            result = await self.runner.run([self.php_path, "-r", "echo PHP_VERSION;"], check=True)
+            self.version = result.stdout.strip()
+        return self.version
+
+    async def lint(self, paths: List[Path]) -> Dict[str, Any]:
+        """Check every file, returning per-file results and timings"""
+        start_time = time.monotonic()
+        ruleset = f"lint:{self.engine}:{await self.php_version()}"
+        entries = await asyncio.to_thread(self._lookup, paths, ruleset)
+        pending = [entry for entry in entries if entry["result"] is None]
+        if pending:
+            if self.use_server:
+                await self._lint_with_servers(pending)
+            else:
+                semaphore = asyncio.Semaphore(self.workers)
+                
+                async def lint_file(entry: Dict[str, Any]):
+                    async with semaphore:
+                        await self._lint_file(entry)
+                
+                await asyncio.gather(*(lint_file(entry) for entry in pending))
+        if self.cache is not None:
+            await asyncio.to_thread(self._store, pending, ruleset)
+        
+        hits = len(entries) - len(pending)
+        self.stats["runs"] += 1
+        self.stats["files_linted"] += len(pending)
+        self.stats["cache_hits"] += hits
+        files = []
+        for entry in entries:
+            result = entry["result"]
+            file = {"file": str(entry["path"]), "ok": result["ok"], "cached": entry["cached"],
+                    "seconds": round(entry["seconds"], 4)}
+            if not result["ok"]:
+                file["line"] = result["line"]
+                file["error"] = (f"{result['message']} in {entry['path']} on line {result['line']}"
+                                 if result["line"] else result["message"])
+            files.append(file)
+        return {
+            "files": files,
+            "files_checked": len(entries),
+            "files_linted": len(pending),
+            "cache_hits": hits,
+            "engine": self.engine,
+            "php_version": self.version,
+            "workers": self.workers,
+            "elapsed_seconds": round(time.monotonic() - start_time, 3)
+        }
+
+    def _lookup(self, paths: List[Path], ruleset: str) -> List[Dict[str, Any]]:
+        """Entries for the files, with the cached result of each file checked before"""
+        entries = []
+        for path in paths:
+            entry = {"path": path, "content_hash": None, "result": None, "cached": False, "seconds": 0.0}
+            if self.cache is not None:
+                try:
+                    stat = path.stat()
+                    content_hash = self.cache.file_hash(path, stat)
+                    if content_hash is None:
+                        content_hash = AnalysisCache.content_hash(path.read_bytes())
+                        self.cache.remember_file(path, stat, content_hash)
+                    entry["content_hash"] = content_hash
+                    entry["result"] = self.cache.get(content_hash, ruleset)
+                    entry["cached"] = entry["result"] is not None
+                except OSError:
+                    pass
+            entries.append(entry)
+        return entries
+
+    def _store(self, entries: List[Dict[str, Any]], ruleset: str):
+        for entry in entries:
+            if entry["content_hash"] is not None and entry["result"].pop("cacheable", True):
+                self.cache.put(entry["content_hash"], ruleset, entry["result"])
+        self.cache.flush()
+
+    async def _lint_file(self, entry: Dict[str, Any]):
+        """Check one file with `php -l`"""
+        result = await self.runner.run([self.php_path, "-l", str(entry["path"])])
+        entry["seconds"] = result.duration
+        if result.returncode == 0:
+            entry["result"] = {"ok": True}
+            return
+        output = (result.stderr.strip() or result.stdout.strip())
+        match = PHP_LINT_ERROR.search(output)
+        if match:
+            entry["result"] = {"ok": False, "message": f"{match.group(1)}:  {match.group(2)}", "line": int(match.group(4))}
+        else:
+            entry["result"] = {"ok": False, "message": output, "line": None, "cacheable": not result.timed_out}
+
+    async def _lint_with_servers(self, pending: List[Dict[str, Any]]):
+        """Spread batches over up to `workers` lint servers; each takes the next batch when done"""
+        batches = deque(pending[i:i + LINT_BATCH_SIZE] for i in range(0, len(pending), LINT_BATCH_SIZE))
+        
+        async def serve():
+            server = await self._acquire()
+            try:
+                while batches:
+                    batch = batches.popleft()
+                    if server is not None:
+                        try:
+                            results = await server.lint([str(entry["path"]) for entry in batch],
+                                                        timeout=self.runner.default_timeout)
+                            for entry, result in zip(batch, results):
+                                entry["seconds"] = result.pop("seconds", 0.0)
+                                entry["result"] = result
+                            continue
+                        except (WPCLIWorkerError, OSError, asyncio.TimeoutError) as e:
+                            logger.warning(f"PHP lint server failed, falling back to php -l: {e}")
+                            self.stats["server_failures"] += 1
+                            await server.stop()
+                            server = None
+                    for entry in batch:
+                        await self._lint_file(entry)
+            finally:
+                if server is not None and server.alive:
+                    self._idle.append(server)
+        
+        await asyncio.gather(*(serve() for _ in range(min(self.workers, len(batches)))))
+
+    async def _acquire(self) -> Optional[PHPLintServer]:
+        """An idle lint server, or a new one; None while servers cannot be started"""
+        while self._idle:
+            server = self._idle.pop()
+            if server.alive:
+                return server
+        if time.monotonic() < self._server_unavailable_until:
+            return None
+        server = PHPLintServer(self.php_path, php_script_path("lint-server", PHP_LINT_SERVER_SCRIPT))
+        try:
+            await server.start()
+        except (WPCLIWorkerError, OSError) as e:
+            logger.warning(f"PHP lint server unavailable, using php -l: {e}")
+            self._server_unavailable_until = time.monotonic() + WP_WORKER_RETRY_DELAY
+            return None
+        self.stats["servers_started"] += 1
+        return server
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, engine=self.engine, workers=self.workers, php_version=self.version,
+                    idle_servers=len(self._idle))
+
+    async def close(self):
+        while self._idle:
+            await self._idle.pop().stop()
+
+class JobManager:
+    """Run tool calls as background jobs
+    
+    At most max_concurrent jobs run at once; the rest wait queued. Job
+    records stay in memory, except large results which are spilled to
+    spill_dir when one is configured. Finished jobs are evicted once they
+    are older than max_age.
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT_JOBS, max_age: float = DEFAULT_JOB_MAX_AGE,
+                 spill_dir: Optional[Path] = None, spill_threshold: int = DEFAULT_JOB_SPILL_THRESHOLD):
+        self.max_age = max_age
+        self.spill_dir = spill_dir
+        self.spill_threshold = spill_threshold
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.stats = {"started": 0, "completed": 0, "failed": 0, "cancelled": 0, "spilled": 0, "evicted": 0}
+
+    def start(self, tool: str, arguments: Dict[str, Any],
+              run: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> Job:
+        """Queue run(arguments) as a new job"""
+        self.evict()
+        job = Job(id=os.urandom(8).hex(), tool=tool, arguments=arguments)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, run))
+        job.task.add_done_callback(lambda task: self._cancelled_before_start(job))
+        self.stats["started"] += 1
+        return job
+
+    def _cancelled_before_start(self, job: Job):
+        # A task cancelled before its first step never runs _run's cleanup
+        if not job.finished:
+            job.status = JobStatus.CANCELLED
+            job.finished_at = time.time()
+            job.task = None
+            self.stats["cancelled"] += 1
+
+    async def _run(self, job: Job, run: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]):
+        async def notify(message: Dict[str, Any]):
+            params = dict(message.get("params", {}))
+            params.pop("progressToken", None)
+            job.progress = params
+        
+        # Progress reported by the tool is kept on the job instead of being sent
+        current_request.set(RequestContext(request_id=job.id, progress_token=job.id, notify=notify))
+        try:
+            async with self._semaphore:
+                job.status = JobStatus.RUNNING
+                job.started_at = time.time()
+                result = await run(job.arguments)
+            job.status = JobStatus.COMPLETED if result.get("success", True) else JobStatus.FAILED
+            job.error = result.get("error")
+            self._store_result(job, result)
+        except asyncio.CancelledError:
+            job.status = JobStatus.CANCELLED
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.tool}) failed: {e}")
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.task = None
+            self.stats[job.status.value] += 1
+
+    def _store_result(self, job: Job, result: Dict[str, Any]):
+        if self.spill_dir is not None:
+            payload = json.dumps(result)
+            if len(payload) > self.spill_threshold:
+                self.spill_dir.mkdir(parents=True, exist_ok=True)
+                job.result_path = self.spill_dir / f"job-{job.id}.json"
+                job.result_path.write_text(payload, encoding="utf-8")
+                self.stats["spilled"] += 1
+                return
+        job.result = result
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def result(self, job: Job) -> Optional[Dict[str, Any]]:
+        """Get a finished job's result, reading it back from disk if spilled"""
+        if job.result_path is not None:
+            return json.loads(job.result_path.read_text(encoding="utf-8"))
+        return job.result
+
+    def cancel(self, job: Job) -> bool:
+        if job.task is None or job.task.done():
+            return False
+        job.task.cancel()
+        return True
+
+    def list(self, status: Optional[str] = None) -> List[Job]:
+        self.evict()
+        return [job for job in self._jobs.values() if status is None or job.status.value == status]
+
+    def evict(self):
+        """Drop finished jobs older than max_age"""
+        cutoff = time.time() - self.max_age
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished_at < cutoff:
+                if job.result_path is not None:
+                    job.result_path.unlink(missing_ok=True)
+                del self._jobs[job_id]
+                self.stats["evicted"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        active = sum(1 for job in self._jobs.values() if not job.finished)
+        return dict(self.stats, active=active, retained=len(self._jobs))
+
+    async def close(self):
+        """Cancel unfinished jobs and wait for them to stop"""
+        tasks = [job.task for job in self._jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+class ServerConfig:
+    """Typed access to mcp-server.conf values"""
+
+    def __init__(self, config_file: Path = CONFIG_FILE):
+        self.config_file = config_file
+        self.parser = configparser.ConfigParser(inline_comment_prefixes=('#',), strict=False)
+
+        try:
+            if config_file.exists():
+                self.parser.read(config_file)
+        except configparser.Error as e:
+            # Keep whatever was parsed before the error
+            logger.warning(f"Error parsing configuration file {config_file}: {e}")
+
+    def get(self, section: str, key: str, fallback: Optional[str] = None) -> Optional[str]:
+        """Get a string value with surrounding quotes removed"""
+        value = self.parser.get(section, key, fallback=None)
+        if value is None:
+            return fallback
+        return value.strip().strip('"').strip("'")
+
+    def getint(self, section: str, key: str, fallback: int = 0) -> int:
+        """Get an integer value"""
+        try:
+            return int(self.get(section, key, str(fallback)))
+        except (TypeError, ValueError):
+            return fallback
+
+    def getfloat(self, section: str, key: str, fallback: float = 0.0) -> float:
+        """Get a float value"""
+        try:
+            return float(self.get(section, key, str(fallback)))
+        except (TypeError, ValueError):
+            return fallback
+
+    def getboolean(self, section: str, key: str, fallback: bool = False) -> bool:
+        """Get a boolean value"""
+        value = self.get(section, key)
+        if value is None:
+            return fallback
+        return value.lower() in ("1", "true", "yes", "on")
+
+class SpunWebArchiveForgeMCPServer:
+    """Main MCP Server class for Spun Web Archive Forge plugin management"""
+    
+    def __init__(self, config: Optional[ServerConfig] = None):
+        self.config = config or ServerConfig()
+        self.plugin_path = Path(__file__).parent
+        self.wp_path = Path("C:/Users/disru/Studio/plugin-test")
+        self.repository_path = Path("C:/Users/disru/Documents/wordpress plugins/Spun Web Archive Forge Repository")
+        self.test_server_url = "http://localhost:8881"
+        self.test_credentials = {
+            "username": "admin",
+            "password": "TCeglApnp@Ef29JVWrx6xIQn"
+        }
+        
+        # Plugin configuration
+        self.plugin_info = PluginInfo(
+            name="Spun Web Archive Forge",
+            slug="spun-web-archive-forge",
+            version="1.0.7",
+            status=PluginStatus.INACTIVE,
+            description="Professional WordPress plugin for automatically submitting content to the Internet Archive (Wayback Machine)",
+            author="Ryan Dickie Thompson",
+            author_uri="https://www.spunwebtechnology.com",
+            plugin_uri="https://www.spunwebtechnology.com/spun-web-archive-forge-wordpress-wayback-archive/",
+            text_domain="spun-web-archive-forge",
+            requires_wp="5.0",
+            requires_php="7.4",
+            tested_up_to="6.8.2",
+            license="GPL v2 or later",
+            license_uri="https://www.gnu.org/licenses/gpl-2.0.html"
+        )
+        
+    # IRC Configuration (disabled)
+    # self.irc_config = IRCConfig()
+        
+        # Archive.org API configuration
+        self.archive_api_config = {
+            "base_url": self.config.get("archive", "api_base_url", "https://web.archive.org/save/"),
+            "availability_url": self.config.get("archive", "availability_url",
+                                                "https://archive.org/wayback/available"),
+            "s3_test_url": self.config.get("archive", "s3_test_url", "https://s3.us.archive.org/")
+        }
+        self.wayback = WaybackClient(
+            self.archive_api_config["base_url"],
+            self.archive_api_config["availability_url"],
+            access_key=self.config.get("archive", "access_key", ""),
+            secret_key=self.config.get("archive", "secret_key", ""),
+            timeout=self.config.getfloat("archive", "api_timeout", DEFAULT_ARCHIVE_TIMEOUT),
+            pool_size=self.config.getint("archive", "http_pool_size", DEFAULT_HTTP_POOL_SIZE),
+            rate_limiter=AdaptiveRateLimiter.from_delay(
+                self.config.getfloat("archive", "rate_limit_delay", DEFAULT_RATE_LIMIT_DELAY),
+                self.config.getint("performance", "max_concurrent_requests", DEFAULT_MAX_CONCURRENT_REQUESTS)
+            ),
+            max_retries=self.config.getint("archive", "max_retries", DEFAULT_MAX_RETRIES),
+            cdx_url=self.config.get("archive", "cdx_url", DEFAULT_CDX_URL)
+        )
+        
+        # Background jobs for long-running tools
+        spill_dir = self.config.get("performance", "job_spill_dir", "")
+        if spill_dir and not Path(spill_dir).is_absolute():
+            spill_dir = self.plugin_path / spill_dir
+        self.jobs = JobManager(
+            max_concurrent=self.config.getint("performance", "max_concurrent_jobs", DEFAULT_MAX_CONCURRENT_JOBS),
+            max_age=self.config.getfloat("performance", "job_max_age", DEFAULT_JOB_MAX_AGE),
+            spill_dir=Path(spill_dir) if spill_dir else None,
+            spill_threshold=self.config.getint("performance", "job_spill_threshold", DEFAULT_JOB_SPILL_THRESHOLD)
+        )
+        
+        # Direct database access, created on first use
+        self.databases: Dict[str, WordPressDatabase] = {}
+        self._database_down_until: Dict[str, float] = {}
+        self.queue_worker: Optional[QueueWorker] = None
+        self.analytics: Dict[str, SubmissionAnalytics] = {}
+        self.mirrors: Dict[str, SQLiteMirror] = {}
+        self.analysis_cache = None
+        if self.config.getboolean("performance", "analysis_cache", True):
+            cache_path = Path(self.config.get("performance", "analysis_cache_path", DEFAULT_ANALYSIS_CACHE_PATH))
+            if not cache_path.is_absolute():
+                cache_path = self.plugin_path / cache_path
+            try:
+                self.analysis_cache = AnalysisCache(
+                    cache_path,
+                    max_entries=self.config.getint("performance", "analysis_cache_size", DEFAULT_ANALYSIS_CACHE_SIZE)
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Analysis cache unavailable ({cache_path}): {e}")
+        self.analysis_workers = self.config.getint("performance", "analysis_workers", DEFAULT_ANALYSIS_WORKERS)
+        self.analysis_workers = self.analysis_workers or os.cpu_count() or 1
+        self.analysis_pool: Optional[ProcessPoolExecutor] = None
+        self.symbol_indexes: Dict[str, SymbolIndex] = {}
+        self.queue_status_cache = QueueStatusCache(
+            ttl=self.config.getfloat("performance", "queue_status_ttl", DEFAULT_QUEUE_STATUS_TTL)
+        )
+        
+        # Conditional fetches of the site's own pages for change detection
+        self.change_detector = ChangeDetector(
+            timeout=self.config.getfloat("archive", "change_detection_timeout", DEFAULT_CHANGE_DETECTION_TIMEOUT),
+            pool_size=self.config.getint("archive", "http_pool_size", DEFAULT_HTTP_POOL_SIZE)
+        )
+        
+        # Local submission journal
+        self.journal = None
+        if self.config.getboolean("archive", "enable_journal", True):
+            journal_path = Path(self.config.get("archive", "journal_path", DEFAULT_JOURNAL_PATH))
+            if not journal_path.is_absolute():
+                journal_path = self.plugin_path / journal_path
+            try:
+                self.journal = SubmissionJournal(
+                    journal_path,
+                    dedupe_window=self.config.getfloat("archive", "dedupe_window", DEFAULT_DEDUPE_WINDOW),
+                    batch_size=self.config.getint("archive", "journal_batch_size", DEFAULT_JOURNAL_BATCH_SIZE)
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Submission journal unavailable ({journal_path}): {e}")
+        
+        # Availability answers cache
+        self.availability_cache = None
+        if self.config.getboolean("performance", "enable_caching", True):
+            cache_file = self.config.get("archive", "availability_cache_file", "")
+            self.availability_cache = AvailabilityCache(
+                ttl=self.config.getfloat("performance", "cache_ttl", DEFAULT_CACHE_TTL),
+                negative_ttl=self.config.getfloat("archive", "availability_negative_ttl",
+                                                  DEFAULT_NEGATIVE_CACHE_TTL),
+                max_entries=self.config.getint("archive", "availability_cache_size",
+                                               DEFAULT_AVAILABILITY_CACHE_SIZE),
+                persist_path=Path(cache_file) if cache_file else None
+            )
+        
+        # External tools
+        self.wp_cli_path = self.config.get("wordpress", "wp_cli_path", "wp")
+        self.php_path = self.config.get("development", "php_path", "php")
+        self.runner = CommandRunner(
+            default_timeout=self.config.getfloat("server", "timeout", DEFAULT_COMMAND_TIMEOUT)
+        )
+        
+        # Parallel, cached PHP syntax checks for wp_plugin_test
+        self.linter = PHPLinter(
+            self.runner,
+            php_path=self.php_path,
+            workers=self.config.getint("development", "lint_workers", DEFAULT_LINT_WORKERS),
+            use_server=self.config.getboolean("development", "lint_server", False),
+            cache=self.analysis_cache
+        )
         
-        # Archive.org API configuration
-        self.archive_api_config = {
-            "base_url": "https://web.archive.org/save/",
-            "availability_url": "https://archive.org/wayback/available",
-            "s3_test_url": "https://s3.us.archive.org/"
-        }
+        # Warm WP-CLI worker pools keyed by WordPress path
+        self.wp_pools: Dict[str, WPCLIWorkerPool] = {}
         
         logger.info("Spun Web Archive Forge MCP Server initialized")
 
@@ -186,11 +4077,11 @@ class SpunWebArchiveForgeMCPServer:
                 return {"success": False, "error": f"Plugin path does not exist: {plugin_path}"}
             
             # Use WP-CLI to install plugin
-            cmd = ["wp", "plugin", "install", str(plugin_path)]
+            cmd = [self.wp_cli_path, "plugin", "install", str(plugin_path)]
             if activate:
                 cmd.append("--activate")
             
-            result = subprocess.run(cmd, cwd=str(wp_path), capture_output=True, text=True)
+            result = await self.runner.run(cmd, cwd=str(wp_path))
             
             if result.returncode == 0:
                 logger.info(f"Plugin installed successfully: {plugin_path}")
@@ -216,8 +4107,8 @@ class SpunWebArchiveForgeMCPServer:
         try:
             wp_path = Path(wp_path)
             
-            cmd = ["wp", "plugin", "activate", plugin_slug]
-            result = subprocess.run(cmd, cwd=str(wp_path), capture_output=True, text=True)
+            cmd = [self.wp_cli_path, "plugin", "activate", plugin_slug]
+            result = await self.runner.run(cmd, cwd=str(wp_path))
             
             if result.returncode == 0:
                 logger.info(f"Plugin activated: {plugin_slug}")
@@ -242,8 +4133,8 @@ class SpunWebArchiveForgeMCPServer:
         try:
             wp_path = Path(wp_path)
             
-            cmd = ["wp", "plugin", "deactivate", plugin_slug]
-            result = subprocess.run(cmd, cwd=str(wp_path), capture_output=True, text=True)
+            cmd = [self.wp_cli_path, "plugin", "deactivate", plugin_slug]
+            result = await self.runner.run(cmd, cwd=str(wp_path))
             
             if result.returncode == 0:
                 logger.info(f"Plugin deactivated: {plugin_slug}")
@@ -268,11 +4159,11 @@ class SpunWebArchiveForgeMCPServer:
         try:
             wp_path = Path(wp_path)
             
-            cmd = ["wp", "plugin", "list", "--format=json"]
+            cmd = ["plugin", "list", "--format=json"]
             if status != "all":
-                cmd.extend(["--status", status])
+                cmd.append(f"--status={status}")
             
-            result = subprocess.run(cmd, cwd=str(wp_path), capture_output=True, text=True)
+            result = await self._wp(cmd, wp_path)
             
             if result.returncode == 0:
                 plugins = json.loads(result.stdout)
@@ -336,15 +4227,12 @@ class SpunWebArchiveForgeMCPServer:
             plugin_dir = Path(plugin_dir)
             wp_path = Path(wp_path)
             
-            # Check PHP syntax
-            syntax_errors = []
-            for php_file in plugin_dir.rglob("*.php"):
-                result = subprocess.run(["php", "-l", str(php_file)], capture_output=True, text=True)
-                if result.returncode != 0:
-                    syntax_errors.append({
-                        "file": str(php_file),
-                        "error": result.stderr.strip()
-                    })
+            # Check PHP syntax, in parallel and skipping files unchanged since their last check
+            lint = await self.linter.lint(sorted(plugin_dir.rglob("*.php")))
+            syntax_errors = [
+                {"file": file["file"], "line": file["line"], "error": file["error"]}
+                for file in lint["files"] if not file["ok"]
+            ]
             
             # Run WordPress compatibility tests
             test_results = await self._run_wordpress_tests(plugin_dir, wp_path)
@@ -353,6 +4241,7 @@ class SpunWebArchiveForgeMCPServer:
             return {
                 "success": True,
                 "syntax_errors": syntax_errors,
+                "lint": lint,
                 "wordpress_tests": test_results,
                 "overall_status": "pass" if not syntax_errors else "fail"
             }
@@ -377,7 +4266,7 @@ class SpunWebArchiveForgeMCPServer:
             
             ssh_cmd.extend([str(plugin_package), f"{server_user}@{server_host}:{server_path}"])
             
-            result = subprocess.run(ssh_cmd, capture_output=True, text=True)
+            result = await self.runner.run(ssh_cmd)
             
             if result.returncode == 0:
                 logger.info(f"Plugin deployed successfully to {server_host}")
@@ -481,14 +4370,14 @@ class SpunWebArchiveForgeMCPServer:
                 "overall_score": 0
             }
             
-            if analysis_type in ["security", "all"]:
-                analysis_results["security"] = await self._analyze_security(plugin_dir)
-            
-            if analysis_type in ["performance", "all"]:
-                analysis_results["performance"] = await self._analyze_performance(plugin_dir)
-            
-            if analysis_type in ["standards", "all"]:
-                analysis_results["standards"] = await self._analyze_standards(plugin_dir)
+            # The index walk also gives the scanner its file list
+            index = await self._get_symbol_index(plugin_dir)
+            analysis_results["symbols"] = index.summary()
+            categories = [category for category in ANALYSIS_SCORING if analysis_type in (category, "all")]
+            if categories:
+                scan = await self._analyze_plugin(plugin_dir, index, categories)
+                analysis_results.update(scan["categories"])
+                analysis_results["scan"] = scan["summary"]
             
             # Calculate overall score
             scores = []
@@ -510,6 +4399,100 @@ class SpunWebArchiveForgeMCPServer:
             logger.error(f"Error analyzing plugin: {e}")
             return {"success": False, "error": str(e)}
 
+    async def wp_plugin_analyze_bulk(self, wp_path: str = None, plugin_dirs: List[str] = None,
+                                     analysis_type: str = "all") -> Dict[str, Any]:
+        """Analyze every plugin of a WordPress installation, or the given plugin directories, in one pass"""
+        try:
+            if plugin_dirs:
+                roots = [Path(plugin_dir) for plugin_dir in plugin_dirs]
+            elif wp_path:
+                plugins_root = Path(wp_path) / "wp-content" / "plugins"
+                if not plugins_root.is_dir():
+                    return {"success": False, "error": f"No plugins directory at {plugins_root}"}
+                roots = sorted(path for path in plugins_root.iterdir() if path.is_dir())
+            else:
+                return {"success": False, "error": "wp_path or plugin_dirs is required"}
+            missing = [str(root) for root in roots if not root.is_dir()]
+            if missing:
+                return {"success": False, "error": f"Not a directory: {', '.join(missing)}"}
+            categories = [category for category in ANALYSIS_SCORING if analysis_type in (category, "all")]
+            if not categories:
+                return {"success": False, "error": f"Unknown analysis type: {analysis_type}"}
+            
+            # All plugins share one walk and one set of pool tasks
+            start_time = time.monotonic()
+            indexes = [await self._get_symbol_index(root) for root in roots]
+            scans = await self._scan_plugins(roots, indexes, categories)
+            elapsed = time.monotonic() - start_time
+            
+            plugins = []
+            for root, scan in zip(roots, scans):
+                results = self._score_scan(scan, categories)
+                for result in results.values():
+                    result["issue_count"] = len(result["issues"])
+                    result["issues"] = result["issues"][:MAX_REPORTED_ISSUES]
+                plugins.append({
+                    "plugin_dir": str(root),
+                    "overall_score": sum(result["score"] for result in results.values()) / len(results),
+                    "status": "pass" if all(result["status"] == "pass" for result in results.values()) else "fail",
+                    **results,
+                    "files_scanned": scan["files_scanned"],
+                    "files_rescanned": scan["files_rescanned"],
+                    "bytes_scanned": scan["bytes_scanned"]
+                })
+            
+            files = sum(scan["files_scanned"] for scan in scans)
+            rescanned = sum(scan["files_rescanned"] for scan in scans)
+            size = sum(scan["bytes_scanned"] for scan in scans)
+            logger.info(f"Bulk plugin analysis completed: {len(plugins)} plugins, {files} files in {elapsed:.2f}s")
+            return {
+                "success": True,
+                "plugins": plugins,
+                "summary": {
+                    "plugins": len(plugins),
+                    "passed": sum(1 for plugin in plugins if plugin["status"] == "pass"),
+                    "files_scanned": files,
+                    "files_rescanned": rescanned,
+                    "files_skipped": sum(scan["files_skipped"] for scan in scans),
+                    "bytes_scanned": size,
+                    "cache_hit_rate": round(1 - rescanned / files, 4) if files and self.analysis_cache else None,
+                    "parallel": any(scan["parallel"] for scan in scans),
+                    "workers": self.analysis_workers if any(scan["parallel"] for scan in scans) else 1,
+                    "elapsed_seconds": round(elapsed, 3),
+                    "files_per_second": round(files / elapsed, 1) if elapsed else None,
+                    "mb_per_second": round(size / 1048576 / elapsed, 2) if elapsed else None
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Error analyzing plugins: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def wp_plugin_symbols(self, plugin_dir: str, kind: str = None, name: str = None,
+                                limit: int = 500) -> Dict[str, Any]:
+        """Query the plugin's symbol index: classes, methods, functions, hooks, $wpdb queries, escaping calls"""
+        try:
+            plugin_dir = Path(plugin_dir)
+            if not plugin_dir.is_dir():
+                return {"success": False, "error": f"Not a directory: {plugin_dir}"}
+            if kind is not None and kind not in SYMBOL_KINDS:
+                return {"success": False, "error": f"Unknown symbol kind: {kind}"}
+            
+            index = await self._get_symbol_index(plugin_dir)
+            symbols = index.find(kind, name)
+            return {
+                "success": True,
+                "symbols": symbols[:limit],
+                "total": len(symbols),
+                "truncated": len(symbols) > limit,
+                "summary": index.summary(),
+                "index": index.get_stats()
+            }
+            
+        except Exception as e:
+            logger.error(f"Error querying plugin symbols: {e}")
+            return {"success": False, "error": str(e)}
+
     async def wp_plugin_generate_docs(self, plugin_dir: str, output_format: str = "markdown",
                                     include_api: bool = True) -> Dict[str, Any]:
         """Generate documentation for WordPress plugin"""
@@ -677,20 +4660,14 @@ class SpunWebArchiveForgeMCPServer:
 
     # Archive.org Integration Tools
     async def archive_submit_url(self, url: str, capture_all: bool = True, 
-                                capture_outlinks: bool = True) -> Dict[str, Any]:
+                                capture_outlinks: bool = True, force: bool = False,
+                                detect_changes: bool = None) -> Dict[str, Any]:
         """Submit URL to Archive.org for archiving"""
         try:
-            # This would integrate with your existing Archive.org functionality
-            logger.info(f"Submitting URL to Archive.org: {url}")
-            
-            # Simulate archive submission
-            return {
-                "success": True,
-                "message": f"URL '{url}' submitted to Archive.org",
-                "url": url,
-                "archive_url": f"https://web.archive.org/web/{url}",
-                "status": "submitted"
-            }
+            if detect_changes is None:
+                detect_changes = self.config.getboolean("archive", "change_detection", False)
+            return await self._submit_url(url, capture_all=capture_all, capture_outlinks=capture_outlinks,
+                                          force=force, detect_changes=detect_changes)
             
         except Exception as e:
             logger.error(f"Error submitting URL to Archive.org: {e}")
@@ -699,49 +4676,140 @@ class SpunWebArchiveForgeMCPServer:
     async def archive_check_status(self, url: str) -> Dict[str, Any]:
         """Check archive status for a URL"""
         try:
-            # This would check the actual archive status
             logger.info(f"Checking archive status for: {url}")
             
+            if self.availability_cache is not None:
+                availability, cached = await self.availability_cache.get_or_fetch(
+                    normalize_url(url), lambda: self.wayback.check_availability(url)
+                )
+            else:
+                availability, cached = await self.wayback.check_availability(url), False
+            
             return {
                 "success": True,
                 "url": url,
-                "is_archived": True,
-                "archive_url": f"https://web.archive.org/web/{url}",
-                "last_captured": "2024-01-01T00:00:00Z"
+                "is_archived": availability["available"],
+                "archive_url": availability.get("archive_url"),
+                "last_captured": self._format_wayback_timestamp(availability.get("timestamp")),
+                "cached": cached
             }
             
         except Exception as e:
             logger.error(f"Error checking archive status: {e}")
             return {"success": False, "error": str(e)}
 
+    async def archive_check_status_bulk(self, urls: List[str]) -> Dict[str, Any]:
+        """Check archive status for many URLs with batched CDX index lookups"""
+        try:
+            start_time = time.monotonic()
+            keys = [self._capture_key(url) for url in urls]
+            latest: Dict[str, Optional[str]] = {}
+            cache_hits = 0
+            
+            # Answer what we can from the availability cache
+            pending = {}
+            for url, key in zip(urls, keys):
+                if key in latest or key in pending:
+                    continue
+                cached = self.availability_cache.get(normalize_url(url)) if self.availability_cache else None
+                if cached is not None:
+                    cache_hits += 1
+                    latest[key] = cached.get("timestamp") if cached.get("available") else None
+                else:
+                    pending[key] = url
+            
+            groups = self._cdx_groups(sorted(pending))
+            cdx_requests = 0
+            failed = set()
+            
+            async def exact(key: str):
+                nonlocal cdx_requests
+                cdx_requests += 1
+                try:
+                    async for original, timestamp in self.wayback.latest_captures(pending[key], "exact"):
+                        if self._capture_key(original) == key and timestamp > (latest.get(key) or ""):
+                            latest[key] = timestamp
+                    latest.setdefault(key, None)
+                except Exception as e:
+                    logger.warning(f"CDX lookup failed for {pending[key]}: {e}")
+                    failed.add(key)
+            
+            async def lookup(group_keys: List[str]):
+                nonlocal cdx_requests
+                if len(group_keys) == 1:
+                    await exact(group_keys[0])
+                    return
+                # Capture keys carry no scheme, which CDX prefixes ignore anyway
+                prefix = os.path.commonprefix(group_keys)
+                budget = len(group_keys) * CDX_PREFIX_LINES_PER_URL
+                found: Dict[str, str] = {}
+                lines, last = 0, None
+                cdx_requests += 1
+                try:
+                    async for original, timestamp in self.wayback.latest_captures(prefix, "prefix", budget):
+                        lines += 1
+                        last = self._capture_key(original)
+                        if last in pending and timestamp > found.get(last, ""):
+                            found[last] = timestamp
+                except Exception as e:
+                    logger.warning(f"CDX prefix lookup failed for {prefix}: {e}")
+                    lines, found = budget, {}
+                if lines >= budget:
+                    # Lines are sorted by URL, so a cut-off stream is complete for
+                    # every URL but the last one seen; look the rest up one by one
+                    rest = [key for key in group_keys if key not in found or key == last]
+                    found = {key: timestamp for key, timestamp in found.items() if key not in rest}
+                    await asyncio.gather(*(exact(key) for key in rest))
+                for key in group_keys:
+                    if key in found:
+                        latest[key] = found[key]
+                    elif key not in failed:
+                        latest.setdefault(key, None)
+            
+            await asyncio.gather(*(lookup(group_keys) for group_keys in groups))
+            
+            # Failed lookups are reported as unresolved and not cached
+            if self.availability_cache is not None:
+                for key, url in pending.items():
+                    if key in failed:
+                        continue
+                    timestamp = latest[key]
+                    self.availability_cache.put(normalize_url(url), {
+                        "available": True,
+                        "timestamp": timestamp,
+                        "archive_url": f"https://web.archive.org/web/{timestamp}/{url}"
+                    } if timestamp else {"available": False})
+            
+            timestamps = [latest.get(key) for key in keys]
+            archived = sum(1 for timestamp in timestamps if timestamp)
+            
+            logger.info(f"Bulk status check: {archived}/{len(urls)} archived, {cdx_requests} CDX requests")
+            return {
+                "success": True,
+                "count": len(urls),
+                "archived": archived,
+                "cdx_requests": cdx_requests,
+                "unresolved": [index for index, key in enumerate(keys) if key in failed],
+                "cache_hits": cache_hits,
+                "elapsed_seconds": round(time.monotonic() - start_time, 3),
+                "timestamps": timestamps
+            }
+            
+        except Exception as e:
+            logger.error(f"Error checking bulk archive status: {e}")
+            return {"success": False, "error": str(e)}
+
     async def archive_submit_post(self, post_id: int, wp_path: str) -> Dict[str, Any]:
         """Submit WordPress post to Internet Archive"""
         try:
             wp_path = Path(wp_path)
             
             # Get post URL from WordPress
-            cmd = ["wp", "post", "get", str(post_id), "--field=url", "--format=json"]
-            result = subprocess.run(cmd, cwd=str(wp_path), capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                return {"success": False, "error": f"Failed to get post URL: {result.stderr}"}
-            
-            post_url = result.stdout.strip()
+            post_url, error = await self._get_post_url(post_id, wp_path)
+            if error:
+                return {"success": False, "error": f"Failed to get post URL: {error}"}
             
-            # Submit to Archive.org
-            archive_result = await self.archive_submit_url(post_url)
-            
-            if archive_result["success"]:
-                logger.info(f"Post {post_id} submitted to Archive.org: {post_url}")
-                return {
-                    "success": True,
-                    "message": f"Post {post_id} submitted to Archive.org",
-                    "post_id": post_id,
-                    "post_url": post_url,
-                    "archive_url": archive_result["archive_url"]
-                }
-            else:
-                return archive_result
+            return await self._submit_post_row({"ID": post_id, "url": post_url, "post_type": "post"})
                 
         except Exception as e:
             logger.error(f"Error submitting post to Archive.org: {e}")
@@ -753,134 +4821,1087 @@ class SpunWebArchiveForgeMCPServer:
             wp_path = Path(wp_path)
             
             # Get page URL from WordPress
-            cmd = ["wp", "post", "get", str(page_id), "--field=url", "--format=json"]
-            result = subprocess.run(cmd, cwd=str(wp_path), capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                return {"success": False, "error": f"Failed to get page URL: {result.stderr}"}
-            
-            page_url = result.stdout.strip()
+            page_url, error = await self._get_post_url(page_id, wp_path)
+            if error:
+                return {"success": False, "error": f"Failed to get page URL: {error}"}
             
-            # Submit to Archive.org
-            archive_result = await self.archive_submit_url(page_url)
-            
-            if archive_result["success"]:
-                logger.info(f"Page {page_id} submitted to Archive.org: {page_url}")
-                return {
-                    "success": True,
-                    "message": f"Page {page_id} submitted to Archive.org",
-                    "page_id": page_id,
-                    "page_url": page_url,
-                    "archive_url": archive_result["archive_url"]
-                }
-            else:
-                return archive_result
+            return await self._submit_post_row({"ID": page_id, "url": page_url, "post_type": "page"})
                 
         except Exception as e:
             logger.error(f"Error submitting page to Archive.org: {e}")
             return {"success": False, "error": str(e)}
 
     async def archive_bulk_submit(self, wp_path: str, post_ids: List[int] = None, 
-                                post_type: str = "all") -> Dict[str, Any]:
+                                post_type: str = "all", concurrency: int = None,
+                                per_host_limit: int = None, include_results: bool = False,
+                                resume: bool = True, incremental: bool = False,
+                                detect_changes: bool = None) -> Dict[str, Any]:
         """Bulk submit multiple WordPress posts/pages to Internet Archive"""
         try:
             wp_path = Path(wp_path)
+            journal = self.journal
+            if detect_changes is None:
+                detect_changes = self.config.getboolean("archive", "change_detection", False)
+            unchanged_skipped = 0
             
-            if post_ids is None:
-                # Get all posts/pages if no IDs specified
-                if post_type == "all":
-                    cmd = ["wp", "post", "list", "--post_type=post,page", "--field=ID", "--format=json"]
-                else:
-                    cmd = ["wp", "post", "list", f"--post_type={post_type}", "--field=ID", "--format=json"]
-                
-                result = subprocess.run(cmd, cwd=str(wp_path), capture_output=True, text=True)
-                
-                if result.returncode != 0:
-                    return {"success": False, "error": f"Failed to get posts: {result.stderr}"}
-                
-                post_ids = [int(id.strip()) for id in result.stdout.strip().split('\n') if id.strip()]
+            if incremental:
+                if journal is None:
+                    return {"success": False, "error": "Incremental submission requires the submission journal"}
+                if post_ids:
+                    return {"success": False, "error": "Incremental submission cannot be combined with post_ids"}
+                # The site's watermark is the (post_modified_gmt, ID) below which
+                # every published post has been archived; it is never cleared
+                job_key = "watermark:" + hashlib.sha1(json.dumps(
+                    [str(wp_path.resolve()), post_type]
+                ).encode("utf-8")).hexdigest()
+            else:
+                # A job is identified by what it enumerates; its checkpoint is the
+                # highest post ID below which every row has been processed, so
+                # explicit IDs are enumerated in ID order
+                if post_ids:
+                    post_ids = sorted({int(post_id) for post_id in post_ids})
+                job_key = hashlib.sha1(json.dumps(
+                    [str(wp_path.resolve()), post_type, post_ids or None]
+                ).encode("utf-8")).hexdigest()
+            resumed_from = None
+            if journal is not None and (resume or incremental):
+                resumed_from = journal.get_checkpoint(job_key)
+            checkpoint = OrderedCheckpoint(tuple(resumed_from) if incremental and resumed_from else resumed_from)
+            resume_skipped = 0
+            max_attempts = max(1, self.config.getint("archive", "watermark_max_attempts",
+                                                     DEFAULT_WATERMARK_MAX_ATTEMPTS))
+            given_up: Dict[int, int] = {}
+            
+            if concurrency is None:
+                concurrency = self.config.getint("performance", "max_concurrent_requests",
+                                                 DEFAULT_MAX_CONCURRENT_REQUESTS)
+            if per_host_limit is None:
+                per_host_limit = self.config.getint("archive", "per_host_limit", DEFAULT_PER_HOST_LIMIT)
+            
+            results = [] if include_results else None
             
-            # Submit each post/page
-            results = []
-            for post_id in post_ids:
-                if post_type == "page":
-                    result = await self.archive_submit_page(post_id, str(wp_path))
+            def position(row: Dict[str, Any]):
+                return (row["post_modified_gmt"], row["ID"]) if incremental else row["ID"]
+            
+            async def rows() -> AsyncIterator[Dict[str, Any]]:
+                nonlocal resume_skipped
+                if incremental:
+                    source = self._iter_modified_rows(wp_path, post_type, resumed_from)
                 else:
-                    result = await self.archive_submit_post(post_id, str(wp_path))
-                results.append(result)
+                    source = self._iter_post_rows(wp_path, post_type, post_ids)
+                async for row in source:
+                    if not incremental and resumed_from is not None and row["ID"] <= resumed_from:
+                        resume_skipped += 1
+                        continue
+                    checkpoint.add(position(row))
+                    yield row
             
-            successful = sum(1 for r in results if r["success"])
+            def finished(row: Dict[str, Any], success: bool = True, error: Optional[str] = None):
+                # A failed post holds the watermark so the next incremental run
+                # retries it, until it has failed max_attempts runs in a row
+                if incremental and success:
+                    journal.clear_failures(job_key, row["ID"])
+                elif incremental:
+                    attempts = journal.count_failure(job_key, row["ID"], error)
+                    if attempts < max_attempts:
+                        return
+                    given_up[row["ID"]] = attempts
+                    journal.clear_failures(job_key, row["ID"])
+                    logger.warning(f"Giving up on post {row['ID']} after {attempts} failed runs: {error}")
+                checkpoint.done(position(row))
+                if journal is not None and journal.needs_flush:
+                    journal.flush(job_key, checkpoint.advance())
             
-            logger.info(f"Bulk submission completed: {successful}/{len(post_ids)} successful")
-            return {
+            async def submit(row: Dict[str, Any]) -> Dict[str, Any]:
+                return await self._submit_post_row(row, detect_changes=detect_changes)
+            
+            async def record(row: Dict[str, Any], result: Dict[str, Any]):
+                nonlocal unchanged_skipped
+                if result.get("unchanged"):
+                    unchanged_skipped += 1
+                if results is not None:
+                    results.append(dict(result, post_id=row["ID"]) if "post_id" not in result else result)
+                finished(row, result.get("success", False), result.get("error"))
+            
+            async def progress(summary: Dict[str, Any], final: bool):
+                await self._report_progress(
+                    summary["processed"],
+                    summary["enumerated"] - summary["duplicates"] if pipeline.enumerated_all else None,
+                    f"{summary['successful']} submitted, {summary['failed']} failed"
+                )
+            
+            # Resolve IDs and permalinks a page at a time and submit each row
+            # through the path matching its own post type
+            pipeline = SubmissionPipeline(
+                submit,
+                concurrency=concurrency,
+                per_host_limit=per_host_limit,
+                on_result=record,
+                on_progress=progress,
+                on_skip=finished
+            )
+            try:
+                summary = await pipeline.run(rows())
+            finally:
+                # Commit whatever finished so an interrupted job resumes from here
+                if journal is not None:
+                    journal.flush(job_key, checkpoint.advance())
+            
+            if journal is not None and not incremental:
+                journal.clear_checkpoint(job_key)
+            for failure in summary["failures"]:
+                if failure["post_id"] in given_up:
+                    failure.update(attempts=given_up[failure["post_id"]], watermark_passed=True)
+            
+            total = summary["processed"]
+            successful = summary["successful"]
+            
+            logger.info(f"Bulk submission completed: {successful}/{total} successful")
+            response = {
                 "success": True,
-                "message": f"Bulk submission completed: {successful}/{len(post_ids)} successful",
-                "total_submitted": len(post_ids),
+                "message": f"Bulk submission completed: {successful}/{total} successful",
+                "total_submitted": total,
                 "successful": successful,
-                "failed": len(post_ids) - successful,
-                "results": results
+                "failed": summary["failed"],
+                "duplicates_skipped": summary["duplicates"],
+                "unchanged_skipped": unchanged_skipped,
+                "resumed_from": resumed_from,
+                "resume_skipped": resume_skipped,
+                "given_up": len(given_up),
+                "watermark": list(checkpoint.position) if incremental and checkpoint.position else None,
+                "elapsed_seconds": summary["elapsed_seconds"],
+                "rate_per_second": summary["rate_per_second"],
+                "failures": summary["failures"]
             }
+            if results is not None:
+                response["results"] = results
+            return response
             
         except Exception as e:
             logger.error(f"Error in bulk submission: {e}")
             return {"success": False, "error": str(e)}
 
     async def archive_get_submission_history(self, wp_path: str, limit: int = 50, 
-                                           status: str = None) -> Dict[str, Any]:
+                                           status: str = None, cursor: str = None,
+                                           columns: List[str] = None, post_id: int = None,
+                                           since: str = None, until: str = None,
+                                           url_prefix: str = None, max_staleness: float = None) -> Dict[str, Any]:
         """Get submission history from WordPress database"""
         try:
             wp_path = Path(wp_path)
+            limit = max(1, min(int(limit), HISTORY_MAX_PAGE_SIZE))
+            filters = {"status": status, "post_id": post_id, "since": since, "until": until,
+                       "url_prefix": url_prefix}
             
-            # Query the submission history table
-            cmd = ["wp", "db", "query", f"SELECT * FROM wp_swap_submissions_history ORDER BY submitted_at DESC LIMIT {limit}"]
-            
-            if status:
-                cmd = ["wp", "db", "query", f"SELECT * FROM wp_swap_submissions_history WHERE status = '{status}' ORDER BY submitted_at DESC LIMIT {limit}"]
-            
-            result = subprocess.run(cmd, cwd=str(wp_path), capture_output=True, text=True)
+            # One extra row tells whether another page follows
+            records, source = await self._history_page(wp_path, filters, columns, cursor, limit + 1,
+                                                       max_staleness)
+            next_cursor = None
+            if len(records) > limit:
+                records = records[:limit]
+                next_cursor = self._encode_history_cursor(records[-1])
             
-            if result.returncode != 0:
-                return {"success": False, "error": f"Failed to get submission history: {result.stderr}"}
-            
-            # Parse the results (this would need proper parsing in a real implementation)
-            logger.info(f"Retrieved submission history: {limit} records")
+            logger.info(f"Retrieved submission history: {len(records)} records")
             return {
                 "success": True,
                 "message": "Submission history retrieved successfully",
-                "records": result.stdout,
+                "records": records,
+                "count": len(records),
                 "limit": limit,
-                "status_filter": status
+                "next_cursor": next_cursor,
+                "filters": {key: value for key, value in filters.items() if value is not None},
+                "source": source
             }
             
         except Exception as e:
             logger.error(f"Error getting submission history: {e}")
             return {"success": False, "error": str(e)}
 
-    async def archive_get_queue_status(self, wp_path: str) -> Dict[str, Any]:
+    async def archive_export_submission_history(self, wp_path: str, output_path: str,
+                                                status: str = None, columns: List[str] = None,
+                                                post_id: int = None, since: str = None, until: str = None,
+                                                url_prefix: str = None, max_staleness: float = None) -> Dict[str, Any]:
+        """Stream the (filtered) submission history to a JSON Lines file"""
+        try:
+            wp_path = Path(wp_path)
+            output_path = Path(output_path)
+            filters = {"status": status, "post_id": post_id, "since": since, "until": until,
+                       "url_prefix": url_prefix}
+            
+            exported = 0
+            temp_path = output_path.with_name(output_path.name + ".tmp")
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                async for record in self._iter_history(wp_path, filters, columns, max_staleness=max_staleness):
+                    handle.write(json.dumps(record) + "\n")
+                    exported += 1
+                    if exported % HISTORY_MAX_PAGE_SIZE == 0:
+                        await self._report_progress(exported, message=f"{exported} records exported")
+            os.replace(temp_path, output_path)
+            
+            logger.info(f"Exported {exported} submission history records to {output_path}")
+            return {
+                "success": True,
+                "message": f"Exported {exported} records",
+                "output_path": str(output_path),
+                "exported": exported
+            }
+            
+        except Exception as e:
+            logger.error(f"Error exporting submission history: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def archive_get_queue_status(self, wp_path: str, window_minutes: int = 15,
+                                       since: int = None) -> Dict[str, Any]:
         """Get current archive queue status"""
         try:
             wp_path = Path(wp_path)
+            window_minutes = max(1, int(window_minutes))
+            key = (str(wp_path.resolve()), window_minutes)
+            
+            (version, snapshot), cached = await self.queue_status_cache.get_or_fetch(
+                key, lambda: self._queue_status_snapshot(wp_path, window_minutes)
+            )
+            oldest_pending_age = None
+            if to_epoch(snapshot["oldest_pending"]) >= 0:
+                oldest_pending_age = max(0, to_epoch(datetime.now()) - to_epoch(snapshot["oldest_pending"]))
+            status = {
+                "success": True,
+                "message": "Queue status retrieved successfully",
+                "version": version,
+                "cached": cached,
+                "oldest_pending_age": oldest_pending_age
+            }
+            
+            # Pollers sending the version they last saw get only the changes
+            if since is not None:
+                previous = self.queue_status_cache.previous(key, int(since))
+                if previous is not None:
+                    changes = QueueStatusCache.diff(previous, snapshot)
+                    return dict(status, delta=True, changed=bool(changes), changes=changes)
+            
+            logger.info("Retrieved archive queue status")
+            return dict(status, delta=False, **snapshot)
+            
+        except Exception as e:
+            logger.error(f"Error getting queue status: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def archive_analytics(self, wp_path: str, days: int = 30, refresh: bool = False,
+                                max_staleness: float = None) -> Dict[str, Any]:
+        """Throughput, success rates, retries and time to archive per day, post type and status"""
+        try:
+            wp_path = Path(wp_path)
+            key = str(wp_path.resolve())
+            if refresh or key not in self.analytics:
+                self.analytics[key] = SubmissionAnalytics()
+            analytics = self.analytics[key]
+            
+            start_time = time.monotonic()
+            async with analytics.lock:
+                loaded, source = await self._load_analytics(wp_path, analytics, max_staleness)
+                summary = analytics.summary(max(0, int(days)))
+            
+            logger.info(f"Computed archive analytics: {loaded} new rows loaded")
+            return {
+                "success": True,
+                "message": "Archive analytics computed successfully",
+                "days": max(0, int(days)),
+                "loaded_rows": loaded,
+                "elapsed_ms": round((time.monotonic() - start_time) * 1000, 1),
+                "source": source,
+                **summary
+            }
+            
+        except Exception as e:
+            logger.error(f"Error computing archive analytics: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def archive_mirror_sync(self, wp_path: str) -> Dict[str, Any]:
+        """Copy new and changed rows of the plugin's tables into the local SQLite mirror"""
+        try:
+            wp_path = Path(wp_path)
+            database = self._get_database(wp_path)
+            mirror = self._get_mirror(database)
+            if mirror is None:
+                return {"success": False, "error": "Reporting mirror is disabled ([database] mirror_enabled)"}
             
-            # Query the queue table
-            cmd = ["wp", "db", "query", "SELECT status, COUNT(*) as count FROM wp_swap_archive_queue GROUP BY status"]
-            result = subprocess.run(cmd, cwd=str(wp_path), capture_output=True, text=True)
+            start_time = time.monotonic()
+            tables = {}
+            async with mirror.lock:
+                for spec in SQLiteMirror.TABLES:
+                    if spec.config_key:
+                        table = self._table(spec.config_key, spec.name, database)
+                    else:
+                        table = database.table_prefix + spec.name
+                    
+                    async def fetch(sql: str, params: Dict[str, Any], key: str = spec.key) -> List[Dict[str, Any]]:
+                        rows, _ = await self._query(wp_path, sql, params, {key: int})
+                        return rows
+                    
+                    try:
+                        tables[table] = await mirror.sync_table(spec, table, fetch)
+                    except Exception as e:
+                        if not spec.optional:
+                            raise
+                        tables[table] = {"skipped": True, "error": str(e)}
+                mirror.stats["syncs"] += 1
+            
+            copied = sum(t.get("new_rows", 0) + t.get("changed_rows", 0) + t.get("refreshed_rows", 0)
+                         for t in tables.values())
+            deleted = sum(t.get("deleted_rows", 0) for t in tables.values())
+            logger.info(f"Mirror sync copied {copied} rows to {mirror.path}, deleted {deleted}")
+            return {
+                "success": True,
+                "message": f"Mirror synced: {copied} rows copied, {deleted} deleted",
+                "mirror_path": str(mirror.path),
+                "tables": tables,
+                "elapsed_seconds": round(time.monotonic() - start_time, 3)
+            }
+            
+        except Exception as e:
+            logger.error(f"Error syncing mirror: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def archive_queue_drain(self, max_batches: int = None, batch_size: int = None,
+                                  concurrency: int = None) -> Dict[str, Any]:
+        """Lease and submit pending rows of wp_swap_archive_queue directly from the database"""
+        try:
+            worker = self._get_queue_worker()
+            summary = await worker.drain(max_batches, batch_size=batch_size, concurrency=concurrency)
+            logger.info(f"Queue drain completed: {summary['completed']}/{summary['leased']} archived")
+            return dict(
+                summary,
+                success=True,
+                message=f"Queue drain completed: {summary['completed']}/{summary['leased']} archived"
+            )
+            
+        except Exception as e:
+            logger.error(f"Error draining archive queue: {e}")
+            return {"success": False, "error": str(e)}
+
+
+    async def archive_queue_workers(self) -> Dict[str, Any]:
+        """List queue workers sharing the archive queue with their partitions and throughput"""
+        try:
+            worker = self._get_queue_worker()
+            if worker.leases is None:
+                return {"success": False, "error": "Queue sharding is disabled (queue_partitions = 0)"}
+            
+            workers = await worker.db.run(worker.leases.workers)
+            return {
+                "success": True,
+                "partitions": worker.leases.partitions,
+                "workers": workers,
+                "active": sum(1 for w in workers if w["active"])
+            }
+            
+        except Exception as e:
+            logger.error(f"Error listing queue workers: {e}")
+            return {"success": False, "error": str(e)}
+
+    # Job Tools
+    async def job_start(self, tool: str, arguments: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Start a tool call as a background job and return its job id"""
+        try:
+            if tool not in TOOL_NAMES or tool.startswith("job_"):
+                return {"success": False, "error": f"Tool '{tool}' cannot be run as a job"}
+            
+            method = getattr(self, tool)
+            job = self.jobs.start(tool, arguments or {}, lambda args: method(**args))
+            logger.info(f"Started job {job.id}: {tool}")
+            return dict(job.to_dict(), success=True, message=f"Job {job.id} started")
+            
+        except Exception as e:
+            logger.error(f"Error starting job: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def job_status(self, job_id: str) -> Dict[str, Any]:
+        """Get the status and latest progress of a background job"""
+        try:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return {"success": False, "error": f"Job '{job_id}' not found"}
+            return dict(job.to_dict(), success=True)
+            
+        except Exception as e:
+            logger.error(f"Error getting job status: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def job_result(self, job_id: str, offset: int = 0,
+                         limit: int = DEFAULT_JOB_RESULT_PAGE_SIZE) -> Dict[str, Any]:
+        """Get a finished job's result, paginating its list fields"""
+        try:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return {"success": False, "error": f"Job '{job_id}' not found"}
+            if not job.finished:
+                return {"success": False, "error": f"Job '{job_id}' is still {job.status.value}",
+                        "status": job.status.value}
+            
+            result = self.jobs.result(job)
+            totals = {}
+            if result is not None:
+                result = dict(result)
+                for key, value in result.items():
+                    if isinstance(value, list):
+                        totals[key] = len(value)
+                        result[key] = value[offset:offset + limit]
+            
+            more = any(total > offset + limit for total in totals.values())
+            return {
+                "success": True,
+                "job_id": job.id,
+                "status": job.status.value,
+                "error": job.error,
+                "result": result,
+                "pagination": {
+                    "offset": offset,
+                    "limit": limit,
+                    "totals": totals,
+                    "next_offset": offset + limit if more else None
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting job result: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def job_cancel(self, job_id: str) -> Dict[str, Any]:
+        """Cancel a queued or running background job"""
+        try:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return {"success": False, "error": f"Job '{job_id}' not found"}
+            if not self.jobs.cancel(job):
+                return {"success": False, "error": f"Job '{job_id}' is already {job.status.value}"}
+            
+            logger.info(f"Cancelling job {job.id}")
+            return {"success": True, "message": f"Job {job.id} cancellation requested", "job_id": job.id}
+            
+        except Exception as e:
+            logger.error(f"Error cancelling job: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def job_list(self, status: str = None) -> Dict[str, Any]:
+        """List background jobs, optionally filtered by status"""
+        try:
+            jobs = [job.to_dict() for job in self.jobs.list(status)]
+            return {"success": True, "jobs": jobs, "count": len(jobs)}
+            
+        except Exception as e:
+            logger.error(f"Error listing jobs: {e}")
+            return {"success": False, "error": str(e)}
+
+    # Server Tools
+    async def server_stats(self) -> Dict[str, Any]:
+        """Get server runtime statistics"""
+        try:
+            return {
+                "success": True,
+                "commands": self.runner.get_stats(),
+                "wp_worker_pools": {path: pool.get_stats() for path, pool in self.wp_pools.items()},
+                "wayback_client": self.wayback.get_stats(),
+                "rate_limiter": self.wayback.rate_limiter.get_stats(),
+                "availability_cache": self.availability_cache.get_stats() if self.availability_cache else None,
+                "journal": self.journal.get_stats() if self.journal else None,
+                "change_detection": self.change_detector.get_stats(),
+                "jobs": self.jobs.get_stats(),
+                "databases": [database.get_stats() for database in self.databases.values()],
+                "queue_worker": self.queue_worker.get_stats() if self.queue_worker else None,
+                "queue_status_cache": self.queue_status_cache.get_stats(),
+                "analysis_cache": self.analysis_cache.get_stats() if self.analysis_cache else None,
+                "symbol_indexes": [index.get_stats() for index in self.symbol_indexes.values()],
+                "linter": self.linter.get_stats(),
+                "analytics": {path: analytics.get_stats() for path, analytics in self.analytics.items()},
+                "mirrors": [mirror.get_stats() for mirror in self.mirrors.values()]
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting server stats: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def _close(self):
+        """Release long-lived resources such as warm WP-CLI workers"""
+        await self.jobs.close()
+        for pool in self.wp_pools.values():
+            await pool.close()
+        await self.wayback.close()
+        await self.change_detector.close()
+        await self.linter.close()
+        if self.availability_cache is not None:
+            self.availability_cache.save()
+        if self.journal is not None:
+            self.journal.close()
+        for database in self.databases.values():
+            database.close()
+        for mirror in self.mirrors.values():
+            mirror.close()
+        if self.analysis_cache is not None:
+            self.analysis_cache.close()
+        if self.analysis_pool is not None:
+            self.analysis_pool.shutdown(wait=False, cancel_futures=True)
+
+    # Helper Methods
+    def _get_database(self, wp_path: Optional[Path] = None) -> WordPressDatabase:
+        """Get the pooled connection for a site, shared by sites on the same database"""
+        url, table_prefix = WordPressDatabase.resolve_url(self.config, wp_path)
+        key = url.render_as_string(hide_password=False)
+        if key not in self.databases:
+            self.databases[key] = WordPressDatabase(
+                url,
+                pool_size=self.config.getint("database", "pool_size", DEFAULT_DB_POOL_SIZE),
+                table_prefix=table_prefix
+            )
+        return self.databases[key]
+
+    def _table(self, key: str, name: str, database: WordPressDatabase) -> str:
+        """Get a plugin table name from [database], else the site's prefix plus name"""
+        table = self.config.get("database", key, "") or database.table_prefix + name
+        if not re.fullmatch(r"\w+", table):
+            raise ValueError(f"Invalid table name: {table}")
+        return table
+
+    def _get_mirror(self, database: WordPressDatabase) -> Optional[SQLiteMirror]:
+        """Get the local mirror of a database, or None when mirroring is disabled"""
+        if not self.config.getboolean("database", "mirror_enabled", False):
+            return None
+        key = database.url.render_as_string(hide_password=False)
+        if key not in self.mirrors:
+            # One file per source database, named after it
+            path = Path(self.config.get("database", "mirror_path", DEFAULT_MIRROR_PATH))
+            if not path.is_absolute():
+                path = self.plugin_path / path
+            digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+            self.mirrors[key] = SQLiteMirror(
+                path.with_name(f"{path.stem}-{digest}{path.suffix}"),
+                batch_size=self.config.getint("database", "mirror_batch_size", DEFAULT_MIRROR_BATCH_SIZE),
+                reconcile_interval=self.config.getfloat("database", "mirror_reconcile_interval",
+                                                        DEFAULT_MIRROR_RECONCILE_INTERVAL)
+            )
+        return self.mirrors[key]
+
+    def _mirror_staleness(self, max_staleness: Optional[float]) -> Optional[float]:
+        if max_staleness is None:
+            return self.config.getfloat("database", "mirror_max_staleness", DEFAULT_MIRROR_MAX_STALENESS)
+        return max_staleness
+
+    @staticmethod
+    def _encode_history_cursor(record: Dict[str, Any]) -> str:
+        position = json.dumps([record["submission_date"], record["id"]])
+        return base64.urlsafe_b64encode(position.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_history_cursor(cursor: str) -> tuple:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            submission_date, record_id = json.loads(base64.urlsafe_b64decode(padded))
+            return str(submission_date), int(record_id)
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid history cursor") from e
+
+    async def _history_page(self, wp_path: Path, filters: Dict[str, Any], columns: Optional[List[str]],
+                            cursor: Optional[str], limit: int, max_staleness: Optional[float] = None) -> tuple:
+        """Fetch one page of history, newest first, by keyset on (submission_date, id)
+        
+        Each page continues below the last row of the previous one, so deep
+        pages cost the same as the first. Rows without a submission_date
+        cannot be positioned and are not returned.
+        """
+        columns = columns or HISTORY_DEFAULT_COLUMNS
+        unknown = set(columns) - set(HISTORY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown history columns: {', '.join(sorted(unknown))}")
+        # The cursor is built from id and submission_date
+        selected = [column for column in HISTORY_COLUMNS
+                    if column in columns or column in ("id", "submission_date")]
+        
+        table = self._table("submissions_table", "swap_submissions_history", self._get_database(wp_path))
+        conditions = ["submission_date IS NOT NULL"]
+        params: Dict[str, Any] = {"limit": limit}
+        if filters.get("status"):
+            conditions.append("status = :status")
+            params["status"] = filters["status"]
+        if filters.get("post_id") is not None:
+            conditions.append("post_id = :post_id")
+            params["post_id"] = int(filters["post_id"])
+        if filters.get("since"):
+            conditions.append("submission_date >= :since")
+            params["since"] = filters["since"]
+        if filters.get("until"):
+            conditions.append("submission_date < :until")
+            params["until"] = filters["until"]
+        if filters.get("url_prefix"):
+            conditions.append("post_url LIKE :url_prefix ESCAPE '!'")
+            params["url_prefix"] = re.sub(r"([!%_])", r"!\1", filters["url_prefix"]) + "%"
+        if cursor:
+            params["cursor_date"], params["cursor_id"] = self._decode_history_cursor(cursor)
+            conditions.append("(submission_date < :cursor_date OR (submission_date = :cursor_date AND id < :cursor_id))")
+        
+        sql = (f"SELECT {', '.join(selected)} FROM {table} WHERE {' AND '.join(conditions)} "
+               f"ORDER BY submission_date DESC, id DESC LIMIT :limit")
+        return await self._query(wp_path, sql, params, HISTORY_COLUMN_TYPES, [table], max_staleness)
+
+    async def _load_analytics(self, wp_path: Path, analytics: SubmissionAnalytics,
+                              max_staleness: Optional[float] = None) -> tuple:
+        """Append history and queue rows above each table's id watermark"""
+        database = self._get_database(wp_path)
+        history = self._table("submissions_table", "swap_submissions_history", database)
+        queue = self._table("queue_table", "swap_archive_queue", database)
+        posts = f"{database.table_prefix}posts"
+        sources = [
+            (analytics.history, [history, posts],
+             f"SELECT h.id, h.status, h.submission_date, p.post_type FROM {history} h "
+             f"LEFT JOIN {posts} p ON p.ID = h.post_id "
+             f"WHERE h.id > :after ORDER BY h.id ASC LIMIT :limit"),
+            (analytics.queue, [queue],
+             f"SELECT id, status, post_type, attempts, created_at, archived_at FROM {queue} "
+             f"WHERE id > :after ORDER BY id ASC LIMIT :limit")
+        ]
+        
+        loaded, source = 0, None
+        for table, tables, sql in sources:
+            after = table.rewind()
+            while True:
+                rows, source = await self._query(wp_path, sql, {"after": after, "limit": ANALYTICS_PAGE_SIZE},
+                                                 {"id": int}, tables, max_staleness)
+                table.append(rows)
+                loaded += len(rows)
+                if len(rows) < ANALYTICS_PAGE_SIZE:
+                    break
+                after = rows[-1]["id"]
+            table.settle()
+        analytics.loaded_at = time.time()
+        return loaded, source
+
+    async def _queue_status_snapshot(self, wp_path: Path, window_minutes: int) -> Dict[str, Any]:
+        """Counts per status and attempts, pending ages and recent throughput in one pass over the queue"""
+        table = self._table("queue_table", "swap_archive_queue", self._get_database(wp_path))
+        now = datetime.now()
+        params = {"window_start": (now - timedelta(minutes=window_minutes)).strftime("%Y-%m-%d %H:%M:%S")}
+        columns = ["count", "attempts", "dated", "archived_recent", "attempted_recent"]
+        ages = []
+        for index, seconds in enumerate(ANALYTICS_DURATION_BUCKETS):
+            params[f"age{index}"] = (now - timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+            ages.append(f"SUM(CASE WHEN created_at >= :age{index} THEN 1 ELSE 0 END) AS age{index}")
+            columns.append(f"age{index}")
+        
+        rows, source = await self._query(
+            wp_path,
+            f"SELECT status, attempts, COUNT(*) AS count, COUNT(created_at) AS dated, MIN(created_at) AS oldest, "
+            f"SUM(CASE WHEN archived_at >= :window_start THEN 1 ELSE 0 END) AS archived_recent, "
+            f"SUM(CASE WHEN last_attempt >= :window_start THEN 1 ELSE 0 END) AS attempted_recent, "
+            f"{', '.join(ages)} FROM {table} GROUP BY status, attempts",
+            params, column_types={column: int for column in columns}
+        )
+        
+        counts: Counter = Counter()
+        attempts: Dict[str, Dict[int, int]] = {}
+        throughput = {"window_minutes": window_minutes, "archived": 0, "failed": 0, "retried": 0}
+        under = [0] * len(ANALYTICS_DURATION_BUCKETS)
+        pending_dated = 0
+        oldest_pending = None
+        for row in sorted(rows, key=lambda row: (row["status"], row["attempts"])):
+            counts[row["status"]] += row["count"]
+            attempts.setdefault(row["status"], {})[row["attempts"]] = row["count"]
+            if row["status"] == "completed":
+                throughput["archived"] += row["archived_recent"] or 0
+            elif row["status"] == "failed":
+                throughput["failed"] += row["attempted_recent"] or 0
+            elif row["status"] == "pending":
+                throughput["retried"] += row["attempted_recent"] or 0
+                pending_dated += row["dated"]
+                for index in range(len(under)):
+                    under[index] += row[f"age{index}"] or 0
+                if row["oldest"] and (oldest_pending is None or row["oldest"] < oldest_pending):
+                    oldest_pending = row["oldest"]
+        throughput["archived_per_minute"] = round(throughput["archived"] / window_minutes, 2)
+        
+        # Rows younger than each bound, differenced into buckets
+        bounds = [0] + under + [pending_dated]
+        age_histogram = {label: high - low for label, low, high
+                         in zip(ANALYTICS_DURATION_LABELS, bounds, bounds[1:]) if high > low}
+        
+        return {
+            "counts": dict(counts),
+            "total": sum(counts.values()),
+            "attempts": attempts,
+            "oldest_pending": oldest_pending,
+            "pending_age_histogram": age_histogram,
+            "throughput": throughput,
+            "source": source
+        }
+
+    async def _iter_history(self, wp_path: Path, filters: Dict[str, Any], columns: Optional[List[str]] = None,
+                            page_size: int = HISTORY_MAX_PAGE_SIZE,
+                            max_staleness: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every matching history row, holding one page in memory at a time"""
+        cursor = None
+        while True:
+            records, _ = await self._history_page(wp_path, filters, columns, cursor, page_size, max_staleness)
+            for record in records:
+                yield record
+            if len(records) < page_size:
+                break
+            cursor = self._encode_history_cursor(records[-1])
+
+    async def _query(self, wp_path: Path, sql: str, params: Optional[Dict[str, Any]] = None,
+                     column_types: Optional[Dict[str, type]] = None, mirror_tables: Optional[List[str]] = None,
+                     max_staleness: Optional[float] = None) -> tuple:
+        """Run a parameterized query against a site's database
+        
+        Queries go over the pooled direct connection, falling back to a
+        prepared $wpdb query through WP-CLI when the database cannot be
+        reached directly. Queries naming mirror_tables are answered from
+        the local mirror when those tables were synced within
+        max_staleness seconds. Returns (rows, source) with typed column
+        values.
+        """
+        params = params or {}
+        database = self._get_database(wp_path)
+        url = database.url.render_as_string(hide_password=False)
+        rows = None
+        source = "database"
+        
+        mirror = self._get_mirror(database) if mirror_tables else None
+        if mirror is not None:
+            age = mirror.age(mirror_tables)
+            if age is not None and age <= self._mirror_staleness(max_staleness):
+                try:
+                    rows, source = mirror.query(sql, params), "mirror"
+                except sqlite3.Error as e:
+                    logger.warning(f"Mirror query failed, using the live database: {e}")
+        
+        if rows is None and self._database_down_until.get(url, 0) <= time.monotonic():
+            try:
+                rows = await database.run(database.query, sql, params)
+            except ProgrammingError:
+                # A bad statement or missing table fails through WP-CLI too
+                raise
+            except Exception as e:
+                logger.warning(f"Direct database query failed, using WP-CLI for {DB_RETRY_DELAY}s: {e}")
+                self._database_down_until[url] = time.monotonic() + DB_RETRY_DELAY
+        
+        if rows is None:
+            source = "wp-cli"
+            # $wpdb->prepare takes positional %s/%d placeholders
+            values = []
             
+            def placeholder(match):
+                value = params[match.group(1)]
+                values.append(value)
+                return "%d" if isinstance(value, int) and not isinstance(value, bool) else "%s"
+            
+            prepared = re.sub(r"(?<!:):(\w+)", placeholder, sql.replace("%", "%%"))
+            payload = base64.b64encode(json.dumps({"sql": prepared, "params": values}).encode("utf-8")).decode("ascii")
+            script = str(php_script_path("db-query", WP_DB_QUERY_SCRIPT))
+            result = await self._wp(["eval-file", script, payload], wp_path)
+            if result.returncode != 0:
+                raise RuntimeError(f"Database query failed: {result.stderr.strip()}")
+            rows = json.loads(result.stdout or "[]")
+        
+        column_types = column_types or {}
+        for row in rows:
+            for column, value in row.items():
+                if isinstance(value, datetime):
+                    row[column] = value.strftime("%Y-%m-%d %H:%M:%S")
+                elif value is not None and column in column_types:
+                    row[column] = column_types[column](value)
+        return rows, source
+
+    def _get_queue_worker(self) -> QueueWorker:
+        if self.queue_worker is None:
+            database = self._get_database()
+            leases = None
+            partitions = self.config.getint("archive", "queue_partitions", DEFAULT_QUEUE_PARTITIONS)
+            if partitions > 0:
+                leases = PartitionLeases(
+                    database,
+                    partitions=partitions,
+                    ttl=self.config.getfloat("archive", "queue_lease_ttl", DEFAULT_QUEUE_LEASE_TTL),
+                    lease_table=self._table("lease_table", "swap_queue_leases", database),
+                    worker_table=self._table("worker_table", "swap_queue_workers", database)
+                )
+            self.queue_worker = QueueWorker(
+                database,
+                self._submit_post_row,
+                table=self._table("queue_table", "swap_archive_queue", database),
+                batch_size=self.config.getint("performance", "batch_size", DEFAULT_QUEUE_BATCH_SIZE),
+                concurrency=self.config.getint("performance", "max_concurrent_requests",
+                                               DEFAULT_MAX_CONCURRENT_REQUESTS),
+                per_host_limit=self.config.getint("archive", "per_host_limit", DEFAULT_PER_HOST_LIMIT),
+                max_attempts=self.config.getint("archive", "queue_max_attempts", DEFAULT_QUEUE_MAX_ATTEMPTS),
+                leases=leases
+            )
+        return self.queue_worker
+
+    async def _report_progress(self, progress: float, total: Optional[float] = None,
+                               message: Optional[str] = None):
+        """Send an MCP progress notification if the caller asked for one"""
+        context = current_request.get()
+        if context is None or context.progress_token is None or context.notify is None:
+            return
+        
+        params = {"progressToken": context.progress_token, "progress": progress}
+        if total is not None:
+            params["total"] = total
+        if message:
+            params["message"] = message
+        await context.notify({"jsonrpc": "2.0", "method": "notifications/progress", "params": params})
+
+    @staticmethod
+    def _capture_key(url: str) -> str:
+        """Match key for Wayback captures, ignoring scheme, www. and trailing slashes"""
+        parts = urlsplit(normalize_url(url if "://" in url else f"http://{url}"))
+        host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+        path = parts.path.rstrip("/") or "/"
+        return host + path + (f"?{parts.query}" if parts.query else "")
+
+    @staticmethod
+    def _cdx_groups(keys: List[str]) -> List[List[str]]:
+        """Split sorted capture keys into groups that share a prefix longer than their host
+        
+        A group becomes one CDX prefix query, so a prefix of just "host/"
+        (which would stream the whole site) is never used, and no group has
+        more than CDX_GROUP_MAX_URLS keys. Groups are split on the character
+        after their longest common prefix until they qualify; single keys
+        are looked up exactly.
+        """
+        groups = []
+        stack = [keys] if keys else []
+        while stack:
+            group = stack.pop()
+            prefix = os.path.commonprefix(group)
+            root = group[0].find("/") + 1
+            if len(group) == 1 or (len(prefix) > root >= 1 and len(group) <= CDX_GROUP_MAX_URLS):
+                groups.append(group)
+                continue
+            depth = len(prefix)
+            stack.extend(list(part) for _, part in itertools.groupby(group, key=lambda key: key[depth:depth + 1]))
+        return groups
+
+    @staticmethod
+    def _format_wayback_timestamp(timestamp: Optional[str]) -> Optional[str]:
+        """Convert a 14 digit Wayback timestamp to ISO 8601"""
+        if not timestamp:
+            return None
+        try:
+            return datetime.strptime(timestamp[:14], "%Y%m%d%H%M%S").strftime("%Y-%m-%dT%H:%M:%SZ")
+        except ValueError:
+            return timestamp
+
+    def _get_wp_pool(self, wp_path: Path) -> Optional[WPCLIWorkerPool]:
+        """Get the warm WP-CLI worker pool for a WordPress installation"""
+        if not self.config.getboolean("performance", "wp_worker_pool", True):
+            return None
+        
+        key = str(Path(wp_path).resolve())
+        if key not in self.wp_pools:
+            self.wp_pools[key] = WPCLIWorkerPool(
+                key, self.runner, self.wp_cli_path,
+                size=self.config.getint("performance", "wp_worker_pool_size", DEFAULT_WP_WORKER_POOL_SIZE),
+                max_requests=self.config.getint("performance", "wp_worker_max_requests",
+                                                DEFAULT_WP_WORKER_MAX_REQUESTS),
+                max_memory=parse_size(self.config.get("performance", "wp_worker_max_memory",
+                                                       DEFAULT_WP_WORKER_MAX_MEMORY))
+            )
+        return self.wp_pools[key]
+
+    async def _wp(self, args: List[str], wp_path: Path, timeout: Optional[float] = None) -> CommandResult:
+        """Run a WP-CLI command, preferring a warm worker over a fresh `wp` process"""
+        pool = self._get_wp_pool(wp_path)
+        if pool is None:
+            return await self.runner.run([self.wp_cli_path] + args, cwd=str(wp_path), timeout=timeout)
+        return await pool.run(args, timeout)
+
+    async def _get_post_url(self, post_id: int, wp_path: Path):
+        """Get the permalink of a single post, returning (url, error)"""
+        cmd = ["post", "get", str(post_id), "--field=url", "--format=json"]
+        result = await self._wp(cmd, wp_path)
+        
+        if result.returncode != 0:
+            return None, result.stderr
+        
+        output = result.stdout.strip()
+        try:
+            # --format=json encodes the field as a JSON string
+            return json.loads(output), None
+        except json.JSONDecodeError:
+            return output, None
+
+    async def _iter_post_rows(self, wp_path: Path, post_type: str = "all", post_ids: List[int] = None,
+                              page_size: Optional[int] = None):
+        """Yield post rows with ID, url, post_type and post_modified
+        
+        Rows are fetched with one `wp post list` per page, ordered by ID, so
+        the number of WP-CLI calls grows with pages rather than posts and
+        only one page is held in memory. Explicit IDs are deduplicated and
+        yielded in ID order too, which the bulk checkpoint relies on; those
+        that do not resolve are yielded with an error instead of a URL.
+        """
+        if page_size is None:
+            page_size = self.config.getint("performance", "post_list_page_size", DEFAULT_POST_LIST_PAGE_SIZE)
+        
+        types = "post,page" if post_type == "all" else post_type
+        base_cmd = ["post", "list", "--fields=ID,url,post_type,post_modified", "--format=json",
+                    "--orderby=ID", "--order=ASC", f"--posts_per_page={page_size}"]
+        
+        async def fetch(extra_args: List[str]) -> List[Dict[str, Any]]:
+            result = await self._wp(base_cmd + extra_args, wp_path)
+            if result.returncode != 0:
+                raise RuntimeError(f"Failed to get posts: {result.stderr}")
+            rows = json.loads(result.stdout or "[]")
+            for row in rows:
+                row["ID"] = int(row["ID"])
+            return rows
+        
+        if post_ids is not None:
+            # Explicit IDs may mix post types, so resolve them by ID only
+            id_types = "any" if post_type == "all" else post_type
+            post_ids = sorted({int(post_id) for post_id in post_ids})
+            for offset in range(0, len(post_ids), page_size):
+                chunk = post_ids[offset:offset + page_size]
+                rows = await fetch([f"--post_type={id_types}", "--post__in=" + ",".join(map(str, chunk))])
+                found = {row["ID"]: row for row in rows}
+                for post_id in chunk:
+                    yield found.get(post_id) or {"ID": post_id, "url": None, "error": "Post not found"}
+            return
+        
+        page = 1
+        while True:
+            rows = await fetch([f"--post_type={types}", f"--paged={page}"])
+            for row in rows:
+                yield row
+            if len(rows) < page_size:
+                break
+            page += 1
+
+    async def _iter_modified_rows(self, wp_path: Path, post_type: str = "all", after: Optional[List[Any]] = None,
+                                  page_size: Optional[int] = None):
+        """Yield published post rows modified after a (post_modified_gmt, ID) watermark
+        
+        Pages are fetched by keyset rather than offset, each continuing from
+        the last row of the previous page, so a run costs one query per page
+        of changed posts regardless of site size.
+        """
+        if page_size is None:
+            page_size = self.config.getint("performance", "post_list_page_size", DEFAULT_POST_LIST_PAGE_SIZE)
+        
+        types = "post,page" if post_type == "all" else post_type
+        if not re.fullmatch(r"[\w-]+(,[\w-]+)*", types):
+            raise ValueError(f"Invalid post type: {post_type}")
+        
+        modified_gmt, last_id = after or (WATERMARK_EPOCH, 0)
+        script = str(php_script_path("modified-posts", WP_MODIFIED_POSTS_SCRIPT))
+        while True:
+            date, clock = modified_gmt.split(" ")
+            result = await self._wp(["eval-file", script, date, clock, str(int(last_id)), str(page_size), types],
+                                    wp_path)
             if result.returncode != 0:
-                return {"success": False, "error": f"Failed to get queue status: {result.stderr}"}
-            
-            # Parse the results (this would need proper parsing in a real implementation)
-            logger.info("Retrieved archive queue status")
+                raise RuntimeError(f"Failed to get modified posts: {result.stderr}")
+            rows = json.loads(result.stdout or "[]")
+            for row in rows:
+                row["ID"] = int(row["ID"])
+                yield row
+            if len(rows) < page_size:
+                break
+            modified_gmt, last_id = rows[-1]["post_modified_gmt"], rows[-1]["ID"]
+
+    async def _submit_url(self, url: str, post_id: int = 0, capture_all: bool = True,
+                          capture_outlinks: bool = True, force: bool = False,
+                          detect_changes: bool = False) -> Dict[str, Any]:
+        """Submit a URL to Archive.org and record the outcome in the journal
+        
+        URLs already archived inside the journal's dedupe window are skipped
+        unless force is set. With detect_changes, pages whose content matches
+        the fingerprint of their last capture are skipped as well.
+        """
+        if self.journal is not None and not force:
+            previous = self.journal.recent_submission(url)
+            if previous is not None:
+                logger.info(f"Skipping {url}: archived at {previous.completed_at.isoformat()}")
+                return {
+                    "success": True,
+                    "message": f"URL '{url}' was already archived recently",
+                    "url": url,
+                    "archive_url": previous.archive_url,
+                    "status": "skipped",
+                    "skipped": True
+                }
+        
+        fingerprint = None
+        if detect_changes and self.journal is not None:
+            fingerprint = await self.change_detector.check(url, self.journal.get_fingerprint(url))
+            if not fingerprint["changed"]:
+                logger.info(f"Skipping {url}: unchanged since its last capture")
+                return {
+                    "success": True,
+                    "message": f"URL '{url}' is unchanged since its last capture",
+                    "url": url,
+                    "archive_url": fingerprint.get("archive_url"),
+                    "status": "unchanged",
+                    "skipped": True,
+                    "unchanged": True
+                }
+        
+        logger.info(f"Submitting URL to Archive.org: {url}")
+        submitted_at = datetime.now()
+        result = await self.wayback.submit(url, capture_all, capture_outlinks)
+        
+        if self.journal is not None:
+            self.journal.record(ArchiveSubmission(
+                post_id=post_id,
+                url=url,
+                archive_url=result.get("archive_url"),
+                status=SubmissionStatus.COMPLETED if result["success"] else SubmissionStatus.FAILED,
+                submitted_at=submitted_at,
+                completed_at=datetime.now(),
+                error_message=result.get("error"),
+                retry_count=0
+            ))
+            if result["success"] and fingerprint and fingerprint.get("content_hash"):
+                self.journal.put_fingerprint(url, dict(fingerprint, archive_url=result.get("archive_url")))
+            if self.journal.needs_flush:
+                self.journal.flush()
+        
+        if not result["success"]:
+            logger.error(f"Archive.org submission failed for {url}: {result['error']}")
+            return dict(result, url=url)
+        
+        # A new capture makes any cached availability answer stale
+        if self.availability_cache is not None:
+            self.availability_cache.invalidate(normalize_url(url))
+        
+        return dict(
+            result,
+            message=f"URL '{url}' submitted to Archive.org",
+            url=url,
+            status="submitted"
+        )
+
+    async def _submit_post_row(self, row: Dict[str, Any], detect_changes: bool = False) -> Dict[str, Any]:
+        """Submit one resolved post row to Archive.org"""
+        kind = "page" if row.get("post_type") == "page" else "post"
+        label = kind.capitalize()
+        post_id = row["ID"]
+        post_url = row["url"]
+        
+        archive_result = await self._submit_url(post_url, post_id=post_id, detect_changes=detect_changes)
+        
+        if archive_result["success"]:
+            logger.info(f"{label} {post_id} submitted to Archive.org: {post_url}")
             return {
                 "success": True,
-                "message": "Queue status retrieved successfully",
-                "queue_data": result.stdout
+                "message": f"{label} {post_id} submitted to Archive.org",
+                f"{kind}_id": post_id,
+                f"{kind}_url": post_url,
+                "post_type": row.get("post_type", kind),
+                "archive_url": archive_result["archive_url"],
+                "skipped": archive_result.get("skipped", False),
+                "unchanged": archive_result.get("unchanged", False)
             }
-            
-        except Exception as e:
-            logger.error(f"Error getting queue status: {e}")
-            return {"success": False, "error": str(e)}
+        else:
+            return archive_result
 
-    # Helper Methods
     async def _create_plugin_structure(self, plugin_dir: Path, name: str, slug: str, 
                                      author: str, description: str, version: str):
         """Create WordPress plugin directory structure"""
@@ -1218,8 +6239,7 @@ if (!defined('WP_UNINSTALL_PLUGIN')) {{
                 return {"status": "skipped", "message": "No test file found"}
             
             # Run tests
-            result = subprocess.run(["php", str(test_file)], cwd=str(wp_path), 
-                                  capture_output=True, text=True)
+            result = await self.runner.run([self.php_path, str(test_file)], cwd=str(wp_path))
             
             return {
                 "status": "pass" if result.returncode == 0 else "fail",
@@ -1230,91 +6250,99 @@ if (!defined('WP_UNINSTALL_PLUGIN')) {{
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
-    async def _analyze_security(self, plugin_dir: Path) -> Dict[str, Any]:
-        """Analyze plugin security"""
-        security_issues = []
-        
-        # Check for direct access prevention
-        for php_file in plugin_dir.rglob("*.php"):
-            with open(php_file, 'r') as f:
-                content = f.read()
-                if 'ABSPATH' not in content and 'wp-content' in str(php_file):
-                    security_issues.append(f"Missing ABSPATH check in {php_file}")
-        
-        # Check for SQL injection prevention
-        for php_file in plugin_dir.rglob("*.php"):
-            with open(php_file, 'r') as f:
-                content = f.read()
-                if '$wpdb->prepare' not in content and '$wpdb->query' in content:
-                    security_issues.append(f"Potential SQL injection in {php_file}")
-        
-        score = max(0, 100 - len(security_issues) * 10)
-        
-        return {
-            "score": score,
-            "issues": security_issues,
-            "status": "pass" if score >= 80 else "fail"
-        }
+    def _get_analysis_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Process pool for large plugin scans, started on first use; None when disabled"""
+        if self.analysis_workers < 2:
+            return None
+        if self.analysis_pool is None:
+            self.analysis_pool = ProcessPoolExecutor(max_workers=self.analysis_workers)
+        return self.analysis_pool
 
-    async def _analyze_performance(self, plugin_dir: Path) -> Dict[str, Any]:
-        """Analyze plugin performance"""
-        performance_issues = []
-        
-        # Check for efficient database queries
-        for php_file in plugin_dir.rglob("*.php"):
-            with open(php_file, 'r') as f:
-                content = f.read()
-                if 'SELECT *' in content:
-                    performance_issues.append(f"Use of SELECT * in {php_file}")
-        
-        # Check for proper caching
-        cache_usage = 0
-        for php_file in plugin_dir.rglob("*.php"):
-            with open(php_file, 'r') as f:
-                content = f.read()
-                if 'wp_cache_' in content or 'get_transient' in content:
-                    cache_usage += 1
-        
-        score = max(0, 100 - len(performance_issues) * 5 + cache_usage * 10)
-        
-        return {
-            "score": min(100, score),
-            "issues": performance_issues,
-            "cache_usage": cache_usage,
-            "status": "pass" if score >= 70 else "fail"
-        }
+    async def _get_symbol_index(self, plugin_dir: Path) -> SymbolIndex:
+        """Up-to-date symbol index of a plugin tree, shared by the plugin tools"""
+        root = plugin_dir.absolute()
+        index = self.symbol_indexes.get(str(root))
+        if index is None:
+            index = self.symbol_indexes[str(root)] = SymbolIndex(root, cache=self.analysis_cache)
+        await asyncio.to_thread(index.update)
+        return index
 
-    async def _analyze_standards(self, plugin_dir: Path) -> Dict[str, Any]:
-        """Analyze WordPress coding standards compliance"""
-        standards_issues = []
-        
-        # Check for proper escaping
-        for php_file in plugin_dir.rglob("*.php"):
-            with open(php_file, 'r') as f:
-                content = f.read()
-                if 'echo $' in content and 'esc_html' not in content:
-                    standards_issues.append(f"Missing output escaping in {php_file}")
+    async def _scan_plugins(self, plugin_dirs: List[Path], indexes: List[SymbolIndex],
+                            categories: List[str]) -> List[Dict[str, Any]]:
+        """Scan plugin trees for the rules of the given categories, one summary per tree
         
-        score = max(0, 100 - len(standards_issues) * 15)
-        
-        return {
-            "score": score,
-            "issues": standards_issues,
-            "status": "pass" if score >= 85 else "fail"
-        }
+        The files come from each tree's symbol index, and security findings
+        for unprepared $wpdb queries from its query sites.
+        """
+        scanner = PluginScanner([rule for rule in ANALYSIS_RULES if rule.category in categories],
+                                cache=self.analysis_cache)
+        scans = await asyncio.to_thread(scanner.scan_many, plugin_dirs, self._get_analysis_pool(),
+                                        [index.paths for index in indexes])
+        if scanner.pool_broken:
+            logger.warning("Analysis process pool failed; it will be restarted on next use")
+            self.analysis_pool.shutdown(wait=False, cancel_futures=True)
+            self.analysis_pool = None
+        if "security" in categories:
+            for scan, index in zip(scans, indexes):
+                scan["findings"].extend(self._query_findings(index))
+        return scans
+
+    @staticmethod
+    def _query_findings(index: SymbolIndex) -> List[Dict[str, Any]]:
+        """Scan findings for the unprepared $wpdb queries of a symbol index"""
+        return [{"rule": "unprepared-query", "category": "security", "message": "Potential SQL injection",
+                 "file": query["file"], "line": query["line"], "method": query["name"]}
+                for query in index.unprepared_queries()]
+
+    @staticmethod
+    def _score_scan(scan: Dict[str, Any], categories: List[str]) -> Dict[str, Any]:
+        """Score each category of a scan summary"""
+        results = {}
+        for category in categories:
+            issues = [finding for finding in scan["findings"] if finding["category"] == category]
+            penalty, passing = ANALYSIS_SCORING[category]
+            # One deduction per rule and file, however many lines it flags
+            score = 100 - len({(issue["rule"], issue["file"]) for issue in issues}) * penalty
+            results[category] = {"issues": issues}
+            if category == "performance":
+                results[category]["cache_usage"] = scan["metrics"].get("cache-usage", 0)
+                score += results[category]["cache_usage"] * 10
+            score = min(100, max(0, score))
+            results[category].update(score=score, status="pass" if score >= passing else "fail")
+        return results
+
+    async def _analyze_plugin(self, plugin_dir: Path, index: SymbolIndex, categories: List[str]) -> Dict[str, Any]:
+        """Scan a plugin once for the rules of the given categories and score each category"""
+        start_time = time.monotonic()
+        scan = (await self._scan_plugins([plugin_dir], [index], categories))[0]
+        scan["elapsed_seconds"] = round(time.monotonic() - start_time, 3)
+        summary = {key: value for key, value in scan.items() if key not in ("findings", "metrics")}
+        return {"categories": self._score_scan(scan, categories), "summary": summary}
 
     async def _validate_coding_standards(self, plugin_dir: Path) -> Dict[str, Any]:
         """Validate WordPress coding standards"""
         try:
+            # PHPCS output is reused while no file it checks has changed
+            fingerprint = None
+            if self.analysis_cache is not None:
+                scanner = PluginScanner([], extensions=PHPCS_EXTENSIONS, cache=self.analysis_cache)
+                fingerprint = await asyncio.to_thread(scanner.fingerprint, plugin_dir)
+                cached = await asyncio.to_thread(self.analysis_cache.get, fingerprint, "phpcs:WordPress")
+                if cached is not None:
+                    return dict(cached, cached=True)
+            
             # Run PHPCS if available
-            result = subprocess.run(["phpcs", "--standard=WordPress", str(plugin_dir)], 
-                                  capture_output=True, text=True)
+            result = await self.runner.run(["phpcs", "--standard=WordPress", str(plugin_dir)])
             
-            return {
+            validation = {
                 "status": "pass" if result.returncode == 0 else "fail",
                 "output": result.stdout,
                 "errors": result.stderr
             }
+            if fingerprint is not None and not result.timed_out:
+                await asyncio.to_thread(self.analysis_cache.put, fingerprint, "phpcs:WordPress", validation)
+                await asyncio.to_thread(self.analysis_cache.flush)
+            return dict(validation, cached=False)
             
         except FileNotFoundError:
             return {
@@ -1345,20 +6373,18 @@ if (!defined('WP_UNINSTALL_PLUGIN')) {{
         }
 
     async def _validate_security(self, plugin_dir: Path) -> Dict[str, Any]:
-        """Validate security measures"""
-        security_issues = []
-        
-        # Check main plugin file
-        main_files = list(plugin_dir.glob("*.php"))
-        for main_file in main_files:
-            with open(main_file, 'r') as f:
-                content = f.read()
-                if 'ABSPATH' not in content:
-                    security_issues.append(f"Missing ABSPATH check in {main_file}")
+        """Validate security measures of every PHP file in the plugin"""
+        index = await self._get_symbol_index(plugin_dir)
+        scanner = PluginScanner(VALIDATION_RULES, cache=self.analysis_cache)
+        scan = (await asyncio.to_thread(scanner.scan_many, [plugin_dir], None, [index.paths]))[0]
+        unprepared = index.unprepared_queries()
         
         return {
-            "status": "pass" if not security_issues else "fail",
-            "issues": security_issues
+            "status": "pass" if not scan["findings"] and not unprepared else "fail",
+            "issues": scan["findings"],
+            "unprepared_queries": unprepared,
+            "escaping_calls": len(index.find("escape")),
+            "cache_hit_rate": scan["cache_hit_rate"]
         }
 
     async def _generate_readme(self, plugin_dir: Path, readme_path: Path):
@@ -1399,49 +6425,64 @@ This plugin is licensed under the {self.plugin_info.license}.
             f.write(readme_content)
 
     async def _generate_api_docs(self, plugin_dir: Path, api_docs_path: Path):
-        """Generate API documentation"""
-        api_content = f"""# {self.plugin_info.name} - API Documentation
-
-## Overview
-
-This document describes the API endpoints and hooks available in {self.plugin_info.name}.
-
-## Hooks
-
-### Action Hooks
-
-- `{self.plugin_info.slug}_before_submission` - Fired before URL submission
-- `{self.plugin_info.slug}_after_submission` - Fired after submission attempt
-- `{self.plugin_info.slug}_submission_success` - Fired on successful submission
-- `{self.plugin_info.slug}_submission_failed` - Fired on failed submission
-
-### Filter Hooks
-
-- `{self.plugin_info.slug}_submission_url` - Modify URL before submission
-- `{self.plugin_info.slug}_submission_data` - Modify submission data
-- `{self.plugin_info.slug}_retry_attempts` - Customize retry attempts
-
-## Classes
-
-### Main Plugin Class
-
-The main plugin class follows the singleton pattern and orchestrates all plugin components.
-
-### Archive API Class
-
-Handles all communication with the Internet Archive API.
-
-## Database Schema
-
-The plugin creates custom tables for submission tracking and queue management.
-
-## Security
-
-All API endpoints include proper nonce verification and capability checks.
-"""
+        """Generate API documentation from the plugin's symbol index"""
+        index = await self._get_symbol_index(plugin_dir)
+        
+        def site(symbol: Dict[str, Any]) -> str:
+            return f"`{os.path.relpath(symbol['file'], index.root)}:{symbol['line']}`"
+        
+        hooks = index.find("hook")
+        lines = [
+            f"# {self.plugin_info.name} - API Documentation", "",
+            "## Overview", "",
+            f"This document lists the hooks, classes and functions defined in {self.plugin_info.name}, "
+            "generated from the plugin source.", "",
+            "## Hooks", ""
+        ]
+        for hook_type, title in (("action", "Action Hooks"), ("filter", "Filter Hooks")):
+            fired: Dict[str, List[Dict[str, Any]]] = {}
+            for hook in hooks:
+                if hook["type"] == hook_type and hook["role"] == "fires":
+                    fired.setdefault(hook["name"], []).append(hook)
+            lines += [f"### {title}", ""]
+            lines += [f"- `{name}` - {', '.join(site(hook) for hook in sites)}"
+                      for name, sites in sorted(fired.items())] or ["None."]
+            lines.append("")
+        
+        registered = sorted((hook for hook in hooks if hook["role"] == "registers"), key=lambda hook: hook["name"])
+        lines += ["### Hooked Callbacks", ""]
+        lines += [f"- `{hook['name']}` ({hook['type']}): `{hook.get('callback', '')}` - {site(hook)}"
+                  for hook in registered] or ["None."]
+        lines.append("")
+        
+        classes = index.find("class")
+        methods = index.find("method")
+        lines += ["## Classes", ""]
+        for cls in classes:
+            lines += [f"### {cls['type'].title()} `{cls['name']}`", "", f"Defined in {site(cls)}.", ""]
+            lines += [f"- `{method['name']}()` - line {method['line']}" for method in methods
+                      if method["class"] == cls["name"] and method["file"] == cls["file"]]
+            lines.append("")
+        if not classes:
+            lines += ["None.", ""]
+        
+        functions = index.find("function")
+        lines += ["## Functions", ""]
+        lines += [f"- `{function['name']}()` - {site(function)}" for function in functions] or ["None."]
+        lines.append("")
+        
+        queries = index.find("query")
+        unprepared = [query for query in queries if not query["prepared"]]
+        lines += ["## Database Access", "",
+                  f"{len(queries)} `$wpdb` query calls, {len(unprepared)} without `$wpdb->prepare()`.", ""]
+        lines += [f"- `$wpdb->{query['name']}()` - {site(query)}" for query in unprepared]
+        
+        escaping = Counter(call["name"] for call in index.find("escape"))
+        lines += ["", "## Output Escaping", ""]
+        lines += [f"- `{name}()` - {count} calls" for name, count in sorted(escaping.items())] or ["None."]
         
         with open(api_docs_path, 'w') as f:
-            f.write(api_content)
+            f.write("\n".join(lines) + "\n")
 
     async def _generate_changelog(self, plugin_dir: Path, changelog_path: Path):
         """Generate CHANGELOG.md"""
@@ -1486,8 +6527,8 @@ All notable changes to {self.plugin_info.name} will be documented in this file.
     async def _backup_database(self, wp_path: Path, db_backup_path: Path):
         """Backup WordPress database"""
         # This would use wp-cli or mysqldump
-        cmd = ["wp", "db", "export", str(db_backup_path)]
-        subprocess.run(cmd, cwd=str(wp_path), check=True)
+        cmd = [self.wp_cli_path, "db", "export", str(db_backup_path)]
+        await self.runner.run(cmd, cwd=str(wp_path), timeout=0, check=True)
 
     async def _restore_from_archive(self, backup_path: Path, wp_path: Path):
         """Restore WordPress files from backup archive"""
@@ -1496,13 +6537,13 @@ All notable changes to {self.plugin_info.name} will be documented in this file.
 
     async def _restore_database(self, wp_path: Path, db_backup_path: Path):
         """Restore WordPress database from backup"""
-        cmd = ["wp", "db", "import", str(db_backup_path)]
-        subprocess.run(cmd, cwd=str(wp_path), check=True)
+        cmd = [self.wp_cli_path, "db", "import", str(db_backup_path)]
+        await self.runner.run(cmd, cwd=str(wp_path), timeout=0, check=True)
 
     async def _run_migration_script(self, migration_script_path: Path, wp_path: Path):
         """Run database migration script"""
-        cmd = ["php", str(migration_script_path)]
-        subprocess.run(cmd, cwd=str(wp_path), check=True)
+        cmd = [self.php_path, str(migration_script_path)]
+        await self.runner.run(cmd, cwd=str(wp_path), timeout=0, check=True)
 
     async def _update_plugin_version(self, plugin_dir: Path, version: str):
         """Update plugin version in main file"""
@@ -1526,12 +6567,12 @@ All notable changes to {self.plugin_info.name} will be documented in this file.
     async def _benchmark_frontend_load(self, wp_path: Path):
         """Benchmark frontend page load"""
         # Simulate frontend load test
-        time.sleep(0.1)
+        await asyncio.sleep(0.1)
 
     async def _benchmark_admin_load(self, wp_path: Path):
         """Benchmark admin page load"""
         # Simulate admin load test
-        time.sleep(0.2)
+        await asyncio.sleep(0.2)
 
 
 # MCP Server Tool Definitions
@@ -1678,6 +6719,32 @@ TOOLS = [
             "required": ["plugin_dir"]
         }
     },
+    {
+        "name": "wp_plugin_analyze_bulk",
+        "description": "Analyze every plugin of a WordPress installation (or a list of plugin directories) in one call, scanning across a process pool; returns per-plugin scores and files/s and MB/s throughput",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "wp_path": {"type": "string", "description": "WordPress installation path; all directories under wp-content/plugins are analyzed"},
+                "plugin_dirs": {"type": "array", "items": {"type": "string"}, "description": "Plugin directories to analyze instead of a whole installation"},
+                "analysis_type": {"type": "string", "enum": ["security", "performance", "standards", "all"], "description": "Type of analysis to perform"}
+            }
+        }
+    },
+    {
+        "name": "wp_plugin_symbols",
+        "description": "Query the plugin's symbol index (classes, methods, functions, hook calls, $wpdb query sites, escaping calls) with file and line; built from one token pass and updated per changed file",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "plugin_dir": {"type": "string", "description": "Plugin directory path"},
+                "kind": {"type": "string", "enum": list(SYMBOL_KINDS), "description": "Only symbols of this kind"},
+                "name": {"type": "string", "description": "Glob pattern the symbol name must match, e.g. swaf_*"},
+                "limit": {"type": "integer", "description": "Maximum symbols returned (default: 500)"}
+            },
+            "required": ["plugin_dir"]
+        }
+    },
     {
         "name": "wp_plugin_generate_docs",
         "description": "Generate documentation for WordPress plugin",
@@ -1742,7 +6809,9 @@ TOOLS = [
             "properties": {
                 "url": {"type": "string", "description": "URL to archive"},
                 "capture_all": {"type": "boolean", "description": "Capture all resources"},
-                "capture_outlinks": {"type": "boolean", "description": "Capture outbound links"}
+                "capture_outlinks": {"type": "boolean", "description": "Capture outbound links"},
+                "force": {"type": "boolean", "description": "Submit even if the URL was archived inside the dedupe window"},
+                "detect_changes": {"type": "boolean", "description": "Skip the submission if the page is unchanged since its last capture (conditional GET + normalized body hash)"}
             },
             "required": ["url"]
         }
@@ -1758,6 +6827,17 @@ TOOLS = [
             "required": ["url"]
         }
     },
+    {
+        "name": "archive_check_status_bulk",
+        "description": "Check archive status for many URLs using batched CDX index lookups (timestamps returned in input order; unresolved lists the indexes whose lookup failed)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "urls": {"type": "array", "items": {"type": "string"}, "description": "URLs to check"}
+            },
+            "required": ["urls"]
+        }
+    },
     {
         "name": "archive_submit_post",
         "description": "Submit WordPress post to Internet Archive",
@@ -1790,7 +6870,13 @@ TOOLS = [
             "properties": {
                 "post_ids": {"type": "array", "items": {"type": "number"}, "description": "Array of post/page IDs"},
                 "wp_path": {"type": "string", "description": "WordPress installation path"},
-                "post_type": {"type": "string", "description": "Post type (post, page, or all)"}
+                "post_type": {"type": "string", "description": "Post type (post, page, or all)"},
+                "concurrency": {"type": "number", "description": "Concurrent submissions (default: max_concurrent_requests)"},
+                "per_host_limit": {"type": "number", "description": "Concurrent submissions per host (default: per_host_limit)"},
+                "include_results": {"type": "boolean", "description": "Include every per-post result instead of only the summary"},
+                "resume": {"type": "boolean", "description": "Resume an interrupted job from its journal checkpoint (default true)"},
+                "incremental": {"type": "boolean", "description": "Only submit published posts modified since the site's last incremental run"},
+                "detect_changes": {"type": "boolean", "description": "Skip posts whose page is unchanged since its last capture (conditional GET + normalized body hash)"}
             },
             "required": ["wp_path"]
         }
@@ -1802,15 +6888,55 @@ TOOLS = [
             "type": "object",
             "properties": {
                 "wp_path": {"type": "string", "description": "WordPress installation path"},
-                "limit": {"type": "number", "description": "Number of records to retrieve"},
-                "status": {"type": "string", "description": "Filter by status (pending, completed, failed)"}
+                "limit": {"type": "number", "description": "Number of records to retrieve (max 1000)"},
+                "cursor": {"type": "string", "description": "next_cursor from the previous page"},
+                "status": {"type": "string", "description": "Filter by status (pending, completed, failed)"},
+                "columns": {"type": "array", "items": {"type": "string"}, "description": "Columns to return (default: all except response_data)"},
+                "post_id": {"type": "number", "description": "Filter by post ID"},
+                "since": {"type": "string", "description": "Only submissions at or after this date (YYYY-MM-DD HH:MM:SS)"},
+                "until": {"type": "string", "description": "Only submissions before this date (YYYY-MM-DD HH:MM:SS)"},
+                "url_prefix": {"type": "string", "description": "Only posts whose URL starts with this prefix"},
+                "max_staleness": {"type": "number", "description": "Answer from the local mirror if synced within this many seconds (0 to always query the live database)"}
             },
             "required": ["wp_path"]
         }
     },
     {
-        "name": "archive_get_queue_status",
-        "description": "Get current archive queue status",
+        "name": "archive_export_submission_history",
+        "description": "Stream the submission history to a JSON Lines file",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "wp_path": {"type": "string", "description": "WordPress installation path"},
+                "output_path": {"type": "string", "description": "File to write the records to"},
+                "status": {"type": "string", "description": "Filter by status (pending, completed, failed)"},
+                "columns": {"type": "array", "items": {"type": "string"}, "description": "Columns to return (default: all except response_data)"},
+                "post_id": {"type": "number", "description": "Filter by post ID"},
+                "since": {"type": "string", "description": "Only submissions at or after this date (YYYY-MM-DD HH:MM:SS)"},
+                "until": {"type": "string", "description": "Only submissions before this date (YYYY-MM-DD HH:MM:SS)"},
+                "url_prefix": {"type": "string", "description": "Only posts whose URL starts with this prefix"},
+                "max_staleness": {"type": "number", "description": "Answer from the local mirror if synced within this many seconds (0 to always query the live database)"}
+            },
+            "required": ["wp_path", "output_path"]
+        }
+    },
+    {
+        "name": "archive_analytics",
+        "description": "Throughput, success rate, retry distribution and time-to-archive percentiles per day, post type and status",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "wp_path": {"type": "string", "description": "WordPress installation path"},
+                "days": {"type": "number", "description": "Days to summarize, including today (0 for all, default 30)"},
+                "refresh": {"type": "boolean", "description": "Reload all rows instead of only new ones"},
+                "max_staleness": {"type": "number", "description": "Answer from the local mirror if synced within this many seconds (0 to always query the live database)"}
+            },
+            "required": ["wp_path"]
+        }
+    },
+    {
+        "name": "archive_mirror_sync",
+        "description": "Copy new and changed rows of the plugin's tables into the local SQLite reporting mirror",
         "inputSchema": {
             "type": "object",
             "properties": {
@@ -1818,87 +6944,295 @@ TOOLS = [
             },
             "required": ["wp_path"]
         }
+    },
+    {
+        "name": "archive_get_queue_status",
+        "description": "Get archive queue counts, attempt buckets, pending ages and recent throughput (cached briefly)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "wp_path": {"type": "string", "description": "WordPress installation path"},
+                "window_minutes": {"type": "number", "description": "Throughput window in minutes (default 15)"},
+                "since": {"type": "number", "description": "Version from a previous response; only changes since it are returned"}
+            },
+            "required": ["wp_path"]
+        }
+    },
+    {
+        "name": "archive_queue_drain",
+        "description": "Lease pending wp_swap_archive_queue rows in batches (SKIP LOCKED), submit them and write results back",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "max_batches": {"type": "integer", "description": "Stop after this many batches (default: until the queue is empty)"},
+                "batch_size": {"type": "integer", "description": "Rows leased per batch (default: [performance] batch_size)"},
+                "concurrency": {"type": "integer", "description": "Concurrent submissions per batch"}
+            }
+        }
+    },
+    {
+        "name": "archive_queue_workers",
+        "description": "List queue workers sharing wp_swap_archive_queue, with held partitions and throughput",
+        "inputSchema": {
+            "type": "object",
+            "properties": {}
+        }
+    },
+    {
+        "name": "job_start",
+        "description": "Start a listed tool (other than the job_* tools) as a background job and return its job id immediately",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "tool": {"type": "string", "description": "Tool name, e.g. archive_bulk_submit or wp_plugin_backup"},
+                "arguments": {"type": "object", "description": "Arguments for the tool"}
+            },
+            "required": ["tool"]
+        }
+    },
+    {
+        "name": "job_status",
+        "description": "Get the status and latest progress of a background job",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string", "description": "Job id returned by job_start"}
+            },
+            "required": ["job_id"]
+        }
+    },
+    {
+        "name": "job_result",
+        "description": "Get a finished job's result; list fields are paginated",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string", "description": "Job id returned by job_start"},
+                "offset": {"type": "integer", "description": "First list item to return"},
+                "limit": {"type": "integer", "description": "Maximum list items to return"}
+            },
+            "required": ["job_id"]
+        }
+    },
+    {
+        "name": "job_cancel",
+        "description": "Cancel a queued or running background job",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string", "description": "Job id returned by job_start"}
+            },
+            "required": ["job_id"]
+        }
+    },
+    {
+        "name": "job_list",
+        "description": "List background jobs",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "status": {"type": "string", "description": "Filter by status", "enum": ["queued", "running", "completed", "failed", "cancelled"]}
+            }
+        }
+    },
+    {
+        "name": "server_stats",
+        "description": "Get server runtime statistics (command timings, WP-CLI worker pools, Archive.org rate limiter, availability cache, submission journal, change detection, jobs, database, queue worker)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {}
+        }
     }
 ]
 
-async def main():
-    """Main MCP Server function"""
-    server = SpunWebArchiveForgeMCPServer()
+# Only these server methods can be called through tools/call
+TOOL_NAMES = frozenset(tool["name"] for tool in TOOLS)
+
+class ResponseWriter:
+    """Serialized writer for JSON-RPC messages on stdout
     
-    # Handle MCP protocol
-    while True:
+    Each message is written as a single line under a lock so responses from
+    concurrently running tool calls can never interleave.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = asyncio.Lock()
+
+    async def write(self, message: Dict[str, Any]):
+        """Write one JSON-RPC message"""
+        line = json.dumps(message) + "\n"
+        async with self._lock:
+            # Write off the event loop so a slow reader cannot stall other requests
+            await asyncio.get_running_loop().run_in_executor(None, self._write_line, line)
+
+    def _write_line(self, line: str):
+        self.stream.write(line)
+        self.stream.flush()
+
+
+class RequestDispatcher:
+    """Dispatch JSON-RPC requests, running each tool call as its own task
+    
+    Responses are written as soon as each call finishes and are correlated
+    with their request by ``id``, so a slow tool never blocks cheap ones.
+    """
+
+    def __init__(self, server: "SpunWebArchiveForgeMCPServer", writer: ResponseWriter,
+                 max_concurrent: int = DEFAULT_MAX_CONCURRENT_REQUESTS):
+        self.server = server
+        self.writer = writer
+        self.max_concurrent = max(1, max_concurrent)
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._tasks = set()
+
+    def dispatch(self, request: Dict[str, Any]):
+        """Schedule handling of a single request"""
+        task = asyncio.create_task(self._handle(request))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self):
+        """Wait for all in-flight requests to finish"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _handle(self, request: Dict[str, Any]):
+        request_id = request.get("id")
+
         try:
-            line = await asyncio.get_event_loop().run_in_executor(None, sys.stdin.readline)
-            if not line:
-                break
-            
-            request = json.loads(line.strip())
-            
             if request.get("method") == "tools/list":
                 response = {
                     "jsonrpc": "2.0",
-                    "id": request.get("id"),
+                    "id": request_id,
                     "result": {
                         "tools": TOOLS
                     }
                 }
             elif request.get("method") == "tools/call":
-                tool_name = request["params"]["name"]
-                arguments = request["params"]["arguments"]
-                
-                # Call the appropriate method
-                if hasattr(server, tool_name):
-                    method = getattr(server, tool_name)
-                    result = await method(**arguments)
-                    
-                    response = {
-                        "jsonrpc": "2.0",
-                        "id": request.get("id"),
-                        "result": {
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": json.dumps(result, indent=2)
-                                }
-                            ]
-                        }
-                    }
-                else:
-                    response = {
-                        "jsonrpc": "2.0",
-                        "id": request.get("id"),
-                        "error": {
-                            "code": -32601,
-                            "message": f"Method '{tool_name}' not found"
-                        }
-                    }
+                async with self._semaphore:
+                    response = await self._call_tool(request)
             else:
                 response = {
                     "jsonrpc": "2.0",
-                    "id": request.get("id"),
+                    "id": request_id,
                     "error": {
                         "code": -32601,
                         "message": "Method not found"
                     }
                 }
-            
-            print(json.dumps(response))
-            sys.stdout.flush()
-            
-        except json.JSONDecodeError:
-            continue
         except Exception as e:
             logger.error(f"Error processing request: {e}")
             response = {
                 "jsonrpc": "2.0",
-                "id": request.get("id", None),
+                "id": request_id,
                 "error": {
                     "code": -32603,
                     "message": str(e)
                 }
             }
-            print(json.dumps(response))
-            sys.stdout.flush()
+
+        await self.writer.write(response)
+
+    async def _call_tool(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        tool_name = request["params"]["name"]
+        arguments = request["params"].get("arguments") or {}
+
+        # Only expose the methods listed in TOOLS
+        if tool_name not in TOOL_NAMES:
+            return {
+                "jsonrpc": "2.0",
+                "id": request.get("id"),
+                "error": {
+                    "code": -32601,
+                    "message": f"Method '{tool_name}' not found"
+                }
+            }
+
+        method = getattr(self.server, tool_name)
+        meta = request["params"].get("_meta") or {}
+        current_request.set(RequestContext(
+            request_id=request.get("id"),
+            progress_token=meta.get("progressToken"),
+            notify=self.writer.write
+        ))
+        result = await method(**arguments)
+
+        return {
+            "jsonrpc": "2.0",
+            "id": request.get("id"),
+            "result": {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": json.dumps(result, indent=2)
+                    }
+                ]
+            }
+        }
+
+
+async def run_queue_worker():
+    """Drain the archive queue every processing_interval seconds instead of serving MCP"""
+    server = SpunWebArchiveForgeMCPServer()
+    interval = server.config.getfloat("performance", "processing_interval", DEFAULT_QUEUE_INTERVAL)
+    logger.info(f"Archive queue worker started (interval {interval}s)")
+    try:
+        await server._get_queue_worker().run_forever(interval)
+    finally:
+        await server._close()
+
+async def run_mirror_sync(wp_path: str):
+    """Sync the reporting mirror every mirror_sync_interval seconds instead of serving MCP"""
+    server = SpunWebArchiveForgeMCPServer()
+    interval = server.config.getfloat("database", "mirror_sync_interval", DEFAULT_MIRROR_SYNC_INTERVAL)
+    logger.info(f"Mirror sync started for {wp_path} (interval {interval}s)")
+    try:
+        while True:
+            await server.archive_mirror_sync(wp_path)
+            await asyncio.sleep(interval)
+    finally:
+        await server._close()
+
+async def main():
+    """Main MCP Server function"""
+    if "--queue-worker" in sys.argv[1:]:
+        await run_queue_worker()
+        return
+    if "--mirror-sync" in sys.argv[1:]:
+        index = sys.argv.index("--mirror-sync")
+        await run_mirror_sync(sys.argv[index + 1] if index + 1 < len(sys.argv) else ".")
+        return
+    
+    server = SpunWebArchiveForgeMCPServer()
+    writer = ResponseWriter()
+    dispatcher = RequestDispatcher(
+        server, writer,
+        max_concurrent=server.config.getint("performance", "max_concurrent_requests",
+                                            DEFAULT_MAX_CONCURRENT_REQUESTS)
+    )
+    loop = asyncio.get_running_loop()
+    
+    # Handle MCP protocol
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        
+        try:
+            request = json.loads(line.strip())
+        except json.JSONDecodeError:
+            continue
+        
+        if not isinstance(request, dict):
+            logger.error(f"Ignoring malformed request: {line.strip()}")
+            continue
+        
+        dispatcher.dispatch(request)
+    
+    # Let in-flight calls finish before exiting on EOF
+    await dispatcher.drain()
+    await server._close()
 
 if __name__ == "__main__":
     asyncio.run(main())
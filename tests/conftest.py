@@ -0,0 +1,86 @@
+"""Shared fixtures for the MCP server tests
+
+mcp-server.py is not an importable module name, so it is loaded from its
+path once and registered as ``mcp_server``.
+"""
+
+import importlib.util
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+SERVER_PATH = Path(__file__).resolve().parent.parent / "mcp-server.py"
+
+
+def load_server_module():
+    if "mcp_server" not in sys.modules:
+        spec = importlib.util.spec_from_file_location("mcp_server", SERVER_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["mcp_server"] = module
+        spec.loader.exec_module(module)
+    return sys.modules["mcp_server"]
+
+
+@pytest.fixture(scope="session")
+def mcp():
+    return load_server_module()
+
+
+@pytest.fixture
+def make_server(mcp, tmp_path):
+    """Build a server whose state files live under tmp_path; sections override mcp-server.conf values"""
+
+    def make(**sections):
+        values = {
+            "archive": {"journal_path": str(tmp_path / "journal.db"), "availability_cache_file": ""},
+            "performance": {"analysis_cache_path": str(tmp_path / "analysis-cache.db")},
+            "database": {"mirror_enabled": "false"},
+        }
+        for section, options in sections.items():
+            values.setdefault(section, {}).update(options)
+        config = mcp.ServerConfig(mcp.CONFIG_FILE)
+        for section, options in values.items():
+            if not config.parser.has_section(section):
+                config.parser.add_section(section)
+            for key, value in options.items():
+                config.parser.set(section, key, str(value))
+        return mcp.SpunWebArchiveForgeMCPServer(config)
+
+    return make
+
+
+QUEUE_SCHEMA = """
+    CREATE TABLE wp_swap_archive_queue (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_id INTEGER NOT NULL,
+        post_url TEXT NOT NULL,
+        post_title TEXT NOT NULL DEFAULT '',
+        post_type VARCHAR(20) NOT NULL DEFAULT 'post',
+        status VARCHAR(20) NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_attempt DATETIME DEFAULT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        archived_at DATETIME DEFAULT NULL,
+        error_message TEXT DEFAULT NULL
+    )
+"""
+
+
+@pytest.fixture
+def queue_database(tmp_path):
+    """Create a SQLite stand-in for wp_swap_archive_queue holding one pending row per post ID; returns its URL"""
+
+    def make(post_ids, url="https://example.com/post-{}/"):
+        path = tmp_path / "queue.db"
+        with sqlite3.connect(str(path)) as connection:
+            connection.execute(QUEUE_SCHEMA)
+            connection.executemany(
+                "INSERT INTO wp_swap_archive_queue (post_id, post_url) VALUES (?, ?)",
+                [(post_id, url.format(post_id) if url else "") for post_id in post_ids]
+            )
+        connection.close()
+        return f"sqlite:///{path}"
+
+    return make
@@ -0,0 +1,53 @@
+"""ChangeDetector against a local site that streams its pages in chunks"""
+
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+def fingerprints(mcp, tails, chunk_size=1024, chunks=200):
+    """Fetch the page once per tail; the tail is the last chunk of a ~200 KB body"""
+    served = []
+
+    async def page(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/html; charset=utf-8"})
+        await response.prepare(request)
+        for _ in range(chunks - 1):
+            await response.write(b"<p>" + b"x" * (chunk_size - 7) + b"</p>\n")
+            await asyncio.sleep(0)
+        await response.write(served.pop(0).encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/page/", page)
+        site = TestServer(app)
+        await site.start_server()
+        detector = mcp.ChangeDetector(timeout=10)
+        try:
+            results = []
+            for tail in tails:
+                served.append(tail)
+                results.append(await detector.check(str(site.make_url("/page/")), None))
+            return results
+        finally:
+            await detector.close()
+            await site.close()
+
+    return asyncio.run(main())
+
+
+def test_whole_chunked_body_is_hashed(mcp):
+    first, same, changed = fingerprints(mcp, ["<p>old footer</p>", "<p>old footer</p>", "<p>new footer</p>"])
+    assert first["changed"] is True
+    assert first["content_hash"] == same["content_hash"]
+    # The change sits in the last chunk, well past what is buffered after the first read
+    assert changed["content_hash"] != first["content_hash"]
+
+
+def test_body_is_hashed_up_to_the_cap(mcp, monkeypatch):
+    monkeypatch.setattr(mcp, "MAX_FINGERPRINT_BODY", 50 * 1024)
+    first, changed = fingerprints(mcp, ["<p>old footer</p>", "<p>new footer</p>"])
+    assert changed["content_hash"] == first["content_hash"]
@@ -0,0 +1,18 @@
+"""Background jobs started through job_start"""
+
+import asyncio
+
+
+def test_job_start_only_runs_listed_tools(make_server):
+    async def main():
+        server = make_server()
+        try:
+            return {tool: await server.job_start(tool) for tool in ("_close", "job_cancel", "nonexistent",
+                                                                     "server_stats")}
+        finally:
+            await server._close()
+
+    results = asyncio.run(main())
+    for tool in ("_close", "job_cancel", "nonexistent"):
+        assert results[tool] == {"success": False, "error": f"Tool '{tool}' cannot be run as a job"}
+    assert results["server_stats"]["success"] is True
@@ -0,0 +1,64 @@
+"""Reporting mirror syncs against a SQLite stand-in of the site database"""
+
+import asyncio
+import sqlite3
+
+SITE_SCHEMA = [
+    """CREATE TABLE wp_swap_submissions_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_id INTEGER NOT NULL,
+        status VARCHAR(20) DEFAULT 'pending',
+        last_checked DATETIME
+    )""",
+    """CREATE TABLE wp_posts (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_type VARCHAR(20) NOT NULL DEFAULT 'post',
+        post_status VARCHAR(20) NOT NULL DEFAULT 'publish',
+        post_modified_gmt DATETIME
+    )""",
+    "CREATE TABLE wp_swap_memory_log (id INTEGER PRIMARY KEY AUTOINCREMENT, memory_usage INTEGER)",
+]
+
+
+def test_sync_refreshes_completed_queue_rows_and_drops_deleted_ones(make_server, queue_database, tmp_path):
+    url = queue_database([1, 2, 3, 4])
+    source = url[len("sqlite:///"):]
+    with sqlite3.connect(source) as connection:
+        for statement in SITE_SCHEMA:
+            connection.execute(statement)
+        connection.execute("UPDATE wp_swap_archive_queue SET status = 'processing', last_attempt = '2024-01-01 10:00:00' "
+                           "WHERE id = 2")
+        # Row 3 holds the newest last_attempt, so the second sync has no change-column updates to copy
+        connection.execute("UPDATE wp_swap_archive_queue SET status = 'completed', last_attempt = '2024-01-01 11:00:00' "
+                           "WHERE id = 3")
+    connection.close()
+    server = make_server(database={"url": url, "mirror_enabled": "true", "mirror_path": str(tmp_path / "mirror.db"),
+                                   "mirror_batch_size": "2", "mirror_reconcile_interval": "0"})
+
+    async def main():
+        try:
+            first = await server.archive_mirror_sync(str(tmp_path))
+            # Archive_Queue completes a row without touching last_attempt, and cleanup deletes rows
+            with sqlite3.connect(source) as site:
+                site.execute("UPDATE wp_swap_archive_queue SET status = 'completed', archived_at = '2024-01-01 10:05:00' "
+                             "WHERE id IN (1, 2)")
+                site.execute("DELETE FROM wp_swap_archive_queue WHERE id IN (3, 4)")
+                site.execute("INSERT INTO wp_swap_archive_queue (post_id, post_url, status) "
+                             "VALUES (5, 'https://example.com/post-5/', 'completed')")
+            site.close()
+            second = await server.archive_mirror_sync(str(tmp_path))
+            mirror = server._get_mirror(server._get_database(tmp_path))
+            rows = mirror.connection.execute("SELECT id, status FROM wp_swap_archive_queue ORDER BY id").fetchall()
+            return first, second, [tuple(row) for row in rows]
+        finally:
+            await server._close()
+
+    first, second, rows = asyncio.run(main())
+    assert first["success"] is True, first
+    assert second["success"] is True, second
+    queue = second["tables"]["wp_swap_archive_queue"]
+    assert queue["changed_rows"] == 0
+    assert queue["refreshed_rows"] == 2
+    # Row 4 was open and is missed by the refresh, completed row 3 by the reconcile
+    assert queue["deleted_rows"] == 2
+    assert rows == [(1, "completed"), (2, "completed"), (5, "completed")]
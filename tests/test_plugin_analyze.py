@@ -0,0 +1,62 @@
+"""wp_plugin_analyze and the symbol index"""
+
+import asyncio
+
+
+def analyze(make_server, plugin_dir, **arguments):
+    async def main():
+        server = make_server()
+        try:
+            result = await server.wp_plugin_analyze(str(plugin_dir), **arguments)
+            return result, dict(server.symbol_indexes)
+        finally:
+            await server._close()
+
+    return asyncio.run(main())
+
+
+def write_plugin(plugin_dir):
+    plugin_dir.mkdir()
+    (plugin_dir / "plugin.php").write_text(
+        "<?php\nfunction demo_init() {\n    global $wpdb;\n"
+        "    $wpdb->query(\"DELETE FROM t WHERE id = \" . $_GET['id']);\n"
+        "    do_action('demo_loaded');\n}\nadd_action('init', 'demo_init');\n"
+    )
+
+
+def test_analysis_and_validation_take_queries_from_the_symbol_index(make_server, tmp_path):
+    plugin_dir = tmp_path / "demo"
+    write_plugin(plugin_dir)
+    (plugin_dir / "includes").mkdir()
+    # A prepared query mentioning $wpdb->query no longer hides the unprepared one in plugin.php
+    (plugin_dir / "includes" / "class-demo.php").write_text(
+        "<?php\ndefined('ABSPATH') || exit;\nclass Demo {\n    function run($id) {\n        global $wpdb;\n"
+        "        $wpdb->query($wpdb->prepare(\"DELETE FROM t WHERE id = %d\", $id));\n"
+        "        $wpdb->get_results(\"SELECT * FROM t WHERE id = $id\");\n    }\n}\n"
+    )
+
+    result, indexes = analyze(make_server, plugin_dir, analysis_type="security")
+    assert result["success"] is True
+    assert len(indexes) == 1
+    index = next(iter(indexes.values()))
+    assert result["analysis"]["symbols"]["unprepared_queries"] == 2
+    assert result["analysis"]["scan"]["files_scanned"] == len(index.paths) == 2
+    issues = result["analysis"]["security"]["issues"]
+    assert sorted((issue["file"], issue["line"]) for issue in issues if issue["rule"] == "unprepared-query") == [
+        (str(index.root / "includes" / "class-demo.php"), 7), (str(index.root / "plugin.php"), 4)
+    ]
+    # One deduction per rule and file
+    assert result["analysis"]["security"]["score"] == 80
+
+    async def validate():
+        server = make_server()
+        try:
+            return await server._validate_security(plugin_dir)
+        finally:
+            await server._close()
+
+    security = asyncio.run(validate())
+    assert security["status"] == "fail"
+    assert len(security["unprepared_queries"]) == 2
+    # Every file is checked, not just the top level
+    assert [issue["file"] for issue in security["issues"]] == [str(index.root / "plugin.php")]
@@ -0,0 +1,57 @@
+"""PluginScanner with the persistent analysis cache"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+PLUGIN_FILE = b"<?php\n$wpdb->query(\"DELETE FROM t WHERE id = $id\");\necho $_GET['q'];\n"
+
+
+def counting_cache(mcp, path):
+    cache = mcp.AnalysisCache(path)
+    calls = {"remember_file": 0, "put": 0}
+    for name in calls:
+        method = getattr(cache, name)
+
+        def counted(*args, name=name, method=method):
+            calls[name] += 1
+            return method(*args)
+
+        setattr(cache, name, counted)
+    return cache, calls
+
+
+def plugin_tree(root, copies):
+    (root / "includes").mkdir(parents=True)
+    (root / "plugin.php").write_bytes(PLUGIN_FILE)
+    for index in range(copies):
+        (root / "includes" / f"copy-{index}.php").write_bytes(PLUGIN_FILE)
+    (root / "includes" / "other.php").write_bytes(b"<?php\nadd_action('init', 'f');\n")
+
+
+def test_serial_scan_remembers_and_stores_each_file_once(mcp, tmp_path):
+    plugin_tree(tmp_path / "plugin", copies=2)
+    cache, calls = counting_cache(mcp, tmp_path / "cache.db")
+    scanner = mcp.PluginScanner(cache=cache)
+
+    first = scanner.scan(tmp_path / "plugin")
+    assert first["files_scanned"] == 4
+    # The copies match the first file's cached content and are not scanned
+    assert first["files_rescanned"] == 2
+    assert calls == {"remember_file": 4, "put": 2}
+
+    second = scanner.scan(tmp_path / "plugin")
+    assert second["files_rescanned"] == 0
+    assert second["findings"] == first["findings"]
+    assert calls == {"remember_file": 4, "put": 2}
+
+
+def test_parallel_scan_matches_serial_scan(mcp, tmp_path, monkeypatch):
+    monkeypatch.setattr(mcp, "PARALLEL_SCAN_MIN_FILES", 1)
+    plugin_tree(tmp_path / "plugin", copies=3)
+    serial = mcp.PluginScanner().scan(tmp_path / "plugin")
+    cache, calls = counting_cache(mcp, tmp_path / "cache.db")
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        parallel = mcp.PluginScanner(cache=cache).scan(tmp_path / "plugin", pool)
+    assert parallel["parallel"] is True
+    assert sorted(parallel["findings"], key=str) == sorted(serial["findings"], key=str)
+    assert parallel["files_rescanned"] == 5
+    assert calls == {"remember_file": 5, "put": 5}
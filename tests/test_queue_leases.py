@@ -0,0 +1,165 @@
+"""PartitionLeases shared by several worker processes over one SQLite file
+
+The victim worker takes every partition, leases a batch and hangs while
+submitting it; it is then killed while its rows are 'processing'. The
+surviving workers must wait out its leases, claim its partitions under new
+fencing tokens, reset its orphaned rows and finish the queue, with no row
+submitted twice under the same (partition, token).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import sqlite3
+import time
+
+import pytest
+
+PARTITIONS = 4
+TTL = 1.0
+ROWS = 60
+RETRY_NOW = "9999-12-31 23:59:59"
+
+
+def run_worker(mcp, url, log_path, hang, ready):
+    async def submit(row):
+        with open(log_path, "a") as log:
+            log.write(f"{os.getpid()} {row['ID']} {row['partition']} {row['token']}\n")
+        if hang:
+            ready.set()
+            await asyncio.sleep(3600)
+        return {"success": True}
+
+    async def main():
+        database = mcp.WordPressDatabase(url)
+        leases = mcp.PartitionLeases(database, partitions=PARTITIONS, ttl=TTL)
+        worker = mcp.QueueWorker(database, submit, batch_size=5, concurrency=5, leases=leases)
+        await worker.drain()
+
+    asyncio.run(main())
+
+
+def read_log(log_path):
+    with open(log_path) as log:
+        return [tuple(int(field) for field in line.split()) for line in log]
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_killed_worker_rows_finish_exactly_once_per_lease(mcp, queue_database, tmp_path):
+    url = queue_database(range(1, ROWS + 1))
+    log_path = str(tmp_path / "submissions.log")
+    context = multiprocessing.get_context("fork")
+    ready = context.Event()
+
+    victim = context.Process(target=run_worker, args=(mcp, url, log_path, True, ready))
+    victim.start()
+    assert ready.wait(30)
+    # Rows it retries wait for a drain that started after their last attempt
+    time.sleep(1.1)
+    survivors = [context.Process(target=run_worker, args=(mcp, url, log_path, False, ready)) for _ in range(2)]
+    for survivor in survivors:
+        survivor.start()
+    time.sleep(0.5)
+    os.kill(victim.pid, signal.SIGKILL)
+    victim.join()
+    for survivor in survivors:
+        survivor.join(60)
+        assert survivor.exitcode == 0
+
+    entries = read_log(log_path)
+    orphaned = {post_id for pid, post_id, partition, token in entries if pid == victim.pid}
+    assert orphaned
+    # No row was submitted twice under one lease
+    submissions = [(post_id, partition, token) for pid, post_id, partition, token in entries]
+    assert len(submissions) == len(set(submissions))
+    # The victim's rows were submitted again, under a newer token of their partition
+    for post_id in orphaned:
+        tokens = sorted(token for pid, row, partition, token in entries if row == post_id)
+        assert len(tokens) == 2 and tokens[0] < tokens[1]
+    assert {post_id for pid, post_id, partition, token in entries} == set(range(1, ROWS + 1))
+
+    with sqlite3.connect(url[len("sqlite:///"):]) as connection:
+        statuses = connection.execute("SELECT status, attempts, COUNT(*) FROM wp_swap_archive_queue "
+                                      "GROUP BY status, attempts").fetchall()
+        owners = connection.execute("SELECT COUNT(*) FROM wp_swap_queue_leases WHERE owner IS NOT NULL").fetchone()
+    connection.close()
+    assert statuses == [("completed", 1, ROWS)]
+    # Survivors release their partitions when their drain ends
+    assert owners == (0,)
+
+
+def test_write_back_is_fenced_after_lease_is_lost(mcp, queue_database):
+    url = queue_database(range(1, 9))
+    database = mcp.WordPressDatabase(url)
+
+    async def main():
+        stalled = asyncio.Event()
+        resume = asyncio.Event()
+
+        async def stall(row):
+            stalled.set()
+            await resume.wait()
+            return {"success": True}
+
+        async def succeed(row):
+            return {"success": True}
+
+        first = mcp.QueueWorker(database, stall, batch_size=8, concurrency=8,
+                                leases=mcp.PartitionLeases(database, partitions=2, ttl=TTL, owner="first"))
+        second = mcp.QueueWorker(database, succeed, batch_size=8,
+                                 leases=mcp.PartitionLeases(database, partitions=2, ttl=TTL, owner="second"))
+        await database.run(first._rebalance)
+        batch = asyncio.create_task(first.process_batch())
+        await stalled.wait()
+        # first stops heartbeating; once its leases expire, second claims them
+        await asyncio.sleep(TTL + 0.1)
+        await database.run(second._rebalance)
+        resume.set()
+        await batch
+        await second.process_batch(RETRY_NOW)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first.stats["lease_lost"] == 8
+    assert first.leases.stats["fenced_writes"] == 8
+    assert first.stats["completed"] == 0
+    assert second.leases.held == {0: 2, 1: 2}
+    assert second.stats["completed"] == 8
+    with sqlite3.connect(url[len("sqlite:///"):]) as connection:
+        assert connection.execute("SELECT status, attempts, COUNT(*) FROM wp_swap_archive_queue "
+                                  "GROUP BY status, attempts").fetchall() == [("completed", 1, 8)]
+    connection.close()
+
+
+def test_lease_tables_follow_the_site_prefix(make_server, queue_database):
+    server = make_server(database={"url": queue_database([]), "table_prefix": "site2_"})
+    try:
+        worker = server._get_queue_worker()
+        assert worker.table == "site2_swap_archive_queue"
+        assert worker.leases.lease_table == "site2_swap_queue_leases"
+        assert worker.leases.worker_table == "site2_swap_queue_workers"
+    finally:
+        asyncio.run(server._close())
+
+
+def test_concurrent_drains_of_one_worker_do_not_fence_each_other(mcp, queue_database):
+    url = queue_database(range(1, 13))
+    database = mcp.WordPressDatabase(url)
+
+    async def submit(row):
+        await asyncio.sleep(0.05)
+        return {"success": True}
+
+    async def main():
+        leases = mcp.PartitionLeases(database, partitions=2, ttl=TTL)
+        worker = mcp.QueueWorker(database, submit, batch_size=4, concurrency=4, leases=leases)
+        return await asyncio.gather(worker.drain(max_batches=1), worker.drain())
+
+    one_batch, rest = asyncio.run(main())
+    assert (one_batch["leased"], one_batch["completed"], one_batch["lease_lost"]) == (4, 4, 0)
+    assert (rest["leased"], rest["completed"], rest["lease_lost"]) == (8, 8, 0)
+    with sqlite3.connect(url[len("sqlite:///"):]) as connection:
+        assert connection.execute("SELECT status, COUNT(*) FROM wp_swap_archive_queue "
+                                  "GROUP BY status").fetchall() == [("completed", 12)]
+    connection.close()
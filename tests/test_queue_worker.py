@@ -0,0 +1,120 @@
+"""QueueWorker leasing and write-back against a SQLite stand-in for wp_swap_archive_queue"""
+
+import asyncio
+import sqlite3
+from collections import Counter
+
+RETRY_NOW = "9999-12-31 23:59:59"
+
+
+def queue_rows(url):
+    with sqlite3.connect(url[len("sqlite:///"):]) as connection:
+        connection.row_factory = sqlite3.Row
+        return {row["post_id"]: dict(row) for row in connection.execute("SELECT * FROM wp_swap_archive_queue")}
+
+
+def test_drain_writes_back_outcomes(mcp, queue_database):
+    url = queue_database(range(1, 7))
+    failing = {2, 5}
+
+    async def submit(row):
+        if row["ID"] in failing:
+            return {"success": False, "error": f"HTTP 520 for {row['ID']}"}
+        return {"success": True}
+
+    async def main():
+        worker = mcp.QueueWorker(mcp.WordPressDatabase(url), submit, batch_size=4, max_attempts=2)
+        first = await worker.drain()
+        # Failed rows wait for the next drain; pass a later cutoff to retry them now
+        await worker.process_batch(RETRY_NOW)
+        return first
+
+    first = asyncio.run(main())
+    assert first["leased"] == 6
+    assert first["batches"] == 2
+    assert first["completed"] == 4
+    assert first["retried"] == 2
+    rows = queue_rows(url)
+    for post_id, row in rows.items():
+        if post_id in failing:
+            assert (row["status"], row["attempts"]) == ("failed", 2)
+            assert row["error_message"] == f"HTTP 520 for {post_id}"
+        else:
+            assert (row["status"], row["attempts"]) == ("completed", 1)
+            assert row["archived_at"] is not None
+
+
+def test_concurrent_workers_never_lease_the_same_row(mcp, queue_database):
+    url = queue_database(range(1, 41))
+    submitted = Counter()
+
+    async def submit(row):
+        submitted[row["ID"]] += 1
+        await asyncio.sleep(0.001)
+        return {"success": True}
+
+    async def main():
+        workers = [mcp.QueueWorker(mcp.WordPressDatabase(url), submit, batch_size=3) for _ in range(3)]
+        return await asyncio.gather(*(worker.drain() for worker in workers))
+
+    summaries = asyncio.run(main())
+    assert sum(summary["leased"] for summary in summaries) == 40
+    assert submitted == Counter({post_id: 1 for post_id in range(1, 41)})
+    assert {row["status"] for row in queue_rows(url).values()} == {"completed"}
+
+
+def test_cancelled_batch_returns_unfinished_rows_to_pending(mcp, queue_database):
+    url = queue_database(range(1, 5))
+
+    async def main():
+        first_done = asyncio.Event()
+
+        async def submit(row):
+            if row["ID"] == 1:
+                first_done.set()
+                return {"success": True}
+            await asyncio.sleep(3600)
+
+        worker = mcp.QueueWorker(mcp.WordPressDatabase(url), submit, concurrency=4)
+        task = asyncio.create_task(worker.process_batch())
+        await first_done.wait()
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+    rows = queue_rows(url)
+    assert (rows[1]["status"], rows[1]["attempts"]) == ("completed", 1)
+    # Interrupted rows go back to pending without using up an attempt
+    for post_id in (2, 3, 4):
+        assert (rows[post_id]["status"], rows[post_id]["attempts"]) == ("pending", 0)
+
+
+def test_drain_overrides_apply_to_one_call_only(make_server, queue_database):
+    url = queue_database(range(1, 7))
+    server = make_server(database={"url": url}, archive={"queue_partitions": 0})
+    submitted = []
+
+    async def submit(row, detect_changes=False):
+        submitted.append(row["ID"])
+        return {"success": True}
+
+    async def main():
+        server._submit_post_row = submit
+        try:
+            overridden = await server.archive_queue_drain(max_batches=1, batch_size=2, concurrency=1)
+            worker = server._get_queue_worker()
+            settings = (worker.batch_size, worker.concurrency)
+            default = await server.archive_queue_drain(max_batches=1)
+            return overridden, settings, default
+        finally:
+            await server._close()
+
+    overridden, settings, default = asyncio.run(main())
+    assert overridden["leased"] == 2
+    assert settings == (server.config.getint("performance", "batch_size", 10),
+                        server.config.getint("performance", "max_concurrent_requests", 5))
+    assert default["leased"] == 4
@@ -0,0 +1,76 @@
+"""Keyset paging of the submission history against a SQLite stand-in"""
+
+import asyncio
+import sqlite3
+
+HISTORY_SCHEMA = """
+    CREATE TABLE wp_swap_submissions_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_id INTEGER NOT NULL,
+        post_title TEXT NOT NULL,
+        post_url TEXT NOT NULL,
+        submission_url TEXT,
+        archive_url TEXT,
+        status VARCHAR(20) DEFAULT 'pending',
+        submission_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        last_checked DATETIME,
+        error_message TEXT,
+        response_data TEXT
+    )
+"""
+
+
+def history_database(tmp_path):
+    path = tmp_path / "history.db"
+    rows = []
+    for index in range(1, 26):
+        # Groups of three rows share a submission_date, so pages split inside ties
+        date = f"2024-01-{10 + index // 3:02d} 12:00:00"
+        rows.append((index, f"Post {index}", f"https://example.com/post-{index}/",
+                     "completed" if index % 4 else "failed", date))
+    with sqlite3.connect(str(path)) as connection:
+        connection.execute(HISTORY_SCHEMA)
+        connection.executemany(
+            "INSERT INTO wp_swap_submissions_history (post_id, post_title, post_url, status, submission_date) "
+            "VALUES (?, ?, ?, ?, ?)", rows
+        )
+        connection.execute("INSERT INTO wp_swap_submissions_history (post_id, post_title, post_url, submission_date) "
+                           "VALUES (26, 'Undated', 'https://example.com/post-26/', NULL)")
+    connection.close()
+    return f"sqlite:///{path}", rows
+
+
+def page_through(server, wp_path, limit, **filters):
+    async def pages():
+        records, cursor, calls = [], None, 0
+        while True:
+            page = await server.archive_get_submission_history(str(wp_path), limit=limit, cursor=cursor, **filters)
+            assert page["success"] is True, page
+            assert page["source"] == "database"
+            assert len(page["records"]) <= limit
+            records.extend(page["records"])
+            calls += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return records, calls
+
+    return pages()
+
+
+def test_history_pages_cover_every_dated_row_once(make_server, tmp_path):
+    url, rows = history_database(tmp_path)
+    server = make_server(database={"url": url})
+
+    async def main():
+        try:
+            return await page_through(server, tmp_path, 7), await page_through(server, tmp_path, 4, status="failed")
+        finally:
+            await server._close()
+
+    (records, calls), (failed, _) = asyncio.run(main())
+    expected = sorted(rows, key=lambda row: (row[4], row[0]), reverse=True)
+    assert [record["post_id"] for record in records] == [row[0] for row in expected]
+    assert calls == 4
+    assert "response_data" not in records[0]
+    # Filters apply on every page, not just the first
+    assert [record["post_id"] for record in failed] == [row[0] for row in expected if row[3] == "failed"]
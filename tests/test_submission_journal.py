@@ -0,0 +1,193 @@
+"""SubmissionJournal batching and bulk-job checkpoints"""
+
+import asyncio
+import json
+from datetime import datetime
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+def test_conflicting_flush_keeps_folded_retries(mcp, tmp_path):
+    journal = mcp.SubmissionJournal(tmp_path / "journal.db", dedupe_window=3600)
+    submitted_at = datetime.now()
+
+    def attempt():
+        journal.record(mcp.ArchiveSubmission(post_id=1, url="https://example.com/a", archive_url=None,
+                                             status=mcp.SubmissionStatus.FAILED, submitted_at=submitted_at,
+                                             completed_at=None, error_message="HTTP 520", retry_count=0))
+
+    attempt()
+    journal.flush()
+    # Two more attempts fold into one pending row before they reach the stored one
+    attempt()
+    attempt()
+    journal.flush()
+    rows = journal.connection.execute("SELECT retry_count FROM submissions").fetchall()
+    assert [row["retry_count"] for row in rows] == [2]
+
+
+def test_cancelled_bulk_submit_resumes_from_checkpoint(mcp, make_server, tmp_path):
+    posts = [{"ID": post_id, "url": f"https://example.com/post-{post_id}/", "post_type": "post"}
+             for post_id in range(1, 11)]
+    saved = []
+    four_saved = asyncio.Event()
+    gate = asyncio.Event()
+
+    async def save(request):
+        url = request.match_info["url"]
+        saved.append(url)
+        if len(saved) == 4:
+            four_saved.set()
+        elif len(saved) > 4:
+            await gate.wait()
+        return web.Response(status=302, headers={"Location": f"/web/20240101000000/{url}"})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/save/{url:.*}", save)
+        stand_in = TestServer(app)
+        await stand_in.start_server()
+        server = make_server(archive={"api_base_url": str(stand_in.make_url("/save/")),
+                                      "access_key": "", "secret_key": "",
+                                      "rate_limit_delay": 0, "max_retries": 0})
+
+        async def iter_post_rows(wp_path, post_type="all", post_ids=None, page_size=None):
+            for row in posts:
+                yield dict(row)
+
+        server._iter_post_rows = iter_post_rows
+        try:
+            job = asyncio.create_task(server.archive_bulk_submit(str(tmp_path), concurrency=1))
+            await four_saved.wait()
+            # Let the fifth request reach the stand-in, then interrupt the job
+            while len(saved) < 5:
+                await asyncio.sleep(0.01)
+            job.cancel()
+            try:
+                await job
+            except asyncio.CancelledError:
+                pass
+            checkpoints = server.journal.connection.execute(
+                "SELECT job_key, position FROM checkpoints").fetchall()
+            gate.set()
+            resumed = await server.archive_bulk_submit(str(tmp_path), concurrency=1)
+            remaining = server.journal.connection.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+            return checkpoints, resumed, remaining
+        finally:
+            await server._close()
+            await stand_in.close()
+
+    checkpoints, resumed, remaining = asyncio.run(main())
+    assert [row["position"] for row in checkpoints] == ["4"]
+    assert resumed["success"] is True
+    assert resumed["resumed_from"] == 4
+    assert resumed["resume_skipped"] == 4
+    assert resumed["successful"] == 6
+    # The interrupted post is submitted again; finished posts are not
+    assert saved == [post["url"] for post in posts[:5]] + [post["url"] for post in posts[4:]]
+    # A completed job clears its checkpoint
+    assert remaining == 0
+
+
+def test_resume_with_unsorted_post_ids_submits_every_post(mcp, make_server, tmp_path):
+    saved = []
+    first_saved = asyncio.Event()
+    gate = asyncio.Event()
+
+    async def save(request):
+        url = request.match_info["url"]
+        saved.append(url)
+        if len(saved) == 1:
+            first_saved.set()
+        else:
+            await gate.wait()
+        return web.Response(status=302, headers={"Location": f"/web/20240101000000/{url}"})
+
+    async def wp(args, wp_path, timeout=None):
+        """WP-CLI stand-in for `wp post list --post__in=...`, which answers in ID order"""
+        ids = next(arg for arg in args if arg.startswith("--post__in=")).split("=", 1)[1].split(",")
+        rows = [{"ID": post_id, "url": f"https://example.com/post-{post_id}/", "post_type": "post",
+                 "post_modified": "2024-01-01 00:00:00"} for post_id in sorted(map(int, ids))]
+        return mcp.CommandResult(args, 0, json.dumps(rows), "", 0.0)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/save/{url:.*}", save)
+        stand_in = TestServer(app)
+        await stand_in.start_server()
+        server = make_server(archive={"api_base_url": str(stand_in.make_url("/save/")),
+                                      "access_key": "", "secret_key": "",
+                                      "rate_limit_delay": 0, "max_retries": 0})
+        server._wp = wp
+        try:
+            job = asyncio.create_task(server.archive_bulk_submit(str(tmp_path), post_ids=[50, 10, 30],
+                                                                 concurrency=1))
+            await first_saved.wait()
+            while len(saved) < 2:
+                await asyncio.sleep(0.01)
+            job.cancel()
+            try:
+                await job
+            except asyncio.CancelledError:
+                pass
+            gate.set()
+            return await server.archive_bulk_submit(str(tmp_path), post_ids=[30, 50, 10], concurrency=1)
+        finally:
+            await server._close()
+            await stand_in.close()
+
+    resumed = asyncio.run(main())
+    assert resumed["resumed_from"] == 10
+    assert resumed["resume_skipped"] == 1
+    assert resumed["successful"] == 2
+    # Posts go out in ID order, so the checkpoint never passes an unsubmitted one
+    assert saved == [f"https://example.com/post-{post_id}/" for post_id in (10, 30, 30, 50)]
+
+
+def test_incremental_watermark_passes_a_post_that_keeps_failing(mcp, make_server, tmp_path):
+    posts = [{"ID": post_id, "url": f"https://example.com/post-{post_id}/", "post_type": "post",
+              "post_modified_gmt": f"2024-01-0{post_id} 00:00:00"} for post_id in (1, 2, 3)]
+
+    async def save(request):
+        url = request.match_info["url"]
+        if "post-2" in url:
+            return web.Response(status=520)
+        return web.Response(status=302, headers={"Location": f"/web/20240101000000/{url}"})
+
+    async def wp(args, wp_path, timeout=None):
+        """WP-CLI stand-in for the modified-posts script: rows past (post_modified_gmt, ID)"""
+        date, clock, last_id, page_size = args[2:6]
+        after = (f"{date} {clock}", int(last_id))
+        rows = [post for post in posts if (post["post_modified_gmt"], post["ID"]) > after][:int(page_size)]
+        return mcp.CommandResult(args, 0, json.dumps(rows), "", 0.0)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/save/{url:.*}", save)
+        stand_in = TestServer(app)
+        await stand_in.start_server()
+        server = make_server(archive={"api_base_url": str(stand_in.make_url("/save/")),
+                                      "access_key": "", "secret_key": "", "rate_limit_delay": 0,
+                                      "max_retries": 0, "watermark_max_attempts": 2})
+        server._wp = wp
+        try:
+            runs = [await server.archive_bulk_submit(str(tmp_path), incremental=True, concurrency=1)
+                    for _ in range(3)]
+            attempts = server.journal.connection.execute("SELECT COUNT(*) FROM post_attempts").fetchone()[0]
+            return runs, attempts
+        finally:
+            await server._close()
+            await stand_in.close()
+
+    (first, second, third), attempts = asyncio.run(main())
+    # The failing post holds the watermark once, then is given up on
+    assert (first["total_submitted"], first["failed"], first["given_up"]) == (3, 1, 0)
+    assert first["watermark"] == ["2024-01-01 00:00:00", 1]
+    assert (second["total_submitted"], second["failed"], second["given_up"]) == (2, 1, 1)
+    assert second["failures"][0]["post_id"] == 2
+    assert second["failures"][0]["attempts"] == 2
+    assert second["failures"][0]["watermark_passed"] is True
+    assert second["watermark"] == ["2024-01-03 00:00:00", 3]
+    assert third["total_submitted"] == 0
+    assert attempts == 0
@@ -0,0 +1,225 @@
+"""WaybackClient against a local aiohttp stand-in for the Wayback Machine"""
+
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+def run_with_stand_in(mcp, routes, scenario, **client_options):
+    """Serve routes locally and run scenario(client, calls) against them"""
+    calls = []
+
+    async def main():
+        app = web.Application()
+        for method, path, handler in routes:
+            async def recorded(request, handler=handler):
+                calls.append(request)
+                return await handler(request)
+            app.router.add_route(method, path, recorded)
+        server = TestServer(app)
+        await server.start_server()
+        base = str(server.make_url(""))
+        client = mcp.WaybackClient(f"{base}/save/", f"{base}/wayback/available",
+                                   cdx_url=f"{base}/cdx/search/cdx", **client_options)
+        try:
+            return await scenario(client, calls)
+        finally:
+            await client.close()
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def test_simple_submit_returns_capture_location(mcp):
+    async def save(request):
+        return web.Response(status=302, headers={"Location": "/web/20240101000000/https://example.com/a"})
+
+    async def scenario(client, calls):
+        return await client.submit("https://example.com/a")
+
+    result = run_with_stand_in(mcp, [("GET", "/save/{url:.*}", save)], scenario)
+    assert result["success"] is True
+    assert result["method"] == "simple"
+    assert result["response_code"] == 302
+    assert result["archive_url"].endswith("/web/20240101000000/https://example.com/a")
+
+
+def test_authenticated_submit_posts_credentials(mcp):
+    async def save(request):
+        form = await request.post()
+        assert request.headers["Authorization"] == "LOW key:secret"
+        assert form["url"] == "https://example.com/b"
+        assert form["capture_outlinks"] == "0"
+        return web.json_response({"job_id": "spn2-abc"})
+
+    async def scenario(client, calls):
+        return await client.submit("https://example.com/b", capture_outlinks=False)
+
+    result = run_with_stand_in(mcp, [("POST", "/save/", save)], scenario, access_key="key", secret_key="secret")
+    assert result["success"] is True
+    assert result["method"] == "authenticated"
+    assert result["job_id"] == "spn2-abc"
+
+
+def test_submit_reports_api_errors(mcp):
+    async def save(request):
+        return web.Response(status=520)
+
+    async def scenario(client, calls):
+        return await client.submit("https://example.com/c")
+
+    result = run_with_stand_in(mcp, [("GET", "/save/{url:.*}", save)], scenario)
+    assert result["success"] is False
+    assert result["error_type"] == "api_error"
+    assert result["response_code"] == 520
+
+
+def test_throttled_requests_are_retried(mcp):
+    responses = [web.Response(status=429, headers={"Retry-After": "0"}),
+                 web.Response(status=302, headers={"Location": "/web/1/https://example.com/d"})]
+
+    async def save(request):
+        return responses.pop(0)
+
+    async def scenario(client, calls):
+        result = await client.submit("https://example.com/d")
+        return result, len(calls), client.stats["retries"]
+
+    result, requests, retries = run_with_stand_in(mcp, [("GET", "/save/{url:.*}", save)], scenario)
+    assert result["success"] is True
+    assert (requests, retries) == (2, 1)
+
+
+def test_availability_reads_closest_snapshot(mcp):
+    async def available(request):
+        if request.query["url"] == "https://example.com/archived":
+            closest = {"available": True, "url": "https://web.archive.org/web/2024/https://example.com/archived",
+                       "timestamp": "20240101000000", "status": "200"}
+            return web.json_response({"archived_snapshots": {"closest": closest}})
+        return web.json_response({"archived_snapshots": {}})
+
+    async def scenario(client, calls):
+        return (await client.check_availability("https://example.com/archived"),
+                await client.check_availability("https://example.com/missing"))
+
+    archived, missing = run_with_stand_in(mcp, [("GET", "/wayback/available", available)], scenario)
+    assert archived == {"available": True, "archive_url": "https://web.archive.org/web/2024/https://example.com/archived",
+                        "timestamp": "20240101000000"}
+    assert missing == {"available": False}
+
+
+CAPTURES = [
+    ("https://example.com/blog/a", "20230101000000"),
+    ("https://example.com/blog/a", "20240101000000"),
+    ("http://example.com/blog/b/", "20220505000000"),
+    ("https://example.com/blog/other", "20240202000000"),
+    ("https://example.com/about", "20210303000000"),
+]
+
+
+async def cdx(request):
+    """CDX stand-in: matching captures as 'original timestamp' lines, plus a malformed one"""
+    url, match_type = request.query["url"], request.query["matchType"]
+    strip = lambda value: value.split("://", 1)[-1]
+    lines = [f"{original} {timestamp}" for original, timestamp in CAPTURES
+             if (strip(original).startswith(strip(url)) if match_type == "prefix" else strip(original) == strip(url))]
+    limit = int(request.query.get("limit", 0))
+    lines = lines[limit:] if limit < 0 else lines[:limit] if limit else lines
+    return web.Response(text="\n".join(lines + ["truncated-line"]) + "\n")
+
+
+def test_latest_captures_parses_cdx_lines(mcp):
+    async def scenario(client, calls):
+        captures = [capture async for capture in client.latest_captures("example.com/blog/")]
+        latest = [capture async for capture in client.latest_captures("https://example.com/blog/a", "exact")]
+        return captures, latest, dict(calls[0].query), dict(calls[1].query)
+
+    captures, latest, query, exact_query = run_with_stand_in(mcp, [("GET", "/cdx/search/cdx", cdx)], scenario)
+    assert captures == [capture for capture in CAPTURES if "/blog/" in capture[0]]
+    assert query["matchType"] == "prefix"
+    assert query["filter"] == "statuscode:200"
+    assert query["fl"] == "original,timestamp"
+    # Exact lookups fetch the latest capture only
+    assert latest == [("https://example.com/blog/a", "20240101000000")]
+    assert (exact_query["fastLatest"], exact_query["limit"]) == ("true", "-1")
+
+
+def check_bulk_status(make_server, urls, handler=cdx, runs=1):
+    """Run archive_check_status_bulk runs times against a CDX stand-in; returns results and CDX queries"""
+    calls = []
+
+    async def main():
+        app = web.Application()
+
+        async def recorded(request):
+            calls.append(dict(request.query))
+            return await handler(request)
+
+        app.router.add_get("/cdx/search/cdx", recorded)
+        stand_in = TestServer(app)
+        await stand_in.start_server()
+        server = make_server(archive={"cdx_url": str(stand_in.make_url("/cdx/search/cdx")),
+                                      "rate_limit_delay": 0})
+        try:
+            return [await server.archive_check_status_bulk(urls) for _ in range(runs)]
+        finally:
+            await server._close()
+            await stand_in.close()
+
+    return asyncio.run(main()), calls
+
+
+def test_bulk_status_groups_urls_into_prefix_queries(make_server):
+    urls = ["https://example.com/blog/a", "https://example.com/blog/b/",
+            "https://example.com/blog/missing", "https://example.com/about"]
+    (first, second), calls = check_bulk_status(make_server, urls, runs=2)
+    assert first["success"] is True
+    assert first["timestamps"] == ["20240101000000", "20220505000000", None, "20210303000000"]
+    assert first["archived"] == 3
+    assert first["cdx_requests"] == 2
+    assert first["unresolved"] == []
+    assert sorted((call["matchType"], call["url"]) for call in calls) == [
+        ("exact", "https://example.com/about"), ("prefix", "example.com/blog/")]
+    # Answers, including the miss, come from the availability cache the second time
+    assert second["timestamps"] == first["timestamps"]
+    assert second["cdx_requests"] == 0
+    assert second["cache_hits"] == 4
+
+
+def test_bulk_status_never_queries_a_whole_site(make_server):
+    # Post-name permalinks and root-level URLs share nothing below the host
+    urls = ["https://example.com/about", "https://example.com/", "https://example.com/?p=12",
+            "https://example.com/blog/a"]
+    (result,), calls = check_bulk_status(make_server, urls)
+    assert result["timestamps"] == ["20210303000000", None, None, "20240101000000"]
+    assert sorted(call["matchType"] for call in calls) == ["exact"] * 4
+    assert all(call["url"] != "example.com/" for call in calls)
+
+
+def test_bulk_status_falls_back_to_exact_lookups_past_the_line_budget(mcp, make_server, monkeypatch):
+    monkeypatch.setattr(mcp, "CDX_PREFIX_LINES_PER_URL", 1)
+    urls = ["https://example.com/blog/a", "https://example.com/blog/b/"]
+    (result,), calls = check_bulk_status(make_server, urls)
+    # The prefix query stops after two lines, both captures of blog/a, so
+    # blog/a may be incomplete and blog/b was never reached
+    assert [(call["matchType"], call.get("limit")) for call in calls] == [
+        ("prefix", "2"), ("exact", "-1"), ("exact", "-1")]
+    assert result["timestamps"] == ["20240101000000", "20220505000000"]
+    assert result["cdx_requests"] == 3
+
+
+def test_bulk_status_reports_failed_lookups_without_failing_the_call(make_server):
+    async def flaky(request):
+        if "about" in request.query["url"]:
+            return web.Response(status=500)
+        return await cdx(request)
+
+    urls = ["https://example.com/about", "https://example.com/blog/a", "https://example.com/blog/b"]
+    (first, second), calls = check_bulk_status(make_server, urls, handler=flaky, runs=2)
+    assert first["success"] is True
+    assert first["timestamps"] == [None, "20240101000000", "20220505000000"]
+    assert first["unresolved"] == [0]
+    # Only the failed URL is looked up again
+    assert second["cache_hits"] == 2
+    assert second["unresolved"] == [0]